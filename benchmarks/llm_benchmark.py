@@ -0,0 +1,223 @@
+"""
+LLM Benchmark
+Runs LLMHandler scenarios against local mock Ollama and Groq servers and
+prints time-to-first-token, total latency and CPU time per turn.
+
+No GPU, API key or network access is needed: the mock servers (see
+benchmarks/mock_servers.py) run in child processes with the latency,
+token rate and error rate each scenario asks for, so the CPU time
+reported is LLMHandler's own.
+
+Usage (from the repo root):
+    python -m benchmarks.llm_benchmark
+    python -m benchmarks.llm_benchmark --scenario groq_outage_fallback --turns 5
+    python -m benchmarks.llm_benchmark --json benchmark_results.json
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.mock_servers import spawn_server
+from core.llm import LLMHandler
+from core.telemetry import percentile
+
+
+QUESTIONS = [
+    "Hi there! How are you today?",
+    "What's a good way to start learning Python?",
+    "Can you explain what a list comprehension is?",
+    "Thanks! And what about dictionaries?",
+    "How do I read a file line by line?",
+    "What was the first thing I asked you?",
+]
+
+# Each scenario: LLM mode, llm/preference overrides, mock server settings and
+# how many exchanges to pre-load into the history
+SCENARIOS = {
+    'ollama_multi_turn': {
+        'description': "Local model only, growing conversation",
+        'mode': "ollama",
+        'ollama': {'first_token_latency': 0.15, 'tokens_per_second': 60},
+    },
+    'groq_multi_turn': {
+        'description': "Groq only, growing conversation",
+        'mode': "groq",
+        'groq': {'first_token_latency': 0.1, 'tokens_per_second': 200},
+    },
+    'groq_outage_fallback': {
+        'description': "Groq returns 500 on every call, Ollama answers",
+        'mode': "groq",
+        'groq': {'error_rate': 1.0, 'error_status': 500},
+        'ollama': {'first_token_latency': 0.15, 'tokens_per_second': 60},
+    },
+    'auto_rate_limited': {
+        'description': "Auto mode, Groq rate limits half the calls",
+        'mode': "auto",
+        'groq': {'error_rate': 0.5, 'error_status': 429, 'seed': 7},
+        'ollama': {'first_token_latency': 0.15, 'tokens_per_second': 60},
+    },
+    'auto_hedged_slow_groq': {
+        'description': "Auto mode with hedging, Groq's first token takes 2 s",
+        'mode': "auto",
+        'preferences': {'hedge_requests': True, 'hedge_delay': 0.3},
+        'groq': {'first_token_latency': 2.0, 'tokens_per_second': 200},
+        'ollama': {'first_token_latency': 0.15, 'tokens_per_second': 60},
+    },
+    'groq_stuck_deadline': {
+        'description': "Groq never sends a first token, its 1 s deadline hands over to Ollama",
+        'mode': "groq",
+        'llm': {'deadlines': {'groq': {'first_token': 1, 'total': 10}}},
+        'groq': {'first_token_latency': 30},
+        'ollama': {'first_token_latency': 0.15, 'tokens_per_second': 60},
+    },
+    'cascade_mixed': {
+        'description': "Cascade mode: small talk on the small model, questions escalated to Groq",
+        'mode': "cascade",
+        'llm': {'cascade': {'escalate_to': "groq"}},
+        'groq': {'first_token_latency': 0.3, 'tokens_per_second': 200},
+        'ollama': {'first_token_latency': 0.05, 'tokens_per_second': 120},
+    },
+    'ollama_long_history': {
+        'description': "Local model with 200 earlier exchanges (context folding)",
+        'mode': "ollama",
+        'history': 200,
+        'ollama': {'first_token_latency': 0.15, 'tokens_per_second': 60},
+    },
+}
+
+
+def build_config(scenario, ollama_url, groq_url):
+    """Config for an LLMHandler that only talks to the mock servers"""
+    preferences = {
+        'prefer_online': True,
+        'auto_fallback': True,
+        'health_check_interval': 3600,
+        'hedge_requests': False,
+        'hedge_delay': 1.5,
+        'ttft_slo_ms': 1500,
+    }
+    preferences.update(scenario.get('preferences', {}))
+    llm = {
+        'mode': scenario['mode'],
+        'ollama_model': "mock:latest",
+        'ollama_host': ollama_url,
+        'ollama_preload': False,
+        'groq_api_key': "mock",
+        'groq_model': "mock-model",
+        'groq_base_url': groq_url,
+    }
+    llm.update(scenario.get('llm', {}))
+    return {
+        'llm': llm,
+        'preferences': preferences,
+        'cache': {'enabled': False},
+        'telemetry': {'path': "", 'windows': [300]},
+    }
+
+
+def make_handler(config):
+    llm = LLMHandler(config)
+
+    # Background probes would reach out to the real network; treat it as up
+    llm.health.stop()
+    llm.health.add_probe('internet', lambda: None)
+    llm.health.probe('internet')
+    return llm
+
+
+def prefill_history(llm, exchanges):
+    """Load earlier turns straight into the conversation"""
+    for i in range(exchanges):
+        llm.conversation.add_exchange(
+            f"Earlier question number {i} about something unrelated to this turn?",
+            f"Earlier answer number {i}, with a couple of sentences of detail. " * 3
+        )
+
+
+def run_turn(llm, question):
+    """One chat_stream() call, timed"""
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    first_token = None
+    for delta in llm.chat_stream(question):
+        if first_token is None and delta:
+            first_token = time.perf_counter()
+    end = time.perf_counter()
+
+    result = llm.last_result or {}
+    return {
+        'ttft_ms': (first_token - start) * 1000 if first_token else None,
+        'total_ms': (end - start) * 1000,
+        'cpu_ms': (time.process_time() - cpu_start) * 1000,
+        'backend': result.get('backend'),
+    }
+
+
+def summarize(turns, metric):
+    values = sorted(turn[metric] for turn in turns if turn[metric] is not None)
+    if not values:
+        return {'mean': None, 'p50': None, 'p95': None}
+    return {
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+    }
+
+
+def format_ms(value):
+    return f"{value:.0f}" if value is not None else "-"
+
+
+def run_scenario(name, scenario, turns):
+    processes = []
+    try:
+        ollama_process, ollama_url = spawn_server('ollama', **scenario.get('ollama', {}))
+        groq_process, groq_url = spawn_server('openai', **scenario.get('groq', {}))
+        processes = [ollama_process, groq_process]
+
+        llm = make_handler(build_config(scenario, ollama_url, groq_url))
+        if scenario.get('history'):
+            prefill_history(llm, scenario['history'])
+
+        print(f"\n▶ {name}: {scenario['description']}")
+        print(f"{'turn':>4} {'first token ms':>15} {'total ms':>10} {'cpu ms':>8}  backend")
+
+        results = []
+        for turn in range(turns):
+            result = run_turn(llm, QUESTIONS[turn % len(QUESTIONS)])
+            results.append(result)
+            print(f"{turn + 1:>4} {format_ms(result['ttft_ms']):>15} {format_ms(result['total_ms']):>10} "
+                  f"{format_ms(result['cpu_ms']):>8}  {result['backend']}")
+
+        summary = {metric: summarize(results, metric) for metric in ('ttft_ms', 'total_ms', 'cpu_ms')}
+        for metric, stats in summary.items():
+            print(f"     {metric:<8} mean {format_ms(stats['mean']):>6}  "
+                  f"p50 {format_ms(stats['p50']):>6}  p95 {format_ms(stats['p95']):>6}")
+
+        return {'description': scenario['description'], 'turns': results, 'summary': summary}
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline LLMHandler benchmark")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument('--turns', type=int, default=6)
+    parser.add_argument('--json', default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    report = {}
+    for name in args.scenario or SCENARIOS:
+        report[name] = run_scenario(name, SCENARIOS[name], args.turns)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+"""
+Local Stand-in LLM Servers
+HTTP servers that speak enough of the Ollama and Groq/OpenAI chat APIs to
+drive LLMHandler without a GPU or network access.
+
+Latency, token rate, streaming and error injection are configurable, so
+benchmark scenarios can reproduce slow first tokens, slow generation,
+outages and rate limiting on demand.
+"""
+
+import json
+import multiprocessing
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_REPLY = (
+    "Sure, I can help with that! Here is a short answer to your question. "
+    "Let me know if you want more details."
+)
+
+
+class MockSettings:
+    """Behaviour of a mock server (shared by all its request threads)"""
+
+    def __init__(self, first_token_latency=0.2, tokens_per_second=40, reply=DEFAULT_REPLY,
+                 error_rate=0.0, error_status=500, seed=None):
+        """
+        Args:
+            first_token_latency: Seconds before the first token is sent
+            tokens_per_second: Generation speed after the first token
+            reply: Text every completion returns (split on spaces into tokens)
+            error_rate: Probability (0-1) that a request fails
+            error_status: HTTP status used for injected failures (e.g. 429, 500)
+            seed: Seed for the error-injection RNG, for repeatable runs
+        """
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def tokens(self):
+        words = self.reply.split(' ')
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def should_fail(self):
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Common plumbing for both mock APIs"""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b"{}"
+        return json.loads(body or b"{}")
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self, content_type, headers=None):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def stream(self, content_type, chunks, headers=None):
+        """
+        Send a chunked response, one chunk per item of `chunks` as it is made
+
+        A client that hangs up mid-stream (a cancelled hedge or a missed
+        deadline) just ends the response; it isn't an error.
+        """
+        self.start_stream(content_type, headers)
+        try:
+            for data in chunks:
+                self.write_chunk(data)
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def generate(self):
+        """Yield tokens with the configured timing"""
+        settings = self.settings
+        time.sleep(settings.first_token_latency)
+        delay = 1 / settings.tokens_per_second if settings.tokens_per_second else 0
+        for index, token in enumerate(settings.tokens()):
+            if index and delay:
+                time.sleep(delay)
+            yield token
+
+    def prompt_tokens(self, messages):
+        return sum(len(str(message.get('content', ''))) for message in messages) // 4
+
+
+class OllamaHandler(MockHandler):
+    """Subset of the Ollama REST API: /api/chat, /api/generate, /api/embeddings"""
+
+    def do_GET(self):
+        if self.path == '/api/version':
+            self.send_json({'version': "0.0.0-mock"})
+        elif self.path == '/api/tags':
+            self.send_json({'models': [{'name': "mock:latest", 'model': "mock:latest"}]})
+        else:
+            self.send_json({'error': "not found"}, status=404)
+
+    def do_POST(self):
+        request = self.read_json()
+        self.settings.requests += 1
+
+        if self.path == '/api/generate':
+            # Warm-up requests (empty prompt) just "load" the model
+            self.send_json({'model': request.get('model'), 'response': "", 'done': True})
+            return
+        if self.path in ('/api/embeddings', '/api/embed'):
+            prompt = request.get('prompt') or request.get('input') or ""
+            rng = random.Random(prompt)
+            self.send_json({'embedding': [rng.uniform(-1, 1) for _ in range(32)]})
+            return
+        if self.path != '/api/chat':
+            self.send_json({'error': "not found"}, status=404)
+            return
+
+        if self.settings.should_fail():
+            self.send_json({'error': "injected failure"}, status=self.settings.error_status)
+            return
+
+        model = request.get('model')
+        prompt_tokens = self.prompt_tokens(request.get('messages', []))
+        start = time.perf_counter()
+
+        if not request.get('stream', True):
+            text = ''.join(self.generate())
+            self.send_json({
+                'model': model,
+                'message': {'role': 'assistant', 'content': text},
+                'done': True,
+                'prompt_eval_count': prompt_tokens,
+                'eval_count': len(self.settings.tokens()),
+                'total_duration': int((time.perf_counter() - start) * 1e9),
+            })
+            return
+
+        def lines():
+            for token in self.generate():
+                line = {'model': model, 'message': {'role': 'assistant', 'content': token}, 'done': False}
+                yield json.dumps(line).encode() + b"\n"
+            final = {
+                'model': model,
+                'message': {'role': 'assistant', 'content': ""},
+                'done': True,
+                'done_reason': "stop",
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(self.settings.first_token_latency * 1e9),
+                'eval_count': len(self.settings.tokens()),
+                'load_duration': 0,
+                'total_duration': int((time.perf_counter() - start) * 1e9),
+            }
+            yield json.dumps(final).encode() + b"\n"
+
+        self.stream('application/x-ndjson', lines())
+
+
+class OpenAIHandler(MockHandler):
+    """Subset of the OpenAI-compatible chat API, as served by Groq"""
+
+    RATE_LIMIT_HEADERS = {
+        'x-ratelimit-limit-requests': "14400",
+        'x-ratelimit-remaining-requests': "14399",
+        'x-ratelimit-reset-requests': "6s",
+        'x-ratelimit-limit-tokens': "6000",
+        'x-ratelimit-remaining-tokens': "5900",
+        'x-ratelimit-reset-tokens': "1s",
+    }
+
+    def do_POST(self):
+        if not self.path.endswith('/chat/completions'):
+            self.send_json({'error': {'message': "not found"}}, status=404)
+            return
+
+        request = self.read_json()
+        self.settings.requests += 1
+
+        if self.settings.should_fail():
+            status = self.settings.error_status
+            headers = {'retry-after': "1"} if status == 429 else {}
+            self.send_json({'error': {'message': "injected failure", 'type': "mock_error"}},
+                           status=status, headers=headers)
+            return
+
+        model = request.get('model')
+        completion_id = f"chatcmpl-mock-{self.settings.requests}"
+        created = int(time.time())
+        prompt_tokens = self.prompt_tokens(request.get('messages', []))
+
+        if not request.get('stream'):
+            text = ''.join(self.generate())
+            self.send_json({
+                'id': completion_id,
+                'object': "chat.completion",
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': text},
+                    'finish_reason': "stop"
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': len(self.settings.tokens()),
+                    'total_tokens': prompt_tokens + len(self.settings.tokens())
+                }
+            }, headers=self.RATE_LIMIT_HEADERS)
+            return
+
+        def events():
+            for token in self.generate():
+                chunk = {
+                    'id': completion_id,
+                    'object': "chat.completion.chunk",
+                    'created': created,
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+            done = {
+                'id': completion_id,
+                'object': "chat.completion.chunk",
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': "stop"}]
+            }
+            yield f"data: {json.dumps(done)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        self.stream('text/event-stream', events(), headers=self.RATE_LIMIT_HEADERS)
+
+
+class MockServer:
+    """A mock API server running on a background thread"""
+
+    def __init__(self, handler_class, settings=None, host="127.0.0.1", port=0):
+        self.settings = settings or MockSettings()
+        self.httpd = ThreadingHTTPServer((host, port), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.settings = self.settings
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+HANDLERS = {
+    'ollama': OllamaHandler,
+    'openai': OpenAIHandler,
+}
+
+
+def start_server(kind, **settings):
+    """Start a mock server in this process ("ollama" or "openai")"""
+    return MockServer(HANDLERS[kind], MockSettings(**settings)).start()
+
+
+def _serve(kind, settings, url_queue):
+    server = start_server(kind, **settings)
+    url_queue.put(server.url)
+    server.thread.join()
+
+
+def spawn_server(kind, **settings):
+    """
+    Start a mock server in a child process
+
+    Keeps the server's CPU time out of the process being benchmarked.
+
+    Returns:
+        (process, url); call process.terminate() when done
+    """
+    url_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(kind, settings, url_queue), daemon=True)
+    process.start()
+    return process, url_queue.get(timeout=10)
+
+
+if __name__ == '__main__':
+    # Run both servers in the foreground for manual poking
+    ollama_server = start_server('ollama')
+    openai_server = start_server('openai')
+    print(f"Mock Ollama: {ollama_server.url}")
+    print(f"Mock Groq/OpenAI: {openai_server.url} (set as llm.groq_base_url)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
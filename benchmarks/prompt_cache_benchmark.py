@@ -0,0 +1,97 @@
+"""
+Prompt Cache Benchmark
+Runs a growing conversation against a local Ollama and prints how much of
+the prompt had to be evaluated each turn.
+
+With the stable-prefix layout (system prompt + history unchanged between
+turns, mood hint as an unsaved suffix) Ollama reuses its KV cache for the
+prefix, so prompt-eval time stays flat while the history grows.
+
+Usage (from the repo root, with Ollama running):
+    python -m benchmarks.prompt_cache_benchmark
+    python -m benchmarks.prompt_cache_benchmark --turns 20 --model llama3.2:latest
+"""
+
+import argparse
+import json
+import os
+import time
+
+from core.llm import OllamaBackend, SYSTEM_PROMPT
+from core.context import ContextWindow, estimate_tokens
+
+
+QUESTIONS = [
+    "Hi! My name is Priya and I love gardening.",
+    "What vegetables are easy to grow on a balcony?",
+    "How often should I water tomatoes in summer?",
+    "I'm a bit worried my basil keeps dying.",
+    "Can you suggest a weekly plant care routine?",
+    "What's a good fertilizer for herbs?",
+    "Remind me what my name is and what I love?",
+    "How do I keep pests away without chemicals?",
+    "I'm so excited, my first tomato is red!",
+    "Which herbs grow well together in one pot?",
+]
+
+# Alternating mood hints: they must not invalidate the cached prefix
+MOODS = [
+    "",
+    "The user seems happy! Be cheerful and maintain the positive mood.",
+    "The user seems somewhat worried. Be reassuring and provide calm, helpful responses.",
+]
+
+
+def load_config(model=None):
+    config = {'llm': {'ollama_model': "llama3.2:latest"}}
+    if os.path.exists("config.json"):
+        with open("config.json", 'r') as f:
+            config = json.load(f)
+    if model:
+        config['llm']['ollama_model'] = model
+    # Room for the whole benchmark conversation without folding
+    config['llm'].setdefault('context_budget', {})['ollama'] = 100000
+    return config
+
+
+def run(turns, model=None):
+    config = load_config(model)
+    backend = OllamaBackend(config, SYSTEM_PROMPT)
+    conversation = ContextWindow(budget=backend.context_budget)
+    print(f"Model: {backend.model}")
+    print(f"{'turn':>4} {'history tok':>12} {'prompt eval tok':>16} {'prompt eval ms':>15} {'first token ms':>15}")
+
+    results = []
+    for turn in range(turns):
+        mood = MOODS[turn % len(MOODS)]
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        history_tokens = sum(estimate_tokens(m['content']) for m in conversation.render())
+
+        start = time.perf_counter()
+        first_token = None
+        chunks = []
+        for delta in backend.chat_stream(question, conversation, mood):
+            if first_token is None:
+                first_token = (time.perf_counter() - start) * 1000
+            chunks.append(delta)
+        conversation.add_exchange(question, ''.join(chunks))
+
+        stats = backend.get_last_stats(conversation)
+        results.append(stats['prompt_eval_ms'])
+        print(f"{turn + 1:>4} {history_tokens:>12} {stats['prompt_eval_count']:>16} "
+              f"{stats['prompt_eval_ms']:>15.0f} {first_token or 0:>15.0f}")
+
+    if len(results) >= 4:
+        # Skip turn 1: it evaluates the full system prompt
+        half = len(results) // 2
+        early = sum(results[1:half]) / max(1, half - 1)
+        late = sum(results[half:]) / (len(results) - half)
+        print(f"\nMean prompt-eval: {early:.0f} ms (early turns) vs {late:.0f} ms (late turns)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ollama prompt cache benchmark")
+    parser.add_argument('--turns', type=int, default=12)
+    parser.add_argument('--model', default=None, help="Ollama model (default: from config.json)")
+    args = parser.parse_args()
+    run(args.turns, args.model)
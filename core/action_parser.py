@@ -0,0 +1,139 @@
+"""
+Incremental Action Tag Parser
+Pulls [ACTION: param] tags out of LLM output in a single pass, including
+while the response is still streaming in
+"""
+
+import re
+
+
+# Tag name -> (action type for SystemActions.execute_action, param key).
+# Adding a tag here is all it takes; parsing cost doesn't depend on the
+# number of tags.
+ACTION_TAGS = {
+    'OPEN_APP': ('open_app', 'app'),
+    'OPEN_FOLDER': ('open_folder', 'folder'),
+    'OPEN_FILE': ('open_file', 'path'),
+    'YOUTUBE': ('youtube', 'query'),
+    'PLAY_MUSIC': ('play_music', 'query'),
+    'GOOGLE': ('google', 'query'),
+    'OPEN_WEBSITE': ('open_website', 'url'),
+    'SEARCH_FILES': ('search_files', 'query'),
+    'PLAY_MEDIA': ('play_media', 'search_query'),
+    'GET_DATETIME': ('get_datetime', None),
+}
+
+# Contents of a tag, between the brackets: NAME or NAME: param
+TAG_BODY = re.compile(r'\s*([A-Za-z_]+)\s*(?::\s*(.*?))?\s*$', re.DOTALL)
+
+# Give up on a '[' that isn't closed within this many characters
+MAX_TAG_LENGTH = 200
+
+
+class ActionTagParser:
+    """
+    Streaming tokenizer for action tags
+
+    feed() takes chunks of a response in order and returns the display text
+    and the actions completed by that chunk. An action is reported as soon
+    as its closing ']' arrives. Text inside a tag that isn't closed yet is
+    held back; brackets that turn out not to be known tags are passed
+    through unchanged.
+    """
+
+    def __init__(self, tags=None):
+        self.tags = ACTION_TAGS if tags is None else tags
+        self.pending = ""
+
+    def feed(self, chunk):
+        """
+        Returns:
+            tuple: (clean_text, actions) for this chunk
+        """
+        text = []
+        actions = []
+        data = self.pending + chunk
+        self.pending = ""
+        position = 0
+
+        while True:
+            start = data.find('[', position)
+            if start == -1:
+                text.append(data[position:])
+                break
+            text.append(data[position:start])
+
+            end = data.find(']', start + 1)
+            if end == -1:
+                if len(data) - start > MAX_TAG_LENGTH:
+                    # Not a tag after all - release the bracket as text
+                    text.append('[')
+                    position = start + 1
+                    continue
+                # Might still become a tag: wait for more input
+                self.pending = data[start:]
+                break
+
+            action = self._parse_tag(data[start + 1:end])
+            if action:
+                actions.append(action)
+                position = end + 1
+            else:
+                text.append('[')
+                position = start + 1
+
+        return ''.join(text), actions
+
+    def close(self):
+        """End of stream: returns any held-back text"""
+        rest = self.pending
+        self.pending = ""
+        return rest
+
+    def _parse_tag(self, body):
+        """Action dict for the text between brackets, or None"""
+        match = TAG_BODY.match(body)
+        if not match:
+            return None
+
+        tag = self.tags.get(match.group(1).upper())
+        if not tag:
+            return None
+
+        action_type, param_key = tag
+        param = (match.group(2) or "").strip()
+        if param_key is None:
+            return {'type': action_type, 'params': {}}
+        if not param:
+            return None
+        return {'type': action_type, 'params': {param_key: param}}
+
+
+def parse_actions(text):
+    """Extract action tags from a complete response
+
+    Returns:
+        tuple: (actions, clean_text)
+    """
+    parser = ActionTagParser()
+    clean_text, actions = parser.feed(text)
+    clean_text += parser.close()
+    return actions, clean_text.strip()
+
+
+def strip_action_tags(deltas, on_action):
+    """
+    Filter a delta stream: yields display text, calls on_action(action)
+    for each tag the moment it is complete
+    """
+    parser = ActionTagParser()
+    for delta in deltas:
+        text, actions = parser.feed(delta)
+        for action in actions:
+            on_action(action)
+        if text:
+            yield text
+
+    rest = parser.close()
+    if rest:
+        yield rest
@@ -0,0 +1,323 @@
+"""
+Acoustic Echo Cancellation
+Removes the assistant's own voice, as picked up by the microphone, from the
+capture stream. TTSHandler hands over the audio it starts playing; an
+adaptive filter learns the speaker-to-microphone echo path from it and
+subtracts the predicted echo before samples reach the ring buffer, so
+barge-in and speech recognition hear (mostly) only the user.
+"""
+
+import time
+
+import numpy as np
+
+from core.audio_capture import FRAME_SAMPLES
+
+
+def resample(samples, rate, target_rate):
+    """Linear-interpolation resampling (plenty for an echo reference)"""
+    if rate == target_rate:
+        return samples.astype(np.float32)
+    count = int(len(samples) * target_rate / rate)
+    positions = np.arange(count) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class FrequencyDomainFilter:
+    """
+    Partitioned-block frequency-domain NLMS (multi-delay filter)
+
+    The echo path is modelled as `partitions` consecutive blocks of `block`
+    taps. Each call filters one block with overlap-save FFTs of twice the
+    block size, so a long filter costs a few small FFTs per block instead
+    of a multiply-add per tap per sample as in time-domain NLMS. The step
+    is normalised per frequency bin by the smoothed reference power.
+
+    The step is also scaled by the estimated share of residual echo in the
+    error, as in Speex's MDF canceller: the part of the error power that
+    rises and falls with the echo estimate is echo the filter hasn't
+    learned yet; the rest is the user (or noise), which the filter must
+    not adapt to. Double talk therefore slows adaptation by itself. Until
+    `warmup` blocks have been adapted the estimate can't be trusted, and the
+    plain step is used.
+    """
+
+    def __init__(self, block, partitions, step=0.5, smoothing=0.9, regularization=1e-3, warmup=50):
+        """
+        Args:
+            block: Samples per block (and taps per partition)
+            partitions: Filter length in blocks
+            step: Largest adaptation step (0-1; larger converges faster but noisier)
+            smoothing: Weight of the old value in the power estimates
+            regularization: Added to the power so silent bins don't blow up
+            warmup: Blocks adapted at the plain step
+        """
+        self.block = block
+        self.partitions = partitions
+        self.step = step
+        self.smoothing = smoothing
+        self.regularization = regularization
+        self.warmup = warmup
+
+        bins = block + 1
+        self.weights = np.zeros((partitions, bins), dtype=np.complex128)
+        # Reference spectra, newest block first
+        self.spectra = np.zeros((partitions, bins), dtype=np.complex128)
+        self.power = np.zeros(bins)
+        self.previous = np.zeros(block)
+
+        self.adapted = 0
+        # Smoothed error and echo power spectra, and the covariance of their
+        # fluctuations; leak = residual echo / echo estimate
+        self.error_power = np.zeros(bins)
+        self.echo_power = np.zeros(bins)
+        self.covariance = 0.0
+        self.variance = 0.0
+        self.leak = 1.0
+
+    def process(self, reference, mic, adapt=True):
+        """
+        Filter one block
+
+        Args:
+            reference: `block` samples of the played audio
+            mic: `block` samples of microphone audio
+            adapt: Update the filter (off while the reference is silent)
+
+        Returns:
+            mic with the estimated echo subtracted
+        """
+        spectrum = np.fft.rfft(np.concatenate((self.previous, reference)))
+        self.previous = reference
+        self.spectra[1:] = self.spectra[:-1]
+        self.spectra[0] = spectrum
+        self.power = self.smoothing * self.power + (1 - self.smoothing) * np.abs(spectrum) ** 2
+
+        # Overlap-save: the second half is the linear convolution
+        echo = np.fft.irfft(np.sum(self.spectra * self.weights, axis=0))[self.block:]
+        error = mic - echo
+        if not adapt:
+            return error
+
+        padding = np.zeros(self.block)
+        error_spectrum = np.fft.rfft(np.concatenate((padding, error)))
+        step = self.step * self.step_scale(
+            np.abs(error_spectrum) ** 2,
+            np.abs(np.fft.rfft(np.concatenate((padding, echo)))) ** 2
+        )
+
+        normalizer = self.power * self.partitions + self.regularization
+        gradient = np.conj(self.spectra) * (step * error_spectrum / normalizer)
+        # Keep each partition to `block` taps so the update models a
+        # linear, not circular, convolution
+        taps = np.fft.irfft(gradient, axis=1)[:, :self.block]
+        self.weights += np.fft.rfft(taps, n=2 * self.block, axis=1)
+        self.adapted += 1
+        return error
+
+    def step_scale(self, error_power, echo_power):
+        """Fraction of the error thought to be residual echo, per bin (0-1)"""
+        error_change = error_power - self.error_power
+        echo_change = echo_power - self.echo_power
+        self.error_power = self.smoothing * self.error_power + (1 - self.smoothing) * error_power
+        self.echo_power = self.smoothing * self.echo_power + (1 - self.smoothing) * echo_power
+        self.covariance = self.smoothing * self.covariance + (1 - self.smoothing) * np.sum(error_change * echo_change)
+        self.variance = self.smoothing * self.variance + (1 - self.smoothing) * np.sum(echo_change ** 2)
+        if self.variance > 0:
+            self.leak = min(1.0, max(0.005, self.covariance / self.variance))
+
+        if self.adapted < self.warmup:
+            return 1.0
+        residual = 3 * self.leak * echo_power
+        return np.minimum(1.0, residual / (error_power + self.regularization))
+
+
+class EchoCanceller:
+    """
+    Echo cancellation stage for AudioCapture
+
+    play() and stop() are called by TTSHandler around each playback;
+    process() runs in the capture callback on every block of samples. While
+    nothing has played for longer than the filter covers, process() returns
+    its input untouched, so the stage is free when the assistant is quiet.
+
+    The reference is placed on the capture stream's own sample clock: its
+    first sample lines up with the microphone sample being captured when
+    play() is called, plus `delay`. After that both advance by sample
+    count. Where playback really starts still varies by a few milliseconds
+    from one play() to the next (callback and mixer timing), which would
+    make a trained filter start over. So for the first `align_seconds` of
+    each playback the filter only cancels; then the echo's lag is measured
+    by cross-correlation (GCC-PHAT) and the reference is moved to where the
+    filter expects it.
+
+    The filter only adapts while the recent reference (over the span the
+    filter covers) is not silent, and a block it would make louder is
+    passed through as captured.
+    """
+
+    def __init__(self, sample_rate, block=FRAME_SAMPLES, filter_seconds=0.25, delay=0.0,
+                 step=0.5, warmup=1.5, align_seconds=0.2):
+        """
+        Args:
+            sample_rate: Capture rate in Hz
+            block: Samples per filter block (the capture frame size means no
+                   added latency)
+            filter_seconds: Length of echo path the filter can model
+            delay: Seconds of playback latency to skip before the filter
+            step: Largest NLMS adaptation step
+            warmup: Seconds of playback adapted at the full step, once
+            align_seconds: Audio at the start of each playback used to
+                           re-measure the echo's lag
+        """
+        self.sample_rate = sample_rate
+        self.block = block
+        self.delay = int(delay * sample_rate)
+        partitions = max(1, int(np.ceil(filter_seconds * sample_rate / block)))
+        self.filter = FrequencyDomainFilter(
+            block, partitions, step=step, warmup=int(warmup * sample_rate / block)
+        )
+        self.taps = partitions * block
+        self.align_samples = int(align_seconds * sample_rate)
+
+        # (capture position of the first sample, float samples); replaced
+        # whole by play()/stop(), so the callback always sees a consistent pair
+        self.reference = None
+        # Microphone samples received, and when the last of them arrived
+        self.position = 0
+        self.received_at = time.monotonic()
+        self._pending = np.zeros(0, dtype=np.int16)
+        # Microphone audio collected for realign(), with the reference it
+        # belongs to and the capture position it starts at
+        self._alignment = None
+
+    @classmethod
+    def from_config(cls, config, sample_rate):
+        """Build from the "aec" section of config.json (None if disabled)"""
+        aec_config = (config or {}).get('aec', {})
+        if not aec_config.get('enabled', True):
+            return None
+        return cls(
+            sample_rate,
+            filter_seconds=aec_config.get('filter_seconds', 0.25),
+            delay=aec_config.get('delay', 0.0),
+            step=aec_config.get('step', 0.5),
+            warmup=aec_config.get('warmup', 1.5),
+            align_seconds=aec_config.get('align_seconds', 0.2)
+        )
+
+    def play(self, samples, sample_rate):
+        """
+        Playback of `samples` is starting now
+
+        Args:
+            samples: Mono 16-bit PCM values (int or float array), at sample_rate
+        """
+        samples = np.asarray(samples, dtype=np.float32) / 32768.0
+        reference = resample(samples, sample_rate, self.sample_rate)
+        elapsed = int((time.monotonic() - self.received_at) * self.sample_rate)
+        reference = (self.position + elapsed + self.delay, reference)
+        if self.filter.adapted >= self.filter.warmup:
+            self._alignment = {'reference': reference, 'position': None, 'mic': []}
+        self.reference = reference
+
+    def stop(self):
+        """
+        Playback stopped early
+
+        The reference is cut at the current position; the filter keeps
+        running on silence until the echo tail has died away.
+        """
+        reference = self.reference
+        if reference is not None:
+            start, samples = reference
+            self._alignment = None
+            self.reference = (start, samples[:max(0, self.position - start)])
+
+    def realign(self, alignment):
+        """
+        Move the reference so the echo's lag matches the trained filter
+
+        Returns:
+            The new reference (the old one if there is no clear peak)
+        """
+        start, samples = reference = alignment['reference']
+        mic = np.concatenate(alignment['mic'])
+        played = self.segment(reference, alignment['position'], len(mic))
+
+        # GCC-PHAT, partly whitened: full whitening sharpens the peak but
+        # lets near-empty bins add spurious ones
+        size = 2 * len(mic)
+        cross = np.fft.rfft(mic, size) * np.conj(np.fft.rfft(played, size))
+        correlation = np.fft.irfft(cross / (np.abs(cross) ** 0.7 + 1e-12), size)
+        # Lags from -taps to taps (mic behind the reference is positive)
+        lags = np.abs(np.concatenate((correlation[-self.taps:], correlation[:self.taps])))
+        lag = int(np.argmax(lags)) - self.taps
+        if lags.max() < 5 * np.median(lags):
+            return reference
+
+        impulse = np.fft.irfft(self.filter.weights, axis=1)[:, :self.block].ravel()
+        shift = lag - int(np.argmax(np.abs(impulse)))
+        if not shift:
+            return reference
+        reference = (start + shift, samples)
+        if self.reference is alignment['reference']:
+            self.reference = reference
+        return reference
+
+    def segment(self, reference, position, count):
+        """`count` reference samples from capture position on (zeros outside)"""
+        start, samples = reference
+        out = np.zeros(count)
+        first = max(position, start)
+        last = min(position + count, start + len(samples))
+        if first < last:
+            out[first - position:last - position] = samples[first - start:last - start]
+        return out
+
+    def process(self, samples):
+        """
+        Cancel echo in a block of captured int16 samples
+
+        Returns:
+            int16 samples; with a block size that isn't the callback size,
+            up to one block is held back until the next call
+        """
+        self.position += len(samples)
+        self.received_at = time.monotonic()
+        reference = self.reference
+        if reference is not None and self.position > reference[0] + len(reference[1]) + self.taps:
+            # Played out, and the echo tail has passed through the filter
+            self.reference = reference = None
+
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        if reference is None:
+            self._pending = np.zeros(0, dtype=np.int16)
+            return samples
+
+        blocks = len(samples) // self.block
+        position = self.position - len(samples)
+        out = np.empty(blocks * self.block, dtype=np.int16)
+        for index in range(blocks):
+            begin = index * self.block
+            mic = samples[begin:begin + self.block] / 32768.0
+
+            alignment = self._alignment
+            aligning = alignment is not None and alignment['reference'] is reference
+            if aligning:
+                if alignment['position'] is None:
+                    alignment['position'] = position + begin
+                alignment['mic'].append(mic)
+                if len(alignment['mic']) * self.block >= self.align_samples:
+                    self._alignment = None
+                    reference = self.realign(alignment)
+
+            far = self.segment(reference, position + begin, self.block)
+            active = np.any(self.segment(reference, position + begin - self.taps, self.taps + self.block))
+            error = self.filter.process(far, mic, adapt=active and not aligning)
+            if np.dot(error, error) > np.dot(mic, mic):
+                error = mic
+            out[begin:begin + self.block] = np.clip(error * 32768.0, -32768, 32767)
+        self._pending = samples[blocks * self.block:]
+        return out
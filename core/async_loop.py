@@ -0,0 +1,64 @@
+"""
+Dedicated asyncio Event Loop Thread
+Runs the async LLM clients on one long-lived loop so sync code (the Qt
+worker thread, the speech pipeline) can submit, stream and cancel requests
+"""
+
+import asyncio
+import threading
+
+
+class AsyncLoopThread:
+    """An asyncio event loop running forever on a daemon thread"""
+
+    def __init__(self, name="llm-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive():
+            self.thread.start()
+            self._ready.wait()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop
+
+        Returns:
+            concurrent.futures.Future; cancel() on it cancels the asyncio task
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and wait for its result"""
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, agen):
+        """
+        Consume an async generator from sync code
+
+        Yields the generator's items. If the sync caller stops early (break,
+        close, exception), the async generator is closed on the loop, which
+        cancels any request it has in flight.
+        """
+        try:
+            while True:
+                try:
+                    item = self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            try:
+                self.run(agen.aclose(), timeout=5)
+            except Exception:
+                pass
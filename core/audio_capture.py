@@ -0,0 +1,200 @@
+"""
+Persistent Microphone Capture
+One PyAudio input stream, opened once, writes 16-bit mono audio into a ring
+buffer. Listening, voice activity and interrupt detection read from the
+buffer instead of re-opening the microphone, so nothing spoken between
+their calls is lost.
+"""
+
+import threading
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+# 30 ms; a frame size the speech recognizers and WebRTC VAD all accept
+FRAME_SAMPLES = 480
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size ring of int16 samples with one writer and many readers
+
+    Positions are absolute sample counts since capture started
+    (`write_index` only grows), so readers keep their own cursor and never
+    coordinate with each other. The writer stores samples before advancing
+    write_index; a reader copies, then re-checks write_index to drop any
+    samples the writer overwrote meanwhile. No locks are taken.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.write_index = 0
+
+    def write(self, samples):
+        """Append samples (writer thread only)"""
+        samples = samples[-self.capacity:]
+        count = len(samples)
+        start = self.write_index % self.capacity
+        first = min(count, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:count - first] = samples[first:]
+        self.write_index += count
+
+    def oldest_index(self):
+        return max(0, self.write_index - self.capacity)
+
+    def read(self, start, end):
+        """
+        Copy of the samples between two absolute positions
+
+        Returns:
+            (start, samples): start moves forward if the requested samples
+            were already overwritten; end is clamped to what was written
+        """
+        end = min(end, self.write_index)
+        start = max(start, self.oldest_index())
+        if start >= end:
+            return end, np.zeros(0, dtype=np.int16)
+
+        first = start % self.capacity
+        count = end - start
+        if first + count <= self.capacity:
+            samples = self.data[first:first + count].copy()
+        else:
+            samples = np.concatenate((self.data[first:], self.data[:first + count - self.capacity]))
+
+        # The writer may have lapped us while copying
+        overwritten = self.oldest_index() - start
+        if overwritten > 0:
+            return start + overwritten, samples[overwritten:]
+        return start, samples
+
+
+class AudioReader:
+    """A cursor into the capture buffer; each consumer has its own"""
+
+    def __init__(self, capture, position=None):
+        self.capture = capture
+        self.position = capture.buffer.write_index if position is None else position
+
+    def read(self, count, timeout=None):
+        """
+        Next `count` samples, waiting for them to be captured
+
+        Returns:
+            int16 array, or None on timeout. If the reader fell more than
+            the buffer's length behind, the oldest audio is skipped.
+        """
+        if not self.capture.wait_for(self.position + count, timeout):
+            return None
+        self.position, samples = self.capture.buffer.read(self.position, self.position + count)
+        self.position += len(samples)
+        return samples
+
+    def frames(self, frame_samples=FRAME_SAMPLES, timeout=None):
+        """Yield consecutive frames until a read times out"""
+        while True:
+            frame = self.read(frame_samples, timeout)
+            if frame is None:
+                return
+            yield frame
+
+
+class AudioCapture:
+    """
+    Long-lived microphone stream feeding an AudioRingBuffer
+
+    PyAudio calls back on its own thread with each block of samples; the
+    callback only copies them into the ring (through the echo canceller,
+    if there is one) and wakes waiting readers.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_samples=FRAME_SAMPLES,
+                 buffer_seconds=30, device_index=None, echo_canceller=None):
+        """
+        Args:
+            sample_rate: Capture rate in Hz (16 kHz suits speech models)
+            frame_samples: Samples per PyAudio callback
+            buffer_seconds: Audio kept for readers that fall behind
+            device_index: PyAudio input device; None for the default
+            echo_canceller: EchoCanceller applied before the ring buffer
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.device_index = device_index
+        self.echo_canceller = echo_canceller
+        self.buffer = AudioRingBuffer(int(sample_rate * buffer_seconds))
+
+        self._new_data = threading.Condition()
+        self._audio = None
+        self._stream = None
+
+    @classmethod
+    def from_config(cls, config, echo_canceller=None):
+        """Build from the "stt" section of config.json"""
+        stt_config = (config or {}).get('stt', {})
+        return cls(
+            buffer_seconds=stt_config.get('buffer_seconds', 30),
+            device_index=stt_config.get('device_index'),
+            echo_canceller=echo_canceller
+        )
+
+    def start(self):
+        import pyaudio
+
+        if self._stream is not None:
+            return self
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.frame_samples,
+            stream_callback=self._callback
+        )
+        self._stream.start_stream()
+        print(f"🎙️ Microphone capture started ({self.sample_rate} Hz)")
+        return self
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._audio is not None:
+            self._audio.terminate()
+            self._audio = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        if self.echo_canceller is not None:
+            samples = self.echo_canceller.process(samples)
+        self.buffer.write(samples)
+        with self._new_data:
+            self._new_data.notify_all()
+        return None, pyaudio.paContinue
+
+    def wait_for(self, position, timeout=None):
+        """Block until `position` samples have been captured; False on timeout"""
+        with self._new_data:
+            return self._new_data.wait_for(lambda: self.buffer.write_index >= position, timeout)
+
+    def reader(self, lookback=0.0, since=None):
+        """
+        A new reader starting `lookback` seconds in the past
+
+        Starting slightly back (pre-roll) means a reader created just after
+        the user starts talking still gets the first syllable.
+
+        Args:
+            since: Capture position to count back from instead of now
+        """
+        start = self.buffer.write_index if since is None else min(since, self.buffer.write_index)
+        position = max(self.buffer.oldest_index(), start - int(lookback * self.sample_rate))
+        return AudioReader(self, position)
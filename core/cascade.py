@@ -0,0 +1,170 @@
+"""
+Cascade Routing
+A small local model answers first; complex or low-confidence queries are
+escalated to a larger model. A cheap classifier escalates up front, and the
+small model can hand a query on itself by replying with ESCALATE_TAG.
+"""
+
+import re
+import threading
+
+
+ESCALATE_TAG = "[ESCALATE]"
+
+# Appended to the small model's system prompt when self-check is on
+SELF_CHECK_INSTRUCTION = f"""**WHEN TO HAND OVER:**
+If a message needs detailed knowledge, reasoning, math, code or a long answer, or you are not confident you can answer it well, reply with exactly {ESCALATE_TAG} and nothing else. A more capable assistant will answer instead. Answer greetings, small talk and simple questions yourself."""
+
+# Words that suggest a query needs more than small talk
+COMPLEX_KEYWORDS = re.compile(
+    r"\b(explain|why|how (?:does|do|can|would|should)|compare|difference|analy[sz]e|"
+    r"calculate|solve|prove|debug|code|program|script|function|algorithm|"
+    r"write (?:a|an|me)|step by step|summari[sz]e|translate|plan|recommend|pros and cons)\b"
+)
+CODE_MARKERS = re.compile(r"```|\bdef |\bclass |[{};]|=>|\(\)")
+
+
+class QueryClassifier:
+    """
+    Guesses whether a query is beyond the small model
+
+    Pure heuristics (length, keywords, code, several questions), so it costs
+    microseconds; anything it lets through still gets the self-check.
+    """
+
+    def __init__(self, max_words=25):
+        self.max_words = max_words
+
+    def classify(self, text):
+        """
+        Returns:
+            (escalate, reason)
+        """
+        lowered = text.lower()
+        words = len(lowered.split())
+        if words > self.max_words:
+            return True, f"long query ({words} words)"
+        if CODE_MARKERS.search(text):
+            return True, "contains code"
+        keyword = COMPLEX_KEYWORDS.search(lowered)
+        if keyword:
+            return True, f"complex keyword '{keyword.group(0)}'"
+        if lowered.count('?') > 1:
+            return True, "several questions"
+        return False, "simple query"
+
+
+class EscalationCheck:
+    """
+    Watches the start of the small model's stream for ESCALATE_TAG
+
+    feed() holds text back until it can tell whether the reply is the tag,
+    so the tag never reaches the user.
+    """
+
+    def __init__(self, tag=ESCALATE_TAG):
+        self.tag = tag
+        self.buffer = ""
+        self.decided = False
+
+    def feed(self, delta):
+        """
+        Returns:
+            (text to pass on, escalate)
+        """
+        if self.decided:
+            return delta, False
+        self.buffer += delta
+        head = self.buffer.lstrip().upper()
+        if head.startswith(self.tag):
+            return "", True
+        if self.tag.startswith(head):
+            # Could still turn into the tag
+            return "", False
+        self.decided = True
+        text, self.buffer = self.buffer, ""
+        return text, False
+
+    def flush(self):
+        """Text still held back when the stream ended"""
+        self.decided = True
+        text, self.buffer = self.buffer, ""
+        return text
+
+
+class CascadeRouter:
+    """
+    Cascade settings and routing statistics
+
+    Every turn is recorded with its route: 'small' (the small model
+    answered) or 'escalated' (with the reason), its latency, and for
+    self-check escalations the time spent on the small model first. The
+    snapshot estimates the latency saved by comparing both routes.
+    """
+
+    def __init__(self, escalate_to="auto", self_check=True, max_words=25):
+        """
+        Args:
+            escalate_to: LLM mode that answers escalated queries ("auto",
+                         "ollama", "groq" or "gemini")
+            self_check: Let the small model escalate with ESCALATE_TAG
+            max_words: Longer queries go straight to the large model
+        """
+        self.escalate_to = escalate_to
+        self.self_check = self_check
+        self.classifier = QueryClassifier(max_words)
+
+        self.counts = {}
+        self.total_ms = {'small': 0.0, 'escalated': 0.0}
+        self.turns = {'small': 0, 'escalated': 0}
+        self.wasted_ms = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from config['llm']['cascade']"""
+        cascade_config = config.get('llm', {}).get('cascade', {})
+        return cls(
+            escalate_to=cascade_config.get('escalate_to', "auto"),
+            self_check=cascade_config.get('self_check', True),
+            max_words=cascade_config.get('max_words', 25)
+        )
+
+    def classify(self, text):
+        return self.classifier.classify(text)
+
+    def record(self, route, reason, total_ms, wasted_ms=0.0):
+        """Log one routing decision"""
+        with self._lock:
+            self.counts[reason] = self.counts.get(reason, 0) + 1
+            self.turns[route] += 1
+            self.total_ms[route] += total_ms
+            self.wasted_ms += wasted_ms
+            turns = sum(self.turns.values())
+            rate = self.turns['escalated'] / turns
+
+        detail = f", {wasted_ms:.0f} ms on the small model first" if wasted_ms else ""
+        print(f"🪜 Cascade: {route} ({reason}) in {total_ms:.0f} ms{detail}; "
+              f"escalation rate {rate:.0%} over {turns} turns")
+
+    def snapshot(self):
+        """Routing statistics, as a JSON-friendly dict"""
+        with self._lock:
+            turns = sum(self.turns.values())
+            mean_ms = {
+                route: self.total_ms[route] / count if count else None
+                for route, count in self.turns.items()
+            }
+            saved_ms = None
+            if mean_ms['small'] is not None and mean_ms['escalated'] is not None:
+                # What the small-model turns would have cost on the large model
+                saved_ms = self.turns['small'] * (mean_ms['escalated'] - mean_ms['small']) - self.wasted_ms
+            return {
+                'turns': turns,
+                'escalated': self.turns['escalated'],
+                'escalation_rate': self.turns['escalated'] / turns if turns else None,
+                'reasons': dict(self.counts),
+                'mean_ms': mean_ms,
+                'wasted_ms': self.wasted_ms,
+                'estimated_saved_ms': saved_ms,
+            }
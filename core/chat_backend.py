@@ -0,0 +1,44 @@
+"""
+Shared LLM Backend Behaviour
+How every backend lays out a request, and the blocking/async wrappers
+around its token streams
+"""
+
+
+class ChatBackend:
+    """
+    Base class for the LLM backends
+
+    Requests keep a stable prefix: the system prompt, then the shared
+    conversation rendered within history_budget() tokens, then this turn's
+    message with the mood hint appended. The hint is never saved to
+    history, so everything before it stays byte-identical from turn to turn
+    and backends can reuse their prompt (KV) cache.
+
+    Subclasses set `context_budget` (and `system_prompt`, for
+    build_messages()) and implement chat_stream() and achat_stream().
+    """
+
+    def chat(self, user_input, conversation=None, mood_context=""):
+        return ''.join(self.chat_stream(user_input, conversation, mood_context))
+
+    async def achat(self, user_input, conversation=None, mood_context=""):
+        return ''.join([delta async for delta in self.achat_stream(user_input, conversation, mood_context)])
+
+    def add_mood_suffix(self, user_input, mood_context):
+        """Append the mood hint to this turn's message only"""
+        if mood_context:
+            return f"{user_input}\n\n[Context: {mood_context}]"
+        return user_input
+
+    def history_budget(self):
+        """History tokens to send with each request"""
+        return self.context_budget
+
+    def build_messages(self, user_input, conversation=None, mood_context=""):
+        """Chat messages for a request, in the stable-prefix order"""
+        messages = [{'role': 'system', 'content': self.system_prompt}]
+        if conversation is not None:
+            messages.extend(conversation.render(self.history_budget()))
+        messages.append({'role': 'user', 'content': self.add_mood_suffix(user_input, mood_context)})
+        return messages
@@ -0,0 +1,280 @@
+"""
+Token-aware Context Window
+Keeps conversation history inside a token budget and folds older turns
+into a rolling summary on a background thread
+"""
+
+import math
+import threading
+
+
+def estimate_tokens(text):
+    """
+    Rough token count for a piece of text
+
+    Llama/GPT style tokenizers average about 4 characters per token for
+    English; this overestimates a little for Hindi/Punjabi, which is the
+    safe direction for a budget.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / 4)
+
+
+# Per-message overhead (role markers, separators) in chat templates
+MESSAGE_OVERHEAD = 4
+
+# History budget (tokens, excluding the system prompt) per backend.
+# Ollama's default context is small and prompt processing is the local
+# bottleneck, so it gets the tightest budget.
+DEFAULT_CONTEXT_BUDGETS = {
+    'ollama': 1500,
+    'ollama_small': 1000,
+    'llamacpp': 2048,
+    'groq': 6000,
+    'gemini': 8000,
+}
+
+
+def get_context_budget(config, backend_name):
+    """History token budget for a backend, from config['llm']['context_budget']"""
+    budgets = config.get('llm', {}).get('context_budget', {})
+    return budgets.get(backend_name, DEFAULT_CONTEXT_BUDGETS.get(backend_name, 2048))
+
+
+class ContextWindow:
+    """
+    Conversation history bounded by a token budget
+
+    Messages are stored with their token count computed once. When the
+    history grows past `budget`, the oldest turns are folded out until it is
+    back under `low_water` of the budget. Folding in large batches keeps
+    the rendered prefix unchanged for many turns in between, which is what
+    lets backends reuse their prompt cache.
+
+    Folded turns are summarized on a background thread by `summarizer`,
+    a function (previous_summary, messages) -> new_summary. Until the
+    summary is ready, render() keeps using the folded turns as long as
+    they fit, so callers never wait on summarization.
+
+    One window can serve several backends with different budgets: render()
+    with a smaller budget returns that budget's own summary plus the newest
+    turns, and moves its starting point forward in the same large batches.
+    The turns it moves past are summarized for that budget the same way,
+    so a backend with a small budget still remembers them.
+    """
+
+    def __init__(self, budget=2048, summarizer=None, low_water=0.6):
+        self.budget = budget
+        self.summarizer = summarizer
+        self.low_water = low_water
+
+        self.messages = []
+        self.summary = ""
+        self.summary_tokens = 0
+
+        self._folded = []
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+        # Sequence number of the next message
+        self._next_seq = 0
+        # Per budget smaller than the window's own: the first message it
+        # renders and the summary of everything before that
+        self._views = {}
+
+    def add(self, role, content):
+        """Append a message to the history"""
+        with self._lock:
+            self.messages.append({
+                'role': role,
+                'content': content,
+                'tokens': estimate_tokens(content) + MESSAGE_OVERHEAD,
+                'seq': self._next_seq
+            })
+            self._next_seq += 1
+            self._fold_if_needed()
+
+    def add_exchange(self, user_input, response):
+        """Append a user message and the assistant's response"""
+        self.add('user', user_input)
+        self.add('assistant', response)
+
+    def clear(self):
+        with self._lock:
+            self.messages = []
+            self._folded = []
+            self.summary = ""
+            self.summary_tokens = 0
+            self._views = {}
+
+    def recent(self, count):
+        """The newest `count` messages as {'role', 'content'} dicts"""
+        with self._lock:
+            messages = self.messages[-count:] if count else []
+            return [{'role': message['role'], 'content': message['content']} for message in messages]
+
+    @property
+    def total_tokens(self):
+        return self.summary_tokens + sum(message['tokens'] for message in self.messages)
+
+    def render(self, budget=None):
+        """
+        Messages to send with the next request, oldest first
+
+        The rolling summary (if any) comes first as a system message,
+        followed by the newest messages that fit in `budget` tokens.
+
+        Returns:
+            List of {'role', 'content'} dicts
+        """
+        budget = self.budget if budget is None else budget
+        with self._lock:
+            candidates = self._folded + self.messages
+            if budget < self.budget:
+                view = self._window_for(budget)
+                candidates = [message for message in candidates if message['seq'] >= view['start']]
+                summary, summary_tokens = view['summary'], view['summary_tokens']
+            else:
+                summary, summary_tokens = self.summary, self.summary_tokens
+            remaining = budget - summary_tokens
+
+        selected = []
+        for message in reversed(candidates):
+            if message['tokens'] > remaining:
+                break
+            remaining -= message['tokens']
+            selected.append({'role': message['role'], 'content': message['content']})
+        selected.reverse()
+
+        # Never start the window on an assistant reply
+        while selected and selected[0]['role'] == 'assistant':
+            selected.pop(0)
+
+        if summary:
+            selected.insert(0, {
+                'role': 'system',
+                'content': f"Summary of the earlier conversation: {summary}"
+            })
+        return selected
+
+    def _window_for(self, budget):
+        """
+        The view of the conversation for a smaller budget (lock must be held)
+
+        A view is a dict: 'start' (seq of the first message it renders) and
+        its own 'summary' of everything before that. The start only moves
+        forward (by whole turns, down to `low_water` of the budget) once the
+        messages no longer fit, so the rendered prefix stays the same for
+        many turns in between; the turns it moves past are summarized into
+        the view in the background. A new view starts from the window's
+        summary.
+        """
+        view = self._views.get(budget)
+        if view is None:
+            view = self._views[budget] = {
+                'start': 0,
+                'summary': self.summary,
+                'summary_tokens': self.summary_tokens,
+                'pending': [],
+                'summarizing': False,
+            }
+
+        window = [message for message in self._folded + self.messages if message['seq'] >= view['start']]
+        total = sum(message['tokens'] for message in window)
+        if total > budget - view['summary_tokens']:
+            target = budget * self.low_water - view['summary_tokens']
+            skipped = []
+            while len(window) > 2 and total > target:
+                skipped.append(window.pop(0))
+                total -= skipped[-1]['tokens']
+                if window and window[0]['role'] == 'assistant':
+                    skipped.append(window.pop(0))
+                    total -= skipped[-1]['tokens']
+            view['start'] = window[0]['seq']
+            self._summarize_for_view(view, skipped)
+        return view
+
+    def _summarize_for_view(self, view, messages):
+        """Queue messages for a view's summary (lock must be held)"""
+        if not messages or not self.summarizer:
+            return
+        view['pending'].extend(messages)
+        if not view['summarizing']:
+            view['summarizing'] = True
+            threading.Thread(target=self._summarize_view, args=(view,), daemon=True).start()
+
+    def _summarize_view(self, view):
+        """Background thread: fold a view's skipped turns into its summary"""
+        while True:
+            with self._lock:
+                batch = list(view['pending'])
+                previous = view['summary']
+                if not batch:
+                    view['summarizing'] = False
+                    return
+
+            try:
+                summary = self.summarizer(previous, batch).strip()
+            except Exception as e:
+                print(f"⚠️ Could not summarize conversation: {e}")
+                summary = previous
+
+            with self._lock:
+                view['summary'] = summary
+                view['summary_tokens'] = estimate_tokens(summary) + MESSAGE_OVERHEAD if summary else 0
+                view['pending'] = view['pending'][len(batch):]
+
+    def _fold_if_needed(self):
+        """Move the oldest turns out of the window (lock must be held)"""
+        if self.total_tokens <= self.budget:
+            return
+
+        target = self.budget * self.low_water
+        folded = []
+        # Fold whole user/assistant turns, always keeping the latest one
+        while len(self.messages) > 2 and self.total_tokens > target:
+            folded.append(self.messages.pop(0))
+            if self.messages and self.messages[0]['role'] == 'assistant':
+                folded.append(self.messages.pop(0))
+
+        if not folded:
+            return
+
+        # Turns a smaller view still rendered leave it now; its own summary
+        # has to cover them
+        for view in self._views.values():
+            lost = [message for message in folded if message['seq'] >= view['start']]
+            if lost:
+                view['start'] = lost[-1]['seq'] + 1
+                self._summarize_for_view(view, lost)
+
+        if not self.summarizer:
+            # No summarizer: plain truncation
+            return
+
+        self._folded.extend(folded)
+        if not self._summarizing:
+            self._summarizing = True
+            threading.Thread(target=self._summarize_folded, daemon=True).start()
+
+    def _summarize_folded(self):
+        """Background thread: fold pending turns into the rolling summary"""
+        while True:
+            with self._lock:
+                batch = list(self._folded)
+                previous = self.summary
+                if not batch:
+                    self._summarizing = False
+                    return
+
+            try:
+                summary = self.summarizer(previous, batch).strip()
+            except Exception as e:
+                print(f"⚠️ Could not summarize conversation: {e}")
+                summary = previous
+
+            with self._lock:
+                self.summary = summary
+                self.summary_tokens = estimate_tokens(summary) + MESSAGE_OVERHEAD if summary else 0
+                self._folded = self._folded[len(batch):]
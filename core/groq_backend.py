@@ -1,48 +1,138 @@
-# Add this at the end of core/llm.py after GeminiBackend class
+import asyncio
 
-class GroqBackend:
+import httpx
+
+from core.chat_backend import ChatBackend
+from core.context import get_context_budget, estimate_tokens, MESSAGE_OVERHEAD
+from core.rate_limit import RateLimitScheduler
+from core.stream_worker import get_deadlines
+
+
+# Completion tokens counted against the quota before a response arrives
+EXPECTED_OUTPUT_TOKENS = 256
+# Room kept for the user's message (with the mood hint) when capping history
+USER_TURN_TOKENS = 256
+
+
+class GroqBackend(ChatBackend):
     """FREE & FAST LLM backend using Groq API"""
+    name = "groq"
+    
     def __init__(self, config, system_prompt):
         from groq import Groq
         
         api_key = config['llm']['groq_api_key']
-        self.client = Groq(api_key=api_key)
+        # base_url is only set to point at a compatible stand-in (benchmarks)
+        self.base_url = config['llm'].get('groq_base_url')
+        # 429s are handled by the rate-limit scheduler (a short, bounded wait)
+        # rather than the SDK's retries, which can sleep for up to a minute.
+        # Reads time out at the first-token deadline so a stuck request ends.
+        deadlines = get_deadlines(config, self.name)
+        self.timeout = httpx.Timeout(deadlines['total'], connect=5.0, read=deadlines['first_token'])
+        self.client = Groq(api_key=api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout)
+        self.api_key = api_key
+        # Created on first use, on the event loop that will drive it
+        self.async_client = None
         self.model = config['llm'].get('groq_model', 'llama-3.3-70b-versatile')  # Free fast model
         self.system_prompt = system_prompt
-        self.history = []
-        self.mood_context = ""
+        self.context_budget = get_context_budget(config, self.name)
+        self.max_tokens = 1024
+        self.rate_limiter = RateLimitScheduler.from_config(config, self.name)
     
-    def set_mood_context(self, mood_context):
-        """Set mood-specific context for empathetic responses"""
-        self.mood_context = mood_context
+    def history_budget(self):
+        """
+        History tokens a request can carry
+
+        The whole request (system prompt, history, this turn and the
+        expected answer) has to fit in one minute's token quota. The result
+        doesn't depend on the turn, so the rendered history stays stable.
+        """
+        fixed = (estimate_tokens(self.system_prompt) + 2 * MESSAGE_OVERHEAD
+                 + USER_TURN_TOKENS + EXPECTED_OUTPUT_TOKENS)
+        return max(0, min(self.context_budget, self.rate_limiter.token_capacity() - fixed))
     
-    def chat(self, user_input):
-        # Prepend mood context if available
-        enhanced_input = user_input
-        if self.mood_context:
-            enhanced_input = f"[Context: {self.mood_context}]\n{user_input}"
-        
-        # Build messages with system prompt
-        messages = [{"role": "system", "content": self.system_prompt}]
-        messages.extend(self.history)
-        messages.append({"role": "user", "content": enhanced_input})
+    def estimate_cost(self, messages):
+        """Tokens a request will count against the per-minute quota"""
+        prompt = sum(estimate_tokens(m['content']) + MESSAGE_OVERHEAD for m in messages)
+        return prompt + EXPECTED_OUTPUT_TOKENS
+    
+    def should_retry(self, error, attempt):
+        """After a 429, retry once if the quota is back within max_wait"""
+        if getattr(error, 'status_code', None) != 429:
+            return False
+        retry_after = self.rate_limiter.on_rate_limited(error.response.headers)
+        # The next acquire waits out the block
+        return attempt == 0 and retry_after <= self.rate_limiter.max_wait
+    
+    def chat_stream(self, user_input, conversation=None, mood_context=""):
+        """Yield response tokens as Groq streams the completion"""
+        messages = self.build_messages(user_input, conversation, mood_context)
         
         # Call Groq API (super fast!)
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1024
-        )
+        cost = self.estimate_cost(messages)
+        for attempt in range(2):
+            self.rate_limiter.acquire(cost)
+            try:
+                response = self.client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=self.max_tokens,
+                    stream=True
+                )
+                break
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+        
+        self.rate_limiter.update_from_headers(response.headers)
+        stream = response.parse()
+        
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    
+    async def achat_stream(self, user_input, conversation=None, mood_context=""):
+        """Async version of chat_stream()"""
+        if self.async_client is None:
+            from groq import AsyncGroq
+            self.async_client = AsyncGroq(
+                api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout
+            )
         
-        bot_response = response.choices[0].message.content
+        messages = self.build_messages(user_input, conversation, mood_context)
         
-        # Update history
-        self.history.append({"role": "user", "content": enhanced_input})
-        self.history.append({"role": "assistant", "content": bot_response})
+        cost = self.estimate_cost(messages)
+        for attempt in range(2):
+            wait = self.rate_limiter.reserve(cost)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                response = await self.async_client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=self.max_tokens,
+                    stream=True
+                )
+                break
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
         
-        # Keep history manageable
-        if len(self.history) > 20:
-            self.history = self.history[-20:]
+        self.rate_limiter.update_from_headers(response.headers)
+        stream = await response.parse()
         
-        return bot_response
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            # Closing the response tells Groq to stop generating
+            await stream.close()
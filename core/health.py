@@ -0,0 +1,163 @@
+"""
+Backend Health Monitor
+Probes connectivity and LLM backends in the background so that choosing a
+backend never has to wait on the network
+"""
+
+import socket
+import threading
+import time
+import urllib.request
+from enum import Enum
+
+
+class BackendState(Enum):
+    """Health of a probed target"""
+    UNKNOWN = "unknown"
+    UP = "up"
+    DEGRADED = "degraded"
+    DOWN = "down"
+
+
+def probe_tcp(host, port, timeout=3):
+    """Probe that succeeds if a TCP connection can be opened"""
+    def probe():
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+    return probe
+
+
+def probe_http(url, timeout=3):
+    """Probe that succeeds if the URL answers with a non-error status"""
+    def probe():
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+    return probe
+
+
+class HealthMonitor:
+    """
+    Keeps a cached up/degraded/down state per target
+
+    Each target has a probe function that raises on failure. Probes run on a
+    daemon thread every `interval` seconds, and callers can also report the
+    outcome of real requests. State changes use hysteresis so one dropped
+    packet doesn't flip a backend off and on:
+
+    - a single failure marks an UP target DEGRADED
+    - `failure_threshold` consecutive failures mark it DOWN
+    - a DOWN target needs `recovery_threshold` consecutive successes to be UP
+    - a success slower than `degraded_latency` seconds counts as DEGRADED
+    """
+
+    def __init__(self, interval=30, failure_threshold=2, recovery_threshold=2, degraded_latency=1.5):
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.recovery_threshold = recovery_threshold
+        self.degraded_latency = degraded_latency
+
+        self.probes = {}
+        self.states = {}
+        self.latencies = {}
+        self._failures = {}
+        self._successes = {}
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    def add_probe(self, name, probe):
+        """Register a target; probe() must raise if the target is unhealthy"""
+        with self._lock:
+            self.probes[name] = probe
+            self.states.setdefault(name, BackendState.UNKNOWN)
+            self._failures.setdefault(name, 0)
+            self._successes.setdefault(name, 0)
+
+    def start(self):
+        """Start probing in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def wake(self):
+        """Run a probe round now instead of waiting for the next interval"""
+        self._wake_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            for name in list(self.probes):
+                if self._stop_event.is_set():
+                    break
+                self.probe(name)
+            self._wake_event.wait(self.interval)
+            self._wake_event.clear()
+
+    def probe(self, name):
+        """Run one probe synchronously and record its outcome"""
+        probe = self.probes.get(name)
+        if probe is None:
+            return self.state(name)
+
+        start = time.perf_counter()
+        try:
+            probe()
+        except Exception:
+            return self.record_failure(name)
+        return self.record_success(name, time.perf_counter() - start)
+
+    def record_success(self, name, latency=None):
+        """Record a successful probe or request"""
+        with self._lock:
+            self._failures[name] = 0
+            self._successes[name] = self._successes.get(name, 0) + 1
+            if latency is not None:
+                self.latencies[name] = latency
+
+            previous = self.states.get(name, BackendState.UNKNOWN)
+            if previous == BackendState.DOWN and self._successes[name] < self.recovery_threshold:
+                state = BackendState.DOWN
+            elif latency is not None and latency > self.degraded_latency:
+                state = BackendState.DEGRADED
+            else:
+                state = BackendState.UP
+            self._set_state(name, previous, state)
+            return state
+
+    def record_failure(self, name):
+        """Record a failed probe or request"""
+        with self._lock:
+            self._successes[name] = 0
+            self._failures[name] = self._failures.get(name, 0) + 1
+
+            previous = self.states.get(name, BackendState.UNKNOWN)
+            if self._failures[name] >= self.failure_threshold or previous == BackendState.DOWN:
+                state = BackendState.DOWN
+            else:
+                state = BackendState.DEGRADED
+            self._set_state(name, previous, state)
+            return state
+
+    def _set_state(self, name, previous, state):
+        self.states[name] = state
+        if state != previous and previous != BackendState.UNKNOWN:
+            print(f"🩺 {name}: {previous.value} → {state.value}")
+
+    def state(self, name):
+        """Cached state of a target (no network I/O)"""
+        return self.states.get(name, BackendState.UNKNOWN)
+
+    def is_available(self, name):
+        """True unless the target is known to be down
+
+        Targets that haven't been probed yet count as available, so the
+        first turn after startup doesn't wait for the first probe round.
+        """
+        return self.states.get(name, BackendState.UNKNOWN) != BackendState.DOWN
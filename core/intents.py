@@ -0,0 +1,193 @@
+"""
+Local Intent Matcher
+Recognizes simple commands ("open notepad", "open downloads", "play
+<song>", "what time is it") and maps them straight to SystemActions, so
+they run without an LLM round trip. Anything it isn't sure about goes to
+the LLM as before.
+"""
+
+import datetime
+import difflib
+import re
+
+
+# Spoken names that differ from the SystemActions keys
+APP_ALIASES = {
+    'calc': 'calculator',
+    'command prompt': 'cmd',
+    'terminal': 'cmd',
+    'file explorer': 'explorer',
+    'file manager': 'explorer',
+    'google chrome': 'chrome',
+    'microsoft edge': 'edge',
+    'browser': 'chrome',
+    'ms paint': 'paint',
+}
+
+FOLDER_ALIASES = {
+    'download': 'downloads',
+    'document': 'documents',
+    'photos': 'pictures',
+    'my pictures': 'pictures',
+    'video': 'videos',
+    'songs': 'music',
+}
+
+# How to say app names in replies
+APP_DISPLAY_NAMES = {
+    'cmd': "Command Prompt",
+    'powershell': "PowerShell",
+    'explorer': "File Explorer",
+}
+
+# Whole-utterance patterns, so longer requests that merely contain a
+# command ("can you open up about how you feel") still reach the LLM
+POLITE = r"(?:(?:hey|ok|okay)\s+(?:buddy\s+)?)?(?:(?:please|can you|could you|would you)\s+)?"
+OPEN_PATTERN = re.compile(
+    rf"^{POLITE}(?:open|launch|start|run)\s+(?:up\s+)?(?:the\s+|my\s+)?(?P<target>[a-z][a-z .]*?)"
+    r"(?:\s+(?:app|application|folder|directory))?(?:\s+please)?$"
+)
+PLAY_PATTERN = re.compile(
+    rf"^{POLITE}play\s+(?:me\s+)?(?P<query>.+?)(?:\s+on\s+youtube)?(?:\s+please)?$"
+)
+DATETIME_PATTERN = re.compile(
+    rf"^{POLITE}(?:tell me\s+)?(?:"
+    r"what(?:'s| is)?\s+(?:the\s+)?(?:current\s+)?(?P<what>time|date|day)(?:\s+(?:is it|it is|now|today|right now))*"
+    r"|what time is it(?:\s+now)?"
+    r"|(?:what(?:'s| is)\s+)?today'?s date"
+    r"|what day is (?:it|today)"
+    r")$"
+)
+
+# "play" followed by these is a conversation, not a song request
+NOT_A_SONG = {'with', 'a game', 'games', 'along', 'around', 'together', 'it', 'something with'}
+
+
+def normalize_command(text):
+    """Lowercase, strip punctuation at the ends and collapse whitespace"""
+    text = text.lower().strip().strip(".!?,")
+    text = text.replace("’", "'")
+    return re.sub(r"\s+", " ", text)
+
+
+class Intent:
+    """A recognized command"""
+
+    def __init__(self, action_type, params, confidence, reply):
+        self.action_type = action_type
+        self.params = params
+        self.confidence = confidence
+        self.reply = reply
+
+    def __repr__(self):
+        return f"Intent({self.action_type}, {self.params}, {self.confidence:.2f})"
+
+
+class IntentMatcher:
+    """
+    Matches user input against known commands
+
+    Open targets are looked up exactly, then through aliases, then fuzzily
+    (difflib) against the configured apps and folders. match() returns an
+    Intent only at or above `threshold` confidence; otherwise None, and the
+    input should go to the LLM.
+    """
+
+    def __init__(self, apps, folders, threshold=0.85):
+        """
+        Args:
+            apps: App names that can be opened (SystemActions.common_apps keys)
+            folders: Folder names (SystemActions.common_folders keys)
+            threshold: Minimum confidence (0-1) to act without the LLM
+        """
+        self.apps = set(apps)
+        self.folders = set(folders)
+        self.threshold = threshold
+
+    @classmethod
+    def from_actions(cls, actions, config=None):
+        intents_config = (config or {}).get('intents', {})
+        return cls(
+            actions.common_apps,
+            actions.common_folders,
+            threshold=intents_config.get('threshold', 0.85)
+        )
+
+    def match(self, text):
+        """
+        Returns:
+            Intent, or None if the input isn't a confident command match
+        """
+        command = normalize_command(text)
+        if not command or len(command.split()) > 10:
+            return None
+
+        intent = self.match_datetime(command) or self.match_open(command) or self.match_play(command)
+        if intent and intent.confidence >= self.threshold:
+            return intent
+        return None
+
+    def match_datetime(self, command):
+        match = DATETIME_PATTERN.match(command)
+        if not match:
+            return None
+        now = datetime.datetime.now()
+        if match.group('what') in ('date', 'day') or 'date' in command or 'day' in command:
+            reply = f"Today is {now.strftime('%A, %B')} {now.day}, {now.year}."
+        else:
+            reply = f"It's {now.strftime('%I:%M %p').lstrip('0')}."
+        return Intent('get_datetime', {}, 1.0, reply)
+
+    def match_open(self, command):
+        match = OPEN_PATTERN.match(command)
+        if not match:
+            return None
+        target = match.group('target').strip()
+
+        name, kind, confidence = self.resolve(target)
+        if not name:
+            return None
+        if kind == 'app':
+            display_name = APP_DISPLAY_NAMES.get(name, name.capitalize())
+            return Intent('open_app', {'app': name}, confidence, f"Opening {display_name}!")
+        return Intent('open_folder', {'folder': name}, confidence, f"Opening your {name.capitalize()} folder!")
+
+    def resolve(self, target):
+        """
+        Find the app or folder a spoken name refers to
+
+        Returns:
+            (name, 'app' | 'folder', confidence), or (None, None, 0)
+        """
+        if target in self.apps:
+            return target, 'app', 1.0
+        if target in self.folders:
+            return target, 'folder', 1.0
+        if APP_ALIASES.get(target) in self.apps:
+            return APP_ALIASES[target], 'app', 0.95
+        if FOLDER_ALIASES.get(target) in self.folders:
+            return FOLDER_ALIASES[target], 'folder', 0.95
+
+        # Misheard or misspelled names ("note pad", "calculater")
+        candidates = {name: 'app' for name in self.apps}
+        candidates.update({name: 'folder' for name in self.folders})
+        close = difflib.get_close_matches(target, candidates, n=1, cutoff=0.6)
+        if not close:
+            compact = target.replace(' ', '')
+            close = [name for name in candidates if name == compact]
+        if not close:
+            return None, None, 0
+        name = close[0]
+        confidence = difflib.SequenceMatcher(None, target.replace(' ', ''), name).ratio()
+        return name, candidates[name], confidence
+
+    def match_play(self, command):
+        match = PLAY_PATTERN.match(command)
+        if not match:
+            return None
+        query = match.group('query').strip()
+        if any(query == word or query.startswith(word + ' ') for word in NOT_A_SONG):
+            return None
+        if query in ('music', 'some music', 'a song', 'something'):
+            query = "popular songs"
+        return Intent('play_music', {'query': query}, 0.9, f"Playing {query}!")
@@ -1,17 +1,33 @@
+import asyncio
 import ollama
 import google.generativeai as genai
-import re
 import json
 import os
 import socket
+import atexit
+import httpx
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from urllib.parse import urlparse
+from core.chat_backend import ChatBackend
 from core.groq_backend import GroqBackend
+from core.health import HealthMonitor, probe_tcp, probe_http
+from core.stream_worker import StreamWorker, DeadlineExceeded, get_deadlines
+from core.context import ContextWindow, get_context_budget, estimate_tokens, MESSAGE_OVERHEAD
+from core.response_cache import ResponseCache, conversation_digest
+from core.action_parser import parse_actions
+from core.async_loop import AsyncLoopThread
+from core.telemetry import LatencyTelemetry
+from core.router import LatencyRouter
+from core.session import Session
+from core.cascade import CascadeRouter, EscalationCheck, SELF_CHECK_INSTRUCTION
 
-class LLMHandler:
-    def __init__(self):
-        self.config = self.load_config()
-        self.history = []
-        self.mood_context = ""  # Additional context based on detected mood
-        self.system_prompt = """You are a friendly and cheerful FEMALE AI companion. You're a beautiful, intelligent young WOMAN.
+# Kept as a module constant so every request starts with exactly the same
+# bytes, which lets backends reuse their cached prompt prefix
+SYSTEM_PROMPT = """You are a friendly and cheerful FEMALE AI companion. You're a beautiful, intelligent young WOMAN.
 
 **YOUR IDENTITY (CRITICAL):**
 - You are a FEMALE - a WOMAN, a GIRL
@@ -38,10 +54,30 @@ class LLMHandler:
 5. **DO NOT respond in Hindi if user speaks English!**
 6. **DO NOT mix languages unless user mixes first!**
 7. **ONE LANGUAGE PER RESPONSE - MANDATORY!**"""
+
+
+# Values of config['llm']['mode']
+LLM_MODES = ("auto", "ollama", "llamacpp", "gemini", "groq", "cascade")
+
+# Messages of the conversation a cached response is tied to (the last exchange)
+CACHE_CONTEXT_MESSAGES = 2
+
+
+class LLMHandler:
+    def __init__(self, config=None):
+        self.config = config if config is not None else self.load_config()
+        self.system_prompt = SYSTEM_PROMPT
         
         # Initialize backends
         self.ollama_backend = OllamaBackend(self.config, self.system_prompt)
         
+        # Cascade mode: a small local model answers first
+        self.cascade = CascadeRouter.from_config(self.config)
+        small_prompt = self.system_prompt
+        if self.cascade.self_check:
+            small_prompt = f"{self.system_prompt}\n\n{SELF_CHECK_INSTRUCTION}"
+        self.small_backend = OllamaBackend(self.config, small_prompt, name="ollama_small")
+        
         # Initialize Gemini if API key is provided
         if 'gemini_api_key' in self.config.get('llm', {}) and self.config['llm']['gemini_api_key'] != "YOUR_API_KEY_HERE":
             try:
@@ -66,7 +102,117 @@ class LLMHandler:
             self.groq_backend = None
             print("⚠️ Groq API key not configured.")
         
+        # In-process llama.cpp if a GGUF model is configured
+        if self.config['llm'].get('llamacpp_model'):
+            try:
+                self.llamacpp_backend = LlamaCppBackend(self.config, self.system_prompt)
+                print(f"✅ llama.cpp model loaded (memory-mapped): {self.llamacpp_backend.model}")
+            except Exception as e:
+                self.llamacpp_backend = None
+                print(f"⚠️ llama.cpp initialization failed: {e}")
+        else:
+            self.llamacpp_backend = None
+        
         self.current_backend = None
+        self._event_loop = None
+        
+        # Conversation, mood and result of the desktop app's turns; the
+        # headless server gives each client a session of its own
+        self.session = self.new_session()
+        
+        # Load the local model now rather than on the first turn
+        if self.config['llm'].get('ollama_preload', True) and self.config['llm']['mode'] in ("auto", "ollama"):
+            self.ollama_backend.warm_up()
+        elif self.config['llm'].get('ollama_preload', True) and self.config['llm']['mode'] == "cascade":
+            self.small_backend.warm_up()
+        
+        # Probe connectivity and backends in the background so choosing a
+        # backend never waits on the network
+        self.health = HealthMonitor(
+            interval=self.config['preferences'].get('health_check_interval', 30)
+        )
+        self.health.add_probe('internet', self.check_internet_now)
+        self.health.add_probe('ollama', probe_http(f"{self.ollama_backend.host}/api/version"))
+        if self.groq_backend:
+            groq_url = urlparse(self.config['llm'].get('groq_base_url') or "https://api.groq.com")
+            self.health.add_probe('groq', probe_tcp(groq_url.hostname, groq_url.port or 443))
+        if self.gemini_backend:
+            self.health.add_probe('gemini', probe_tcp("generativelanguage.googleapis.com", 443))
+        self.health.start()
+        
+        # Per-backend latency percentiles, written to disk on exit
+        self.telemetry = LatencyTelemetry.from_config(self.config)
+        atexit.register(self.telemetry.dump)
+        
+        # Auto mode routes by live latency stats
+        self.router = LatencyRouter.from_config(self.config, self.telemetry, self.health)
+        if self.groq_backend:
+            self.router.add_quota('groq', self.groq_backend.rate_limiter.expected_wait)
+        
+        # Cache for short, frequently repeated requests
+        if self.config.get('cache', {}).get('enabled', True):
+            self.response_cache = ResponseCache.from_config(self.config, embedder=self.ollama_backend.embed)
+            atexit.register(self.response_cache.flush)
+        else:
+            self.response_cache = None
+    
+    def get_backends(self):
+        """All initialized backends"""
+        return [backend for backend in (
+            self.groq_backend, self.gemini_backend, self.llamacpp_backend, self.ollama_backend
+        ) if backend]
+    
+    def new_session(self, mode=None):
+        """
+        A new conversation session
+        
+        Its conversation is shared by every backend, so switching backends
+        (or falling back) keeps the context. Each backend renders as much
+        of it as its own budget allows.
+        """
+        conversation = ContextWindow(
+            budget=max(backend.context_budget for backend in self.get_backends()),
+            summarizer=self.summarize_history
+        )
+        return Session(conversation, mode=mode)
+    
+    @property
+    def conversation(self):
+        return self.session.conversation
+    
+    @property
+    def mood_context(self):
+        return self.session.mood_context
+    
+    @property
+    def last_result(self):
+        """Result of the default session's last turn"""
+        return self.session.last_result
+    
+    def get_mode(self, session=None):
+        session = session or self.session
+        return session.mode or self.config['llm']['mode']
+    
+    def set_mode(self, mode, session=None):
+        """Switch backend mode; applies from the next request
+        
+        Without a session this changes the configured mode, which every
+        session that hasn't picked its own follows.
+        """
+        if mode not in LLM_MODES:
+            print(f"⚠️ Unknown LLM mode: {mode}")
+            return False
+        if session is not None:
+            session.mode = mode
+        else:
+            self.config['llm']['mode'] = mode
+        # Let the router announce its next pick again
+        self.router.last_decision = None
+        if mode == "ollama" and self.config['llm'].get('ollama_preload', True):
+            self.ollama_backend.warm_up()
+        elif mode == "cascade" and self.config['llm'].get('ollama_preload', True):
+            self.small_backend.warm_up()
+        return True
     
     def load_config(self):
         """Load configuration from config.json"""
@@ -89,20 +235,31 @@ class LLMHandler:
                 }
             }
     
+    def check_internet_now(self):
+        """Probe the network (blocks for up to 3 s); raises OSError if offline"""
+        socket.create_connection(("8.8.8.8", 53), timeout=3).close()
+    
     def check_internet(self):
-        """Check if internet connection is available"""
-        try:
-            socket.create_connection(("8.8.8.8", 53), timeout=3)
-            return True
-        except OSError:
-            return False
+        """Check if internet connection is available (cached by the health monitor)"""
+        return self.health.is_available('internet')
     
-    def get_active_backend(self):
+    def get_active_backend(self, session=None):
         """Determine which LLM backend to use"""
-        mode = self.config['llm']['mode']
-        
+        mode = self.get_mode(session)
+        if mode == "cascade":
+            return self.small_backend
+        return self.get_backend_for_mode(mode)
+    
+    def get_backend_for_mode(self, mode):
+        """Backend that answers in a given (non-cascade) mode"""
         if mode == "ollama":
             return self.ollama_backend
+        elif mode == "llamacpp":
+            if self.llamacpp_backend:
+                return self.llamacpp_backend
+            else:
+                print("⚠️ llama.cpp not available, using Ollama")
+                return self.ollama_backend
         elif mode == "gemini":
             if self.gemini_backend:
                 return self.gemini_backend
@@ -119,148 +276,997 @@ class LLMHandler:
             has_internet = self.check_internet()
             prefer_online = self.config['preferences']['prefer_online']
             
+            # Priority order: Groq (fastest free API), then Gemini, then
+            # llama.cpp, then Ollama. The router reorders them by recent
+            # first-token latency.
+            candidates = []
             if has_internet and prefer_online:
-                # Prefer Groq (fastest free API), then Gemini, then Ollama
-                if self.groq_backend:
-                    return self.groq_backend
-                elif self.gemini_backend:
-                    return self.gemini_backend
+                candidates.extend(b for b in (self.groq_backend, self.gemini_backend) if b)
+            if self.llamacpp_backend:
+                candidates.append(self.llamacpp_backend)
+            candidates.append(self.ollama_backend)
             
-            return self.ollama_backend
+            return self.router.pick(candidates)
     
     def parse_actions(self, text):
         """Extract action commands from LLM response"""
-        actions = []
-        
-        # Regex patterns for different action types
-        patterns = {
-            'open_app': r'\[OPEN_APP:\s*([^\]]+)\]',
-            'open_folder': r'\[OPEN_FOLDER:\s*([^\]]+)\]',
-            'youtube': r'\[YOUTUBE:\s*([^\]]+)\]',
-            'play_music': r'\[PLAY_MUSIC:\s*([^\]]+)\]',
-            'google': r'\[GOOGLE:\s*([^\]]+)\]',
-            'open_website': r'\[OPEN_WEBSITE:\s*([^\]]+)\]',
-        }
+        return parse_actions(text)
+    
+    def summarize_history(self, previous_summary, messages):
+        """Summarizer for the context windows (runs on a background thread)
         
-        for action_type, pattern in patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                param_key = 'query' if action_type in ['youtube', 'play_music', 'google'] else \
-                           'app' if action_type == 'open_app' else \
-                           'folder' if action_type == 'open_folder' else 'url'
-                
-                actions.append({
-                    'type': action_type,
-                    'params': {param_key: match.strip()}
-                })
-        
-        # Remove action tags from text for clean display
-        clean_text = text
-        for pattern in patterns.values():
-            clean_text = re.sub(pattern, '', clean_text, flags=re.IGNORECASE)
-        
-        return actions, clean_text.strip()
-    
-    def set_mood_context(self, mood_context):
-        """Set additional context based on detected mood"""
-        self.mood_context = mood_context
-        # Update backends with new context
-        if hasattr(self.ollama_backend, 'set_mood_context'):
-            self.ollama_backend.set_mood_context(mood_context)
-        if self.gemini_backend and hasattr(self.gemini_backend, 'set_mood_context'):
-            self.gemini_backend.set_mood_context(mood_context)
+        Always uses the local model so summarization costs no API quota.
+        """
+        return self.ollama_backend.summarize(previous_summary, messages)
+    
+    def set_mood_context(self, mood_context, session=None):
+        """Set additional context based on detected mood (sent with each request)"""
+        (session or self.session).mood_context = mood_context
 
-    def chat(self, user_input):
-        from core.groq_backend import GroqBackend
-        
-        backend = self.get_active_backend()
-        
-        # Determine backend name
-        if isinstance(backend, GeminiBackend):
-            backend_name = "🌐 Gemini"
+    def get_backend_name(self, backend):
+        """Display name for a backend, as shown in the UI status label"""
+        if backend is self.small_backend:
+            return "💻 Ollama (small)"
+        elif isinstance(backend, GeminiBackend):
+            return "🌐 Gemini"
         elif isinstance(backend, GroqBackend):
-            backend_name = "⚡ Groq"
+            return "⚡ Groq"
+        elif isinstance(backend, LlamaCppBackend):
+            return "🦙 llama.cpp"
         else:
-            backend_name = "💻 Ollama"
+            return "💻 Ollama"
+    
+    def get_fallback_backends(self, backend):
+        """Backends to try, in order, after the given one has failed"""
+        # Smart fallback: Online APIs → local models (llama.cpp, Ollama)
+        fallback_backends = []
         
+        if isinstance(backend, (OllamaBackend, LlamaCppBackend)):
+            # If one local model failed, try the other, then online APIs
+            if backend is not self.llamacpp_backend and self.llamacpp_backend:
+                fallback_backends.append((self.llamacpp_backend, "🦙 llama.cpp"))
+            if backend is not self.ollama_backend:
+                fallback_backends.append((self.ollama_backend, "💻 Ollama"))
+            if self.groq_backend:
+                fallback_backends.append((self.groq_backend, "⚡ Groq"))
+            if self.gemini_backend:
+                fallback_backends.append((self.gemini_backend, "🌐 Gemini"))
+        else:
+            # If online API failed, always fall back to the local models
+            if self.llamacpp_backend:
+                fallback_backends.append((self.llamacpp_backend, "🦙 llama.cpp"))
+            fallback_backends.append((self.ollama_backend, "💻 Ollama"))
+        
+        return fallback_backends
+    
+    def build_result(self, response, backend_name):
+        """Parse a finished response into the dict returned by chat()"""
+        actions, clean_response = self.parse_actions(response)
+        
+        return {
+            'text': clean_response if clean_response else response,
+            'actions': actions,
+            'backend': backend_name
+        }
+    
+    def estimate_request_tokens(self, backend, user_input, session):
+        """Approximate prompt size of a request to this backend"""
+        history = session.conversation.render(backend.history_budget())
+        return (
+            estimate_tokens(self.system_prompt)
+            + sum(estimate_tokens(message['content']) + MESSAGE_OVERHEAD for message in history)
+            + estimate_tokens(user_input)
+        )
+    
+    def open_stream(self, backend, user_input, session):
+        """Start backend.chat_stream(), recording its latency in telemetry"""
+        tokens_in = self.estimate_request_tokens(backend, user_input, session)
+        start = time.perf_counter()
+        first_token = None
+        chunks = []
         try:
-            response = backend.chat(user_input)
+            for delta in backend.chat_stream(user_input, session.conversation, session.mood_context):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks.append(delta)
+                yield delta
+        except Exception as e:
+            self.telemetry.record_error(backend.name, type(e).__name__)
+            raise
+        self.record_call(backend, start, first_token, tokens_in, chunks)
+    
+    async def aopen_stream(self, backend, user_input, session):
+        """Async version of open_stream()"""
+        tokens_in = self.estimate_request_tokens(backend, user_input, session)
+        start = time.perf_counter()
+        first_token = None
+        chunks = []
+        try:
+            async for delta in backend.achat_stream(user_input, session.conversation, session.mood_context):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks.append(delta)
+                yield delta
+        except Exception as e:
+            self.telemetry.record_error(backend.name, type(e).__name__)
+            raise
+        self.record_call(backend, start, first_token, tokens_in, chunks)
+    
+    def record_call(self, backend, start, first_token, tokens_in, chunks):
+        end = time.perf_counter()
+        self.telemetry.record(
+            backend.name,
+            ttft_ms=(first_token - start) * 1000 if first_token else None,
+            total_ms=(end - start) * 1000,
+            tokens_in=tokens_in,
+            tokens_out=estimate_tokens(''.join(chunks))
+        )
+    
+    def get_latency_stats(self, backend_name=None, metric='ttft_ms', window=None):
+        """Rolling latency percentiles
+        
+        With a backend name, returns {count, p50, p95, p99} for one metric;
+        without, returns the full telemetry snapshot.
+        """
+        if backend_name:
+            return self.telemetry.percentiles(backend_name, metric, window)
+        return self.telemetry.snapshot()
+    
+    def get_model_name(self, backend):
+        """Model configured for a backend (part of the cache key)"""
+        return self.config['llm'].get(f"{backend.name}_model", "")
+    
+    def get_cache_scope(self, backend, session):
+        """(backend, model) part of the cache key
+        
+        In cascade mode the small model and the escalation backends share
+        one scope, so an answer the big model gave is found on the next
+        cascade turn instead of paying for escalation again.
+        """
+        if self.get_mode(session) == "cascade":
+            return "cascade", f"{self.get_model_name(self.small_backend)}>{self.cascade.escalate_to}"
+        return backend.name, self.get_model_name(backend)
+    
+    def get_cache_context(self, session):
+        """Digest of the last exchange, so follow-ups are cached per context
+        
+        The cache only keys on it for inputs that refer back to the
+        conversation; standalone prompts hit across conversations.
+        """
+        return conversation_digest(session.conversation.recent(CACHE_CONTEXT_MESSAGES))
+    
+    def get_cached_response(self, user_input, backend, session):
+        """Raw cached response for this request, or None"""
+        if not self.response_cache:
+            return None
+        return self.response_cache.get(
+            user_input, session.mood_context, *self.get_cache_scope(backend, session),
+            self.get_cache_context(session)
+        )
+    
+    def cache_response(self, user_input, backend, response, session):
+        """Remember a complete response for next time (before it joins the conversation)"""
+        if self.response_cache:
+            self.response_cache.put(
+                user_input, session.mood_context, *self.get_cache_scope(backend, session), response,
+                self.get_cache_context(session)
+            )
+    
+    def record_exchange(self, user_input, response, session=None):
+        """Add a turn answered without the LLM (e.g. a local command) to the conversation"""
+        session = session or self.session
+        if session.speculative:
+            session.pending_exchange = (user_input, None, response)
+            return
+        session.conversation.add_exchange(user_input, response)
+    
+    def commit_exchange(self, user_input, backend, response, session):
+        """Record a completed response: conversation, health and cache"""
+        if session.speculative:
+            session.pending_exchange = (user_input, backend, response)
+            return
+        # Cached under the conversation the response was an answer to
+        self.cache_response(user_input, backend, response, session)
+        session.conversation.add_exchange(user_input, response)
+        self.health.record_success(backend.name)
+    
+    def chat_stream(self, user_input, session=None):
+        """
+        Stream the response to user_input as it is generated
+        
+        Yields text deltas from the active backend. The exchange is only
+        added to the session's conversation once a stream has completed. If
+        the backend fails or misses its first-token deadline before
+        producing any text, the fallback backends are started in turn.
+        
+        In cascade mode the small model answers first (see cascade_stream()).
+        
+        When the generator is exhausted, the parsed result (same dict as
+        chat() returns) is available in session.last_result.
+        
+        Args:
+            session: Session to use; defaults to self.session
+        """
+        session = session or self.session
+        backend = self.get_active_backend(session)
+        backend_name = self.get_backend_name(backend)
+        
+        cached = self.get_cached_response(user_input, backend, session)
+        if cached is not None:
+            print(f"💾 Answered from cache ({backend_name})")
+            # Keep the conversation coherent for follow-up questions
+            self.record_exchange(user_input, cached, session)
+            yield cached
+            session.last_result = self.build_result(cached, f"{backend_name} 💾")
+            return
+        
+        if self.get_mode(session) == "cascade":
+            yield from self.cascade_stream(user_input, session)
+            return
+        
+        candidates = [(backend, backend_name)]
+        if self.config['preferences']['auto_fallback']:
+            candidates.extend(self.get_fallback_backends(backend))
+        
+        hedge_delay = None
+        hedge_backend = self.get_hedge_backend(backend) if self.should_hedge(backend, session) else None
+        if hedge_backend:
+            hedge_delay = self.config['preferences'].get('hedge_delay', 1.5)
+            # The hedge starts the next candidate, so move the target there
+            candidates[1:] = sorted(candidates[1:], key=lambda candidate: candidate[0] is not hedge_backend)
+        
+        yield from self.race_stream(user_input, candidates, session, hedge_delay)
+    
+    def speculative_session(self, session=None):
+        """
+        A scratch session for answering a guess at the user's input
+        
+        It reads `session`'s conversation and mode, but a finished exchange
+        is held in pending_exchange rather than committed, so a wrong guess
+        leaves no trace. See commit_speculation().
+        """
+        session = session or self.session
+        scratch = Session(session.conversation, mode=session.mode)
+        scratch.mood_context = session.mood_context
+        scratch.speculative = True
+        return scratch
+    
+    def commit_speculation(self, scratch, user_input, session=None):
+        """Adopt a speculative session's answer as `session`'s turn for user_input"""
+        session = session or self.session
+        if scratch.pending_exchange:
+            _, backend, response = scratch.pending_exchange
+            if backend is None:
+                self.record_exchange(user_input, response, session)
+            else:
+                self.commit_exchange(user_input, backend, response, session)
+        session.last_result = scratch.last_result or {
+            'text': "I'm having trouble thinking right now.",
+            'actions': [],
+            'backend': "❌ Error"
+        }
+    
+    @property
+    def event_loop(self):
+        """Event loop thread for the async API, started on first use"""
+        if self._event_loop is None:
+            self._event_loop = AsyncLoopThread().start()
+        return self._event_loop
+    
+    async def achat_stream(self, user_input, result=None, session=None):
+        """
+        Async version of chat_stream()
+        
+        Must run on self.event_loop (see submit() and stream()). Cancelling
+        the consuming task closes the backend's HTTP stream, so the server
+        stops generating. A backend that misses its first-token deadline is
+        abandoned for the next fallback, as in race_stream(). The parsed
+        result is stored in `result` (a dict, if given) as well as in
+        session.last_result.
+        """
+        session = session or self.session
+        backend = self.get_active_backend(session)
+        backend_name = self.get_backend_name(backend)
+        
+        cached = self.get_cached_response(user_input, backend, session)
+        if cached is not None:
+            print(f"💾 Answered from cache ({backend_name})")
+            self.record_exchange(user_input, cached, session)
+            session.last_result = self.build_result(cached, f"{backend_name} 💾")
+            stream = None
+        elif self.get_mode(session) == "cascade":
+            stream = self.acascade_stream(user_input, session)
+        else:
+            candidates = [(backend, backend_name)]
+            if self.config['preferences']['auto_fallback']:
+                candidates.extend(self.get_fallback_backends(backend))
+            stream = self.afallback_stream(user_input, candidates, session)
+        
+        if stream is None:
+            yield cached
+        else:
+            try:
+                async for delta in stream:
+                    yield delta
+            finally:
+                await stream.aclose()
+        
+        if result is not None and session.last_result:
+            result.update(session.last_result)
+    
+    async def afallback_stream(self, user_input, candidates, session):
+        """
+        Stream from the first of `candidates` that answers in time (async)
+        
+        The async counterpart of race_stream(), without hedging: candidates
+        are tried one after another. Sets session.last_result.
+        """
+        session.last_result = None
+        turn_deadline = time.monotonic() + self.config['preferences'].get('turn_deadline', 45)
+        for index, (candidate, name) in enumerate(candidates):
+            if index > 0:
+                print(f"Falling back to {name}")
             
-            # Parse for actions
-            actions, clean_response = self.parse_actions(response)
+            deadlines = get_deadlines(self.config, candidate.name)
+            now = time.monotonic()
+            first_token_deadline = min(now + deadlines['first_token'], turn_deadline)
+            total_deadline = min(now + deadlines['total'], turn_deadline)
             
-            return {
-                'text': clean_response if clean_response else response,
-                'actions': actions,
-                'backend': backend_name
-            }
-        except Exception as e:
-            print(f"Error with {backend_name}: {e}")
+            chunks = []
+            started_at = now
+            stream = self.aopen_stream(candidate, user_input, session)
+            try:
+                while True:
+                    deadline = total_deadline if chunks else first_token_deadline
+                    try:
+                        delta = await asyncio.wait_for(
+                            stream.__anext__(), max(0, deadline - time.monotonic())
+                        )
+                    except StopAsyncIteration:
+                        break
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+            except asyncio.TimeoutError:
+                # wait_for cancelled the pending read, ending the stream
+                if not chunks:
+                    self.record_censored_ttft(candidate, started_at)
+                self.record_deadline_miss(candidate, name, 'total' if chunks else 'first_token')
+                if chunks:
+                    session.last_result = self.build_result(''.join(chunks), name)
+                    return
+                continue
+            except Exception as e:
+                self.health.record_failure(candidate.name)
+                self.router.on_error(candidate.name, e)
+                if chunks:
+                    print(f"Error with {name} mid-response: {e}")
+                    session.last_result = self.build_result(''.join(chunks), name)
+                    return
+                if index == 0:
+                    print(f"Error with {name}: {e}")
+                else:
+                    print(f"{name} also failed: {e}")
+                continue
+            finally:
+                await stream.aclose()
             
-            # Try fallback if enabled
-            if self.config['preferences']['auto_fallback']:
-                # Smart fallback: Online APIs → Ollama
-                fallback_backends = []
+            self.commit_exchange(user_input, candidate, ''.join(chunks), session)
+            session.last_result = self.build_result(''.join(chunks), name)
+            return
+        
+        session.last_result = {
+            'text': "I'm having trouble thinking right now.",
+            'actions': [],
+            'backend': "❌ Error"
+        }
+    
+    async def achat(self, user_input, session=None):
+        """Async version of chat(); safe to run several at once"""
+        result = {}
+        async for _ in self.achat_stream(user_input, result=result, session=session):
+            pass
+        return result
+    
+    def submit(self, user_input, session=None):
+        """Start a request on the event loop thread
+        
+        Returns:
+            concurrent.futures.Future with the chat() result dict; calling
+            cancel() on it stops the generation
+        """
+        return self.event_loop.submit(self.achat(user_input, session))
+    
+    def stream(self, user_input, session=None):
+        """Sync iterator over achat_stream(); closing it cancels the request"""
+        return self.event_loop.iterate(self.achat_stream(user_input, session=session))
+    
+    def should_hedge(self, backend, session):
+        """Hedge requests to other backends with a local one (auto mode with fallback only)"""
+        preferences = self.config['preferences']
+        return (
+            preferences.get('hedge_requests', False)
+            and preferences['auto_fallback']
+            and self.get_mode(session) == "auto"
+            and backend is not self.ollama_backend
+        )
+    
+    def get_hedge_backend(self, backend):
+        """
+        Local backend to hedge `backend` with, or None if none is healthy
+        
+        The one with the lowest recent first-token p95 wins; unmeasured
+        ones come after measured ones, Ollama first.
+        """
+        local = [
+            candidate for candidate in (self.ollama_backend, self.llamacpp_backend)
+            if candidate and candidate is not backend
+            and self.health.is_available(candidate.name) and not self.router.is_demoted(candidate.name)
+        ]
+        if not local:
+            return None
+        
+        def expected_ttft(candidate):
+            p95 = self.router.ttft_p95(candidate.name)
+            return (p95 is None, p95 or 0)
+        return min(local, key=expected_ttft)
+    
+    def race_stream(self, user_input, candidates, session, hedge_delay=None):
+        """
+        Stream from the first backend that answers in time
+        
+        Backends are started in order. The next one starts as soon as the
+        running one fails or misses its first-token deadline (the stuck one
+        is abandoned). With hedge_delay, the next one also starts if there
+        is no first token after that many seconds; both then race, the
+        first to stream wins and the other is cancelled, so only the
+        winner's answer joins the conversation.
+        
+        Once streaming, the winner must finish by its total deadline. Text
+        already yielded can't be taken back, so a miss then ends the turn
+        with what has arrived. preferences.turn_deadline caps everything.
+        
+        Args:
+            candidates: (backend, display_name) tuples in priority order
+        """
+        turn_deadline = time.monotonic() + self.config['preferences'].get('turn_deadline', 45)
+        events = queue.Queue()
+        waiting = list(candidates)
+        racing = []
+        
+        def launch():
+            backend, name = waiting.pop(0)
+            if backend is not candidates[0][0]:
+                print(f"Falling back to {name}")
+            deadlines = get_deadlines(self.config, backend.name)
+            now = time.monotonic()
+            racing.append(StreamWorker(
+                backend, name, self.open_stream(backend, user_input, session), events,
+                first_token_deadline=min(now + deadlines['first_token'], turn_deadline),
+                total_deadline=min(now + deadlines['total'], turn_deadline)
+            ).start())
+        
+        session.last_result = None
+        launch()
+        hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else None
+        
+        winner = None
+        chunks = []
+        try:
+            # Wait for a backend to start streaming
+            while winner is None and racing:
+                wake_at = min(worker.first_token_deadline for worker in racing)
+                if hedge_at is not None and waiting:
+                    wake_at = min(wake_at, hedge_at)
+                try:
+                    worker, kind, payload = events.get(timeout=max(0, wake_at - time.monotonic()))
+                except queue.Empty:
+                    now = time.monotonic()
+                    for worker in [w for w in racing if now >= w.first_token_deadline]:
+                        racing.remove(worker)
+                        self.miss_deadline(worker, 'first_token')
+                        if waiting:
+                            launch()
+                    if hedge_at is not None and now >= hedge_at and waiting and racing:
+                        print(f"⏳ No first token from {racing[0].name} after {hedge_delay}s, hedging with {waiting[0][1]}")
+                        launch()
+                        hedge_at = None
+                    continue
                 
-                if isinstance(backend, OllamaBackend):
-                    # If Ollama failed, try online APIs
-                    if self.groq_backend:
-                        fallback_backends.append((self.groq_backend, "⚡ Groq"))
-                    if self.gemini_backend:
-                        fallback_backends.append((self.gemini_backend, "🌐 Gemini"))
-                else:
-                    # If online API failed, always fall back to Ollama
-                    fallback_backends.append((self.ollama_backend, "💻 Ollama"))
+                if worker not in racing:
+                    continue
                 
-                for fallback_backend, fallback_name in fallback_backends:
-                    try:
-                        print(f"Falling back to {fallback_name}")
-                        response = fallback_backend.chat(user_input)
-                        actions, clean_response = self.parse_actions(response)
-                        return {
-                            'text': clean_response if clean_response else response,
-                            'actions': actions,
-                            'backend': fallback_name
-                        }
-                    except Exception as fallback_error:
-                        print(f"{fallback_name} also failed: {fallback_error}")
-                        continue
+                if kind == 'error':
+                    print(f"Error with {worker.name}: {payload}")
+                    # Real failures feed the health monitor and router too
+                    self.health.record_failure(worker.backend.name)
+                    self.router.on_error(worker.backend.name, payload)
+                    racing.remove(worker)
+                    if waiting:
+                        launch()
+                    continue
+                
+                winner = worker
+                if len(racing) > 1:
+                    print(f"🏁 {winner.name} answered first")
+                for loser in racing:
+                    if loser is not winner:
+                        loser.cancel()
+                        self.record_censored_ttft(loser.backend, loser.started_at)
+                racing = [winner]
+                
+                if kind == 'delta':
+                    chunks.append(payload)
+                    yield payload
+                else:
+                    self.commit_exchange(user_input, winner.backend, ''.join(chunks), session)
+                    session.last_result = self.build_result(''.join(chunks), winner.name)
+                    return
             
-            return {
-                'text': "I'm having trouble thinking right now.",
-                'actions': [],
-                'backend': "❌ Error"
-            }
+            if winner is None:
+                session.last_result = {
+                    'text': "I'm having trouble thinking right now.",
+                    'actions': [],
+                    'backend': "❌ Error"
+                }
+                return
+            
+            # Relay the rest of the winner's stream
+            while True:
+                try:
+                    worker, kind, payload = events.get(timeout=max(0, winner.total_deadline - time.monotonic()))
+                except queue.Empty:
+                    racing.remove(winner)
+                    self.miss_deadline(winner, 'total')
+                    break
+                if worker is not winner:
+                    continue
+                if kind == 'delta':
+                    chunks.append(payload)
+                    yield payload
+                elif kind == 'error':
+                    # Text already reached the caller, so don't start over
+                    print(f"Error with {winner.name} mid-response: {payload}")
+                    self.health.record_failure(winner.backend.name)
+                    self.router.on_error(winner.backend.name, payload)
+                    break
+                else:
+                    self.commit_exchange(user_input, winner.backend, ''.join(chunks), session)
+                    break
+            
+            session.last_result = self.build_result(''.join(chunks), winner.name)
+        finally:
+            # Also stops the winner if the caller abandons the stream
+            for worker in racing:
+                worker.cancel()
+    
+    def miss_deadline(self, worker, kind):
+        """Abandon a worker that missed a deadline ('first_token' or 'total')"""
+        worker.cancel()
+        if kind == 'first_token':
+            self.record_censored_ttft(worker.backend, worker.started_at)
+        self.record_deadline_miss(worker.backend, worker.name, kind)
+    
+    def record_censored_ttft(self, backend, started_at):
+        """Count the wait of a call abandoned before its first token (started_at: monotonic)"""
+        self.telemetry.record_censored_ttft(backend.name, (time.monotonic() - started_at) * 1000)
+    
+    def record_deadline_miss(self, backend, name, kind):
+        """Count a missed deadline against the backend, like an error"""
+        label = kind.replace('_', ' ')
+        print(f"⏰ {name} missed its {label} deadline")
+        self.telemetry.record_deadline_miss(backend.name, kind)
+        self.health.record_failure(backend.name)
+        self.router.on_error(backend.name, DeadlineExceeded(f"{label} deadline"))
+    
+    def get_escalation_candidates(self):
+        """Backends that answer queries the cascade's small model hands on"""
+        backend = self.get_backend_for_mode(self.cascade.escalate_to)
+        candidates = [(backend, self.get_backend_name(backend))]
+        if self.config['preferences']['auto_fallback']:
+            candidates.extend(self.get_fallback_backends(backend))
+        return candidates
+    
+    def cascade_stream(self, user_input, session):
+        """
+        Cascade mode: the small model answers unless the query is escalated
+        
+        The classifier escalates obviously complex queries before the small
+        model sees them. Otherwise the small model streams; if its reply
+        opens with ESCALATE_TAG (self-check), or it fails, the query goes to
+        the escalation backends. Only the answer that is shown is committed
+        to the conversation. Each routing decision is logged by self.cascade.
+        """
+        start = time.perf_counter()
+        escalate, reason = self.cascade.classify(user_input)
+        wasted_ms = 0.0
+        
+        if not escalate:
+            check = EscalationCheck() if self.cascade.self_check else None
+            stream = self.race_stream(
+                user_input, [(self.small_backend, self.get_backend_name(self.small_backend))], session
+            )
+            try:
+                for delta in stream:
+                    if check:
+                        delta, escalate = check.feed(delta)
+                        if escalate:
+                            break
+                    if delta:
+                        yield delta
+            finally:
+                # Abandons the small model's stream uncommitted if it escalated
+                stream.close()
+            
+            if check and not escalate:
+                rest = check.flush()
+                if rest:
+                    yield rest
+            
+            answered = session.last_result and session.last_result['backend'] != "❌ Error"
+            if not escalate and answered:
+                self.cascade.record('small', reason, (time.perf_counter() - start) * 1000)
+                return
+            reason = "self-check" if escalate else "small model failed"
+            wasted_ms = (time.perf_counter() - start) * 1000
+        
+        print(f"🪜 Escalating ({reason})")
+        yield from self.race_stream(user_input, self.get_escalation_candidates(), session)
+        self.cascade.record('escalated', reason, (time.perf_counter() - start) * 1000, wasted_ms)
+    
+    async def acascade_stream(self, user_input, session):
+        """Async version of cascade_stream()"""
+        start = time.perf_counter()
+        escalate, reason = self.cascade.classify(user_input)
+        wasted_ms = 0.0
+        
+        if not escalate:
+            check = EscalationCheck() if self.cascade.self_check else None
+            stream = self.afallback_stream(
+                user_input, [(self.small_backend, self.get_backend_name(self.small_backend))], session
+            )
+            try:
+                async for delta in stream:
+                    if check:
+                        delta, escalate = check.feed(delta)
+                        if escalate:
+                            break
+                    if delta:
+                        yield delta
+            finally:
+                await stream.aclose()
+            
+            if check and not escalate:
+                rest = check.flush()
+                if rest:
+                    yield rest
+            
+            answered = session.last_result and session.last_result['backend'] != "❌ Error"
+            if not escalate and answered:
+                self.cascade.record('small', reason, (time.perf_counter() - start) * 1000)
+                return
+            reason = "self-check" if escalate else "small model failed"
+            wasted_ms = (time.perf_counter() - start) * 1000
+        
+        print(f"🪜 Escalating ({reason})")
+        stream = self.afallback_stream(user_input, self.get_escalation_candidates(), session)
+        try:
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+        self.cascade.record('escalated', reason, (time.perf_counter() - start) * 1000, wasted_ms)
+    
+    def chat(self, user_input, session=None):
+        """Get the complete response to user_input (blocks until done)"""
+        session = session or self.session
+        for _ in self.chat_stream(user_input, session):
+            pass
+        return session.last_result
+
+
+# Models used when config.json doesn't name one
+DEFAULT_OLLAMA_MODELS = {
+    'ollama': "llama3.2:latest",
+    'ollama_small': "llama3.2:1b",
+}
+
+# A request that spent longer than this (seconds) loading the model was cold
+COLD_LOAD_THRESHOLD = 0.5
 
 
-class OllamaBackend:
+class OllamaBackend(ChatBackend):
     """Offline LLM backend using Ollama"""
+    name = "ollama"
+    
+    def __init__(self, config, system_prompt, name="ollama"):
+        """
+        Args:
+            name: Also picks the model (config['llm'][f'{name}_model']), so a
+                  second instance can serve the cascade's small model
+        """
+        self.name = name
+        self.model = config['llm'].get(f"{name}_model") or DEFAULT_OLLAMA_MODELS[name]
+        self.host = config['llm'].get('ollama_host', "http://localhost:11434")
+        self.keep_alive = config['llm'].get('ollama_keep_alive', "30m")
+        
+        # One long-lived client: its HTTP connection pool is reused across turns.
+        # Its read timeout is the first-token deadline, so a stuck request
+        # frees its worker thread instead of hanging on the socket.
+        self.deadlines = get_deadlines(config, self.name)
+        self.timeout = httpx.Timeout(self.deadlines['first_token'], connect=5.0)
+        self.client = ollama.Client(host=self.host, timeout=self.timeout)
+        # Model loads and summaries may legitimately take longer
+        self.background_client = ollama.Client(host=self.host)
+        # Created on first use, on the event loop that will drive it
+        self.async_client = None
+        
+        # First-token latency (seconds), split by whether the model had to load
+        self.first_token_times = {
+            'cold': deque(maxlen=50),
+            'warm': deque(maxlen=50)
+        }
+        # Timing stats of the last response, overall and per conversation
+        # (sessions stream concurrently, so each reads its own)
+        self.last_stats = {}
+        self.conversation_stats = weakref.WeakKeyDictionary()
+        self.stats_lock = threading.Lock()
+        self.embedding_model = config.get('cache', {}).get('embedding_model') or "nomic-embed-text"
+        self.system_prompt = system_prompt
+        # How much of the shared conversation to send with each request
+        self.context_budget = get_context_budget(config, self.name)
+    
+    def chat_stream(self, user_input, conversation=None, mood_context=""):
+        """Yield response tokens as Ollama generates them
+        
+        The request is rendered from `conversation` (a ContextWindow), but
+        the exchange is not added to it; the caller commits it once the
+        stream has completed.
+        """
+        messages = self.build_messages(user_input, conversation, mood_context)
+        
+        start = time.perf_counter()
+        first_token = None
+        stream = self.client.chat(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            keep_alive=self.keep_alive
+        )
+        
+        for chunk in stream:
+            delta = chunk['message']['content']
+            if delta:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                yield delta
+            if chunk.get('done'):
+                self.record_stats(chunk, conversation)
+                if first_token is not None:
+                    self.record_first_token(first_token, chunk.get('load_duration') or 0)
+    
+    async def achat_stream(self, user_input, conversation=None, mood_context=""):
+        """Async version of chat_stream()
+        
+        Cancelling the consuming task closes the HTTP stream, which makes
+        Ollama stop generating instead of finishing an unwanted answer.
+        """
+        if self.async_client is None:
+            self.async_client = ollama.AsyncClient(host=self.host, timeout=self.timeout)
+        
+        messages = self.build_messages(user_input, conversation, mood_context)
+        
+        start = time.perf_counter()
+        first_token = None
+        stream = await self.async_client.chat(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            keep_alive=self.keep_alive
+        )
+        
+        try:
+            async for chunk in stream:
+                delta = chunk['message']['content']
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    yield delta
+                if chunk.get('done'):
+                    self.record_stats(chunk, conversation)
+                    if first_token is not None:
+                        self.record_first_token(first_token, chunk.get('load_duration') or 0)
+        finally:
+            await stream.aclose()
+    
+    def warm_up(self):
+        """Load the model into memory ahead of the first turn
+        
+        An empty prompt makes Ollama load the weights without generating
+        anything; keep_alive then keeps them resident between turns.
+        """
+        def load():
+            try:
+                start = time.perf_counter()
+                self.background_client.generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+                print(f"🔥 Ollama model {self.model} loaded in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                print(f"⚠️ Could not preload Ollama model: {e}")
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    def record_stats(self, final_chunk, conversation=None):
+        """Keep Ollama's timing stats from the last chunk of a response
+        
+        prompt_eval_count only counts prompt tokens that were actually
+        evaluated, so with a stable prefix it stays flat as history grows.
+        """
+        stats = {
+            'prompt_eval_count': final_chunk.get('prompt_eval_count') or 0,
+            'prompt_eval_ms': (final_chunk.get('prompt_eval_duration') or 0) / 1e6,
+            'eval_count': final_chunk.get('eval_count') or 0,
+            'eval_ms': (final_chunk.get('eval_duration') or 0) / 1e6,
+            'load_ms': (final_chunk.get('load_duration') or 0) / 1e6
+        }
+        with self.stats_lock:
+            self.last_stats = stats
+            if conversation is not None:
+                self.conversation_stats[conversation] = stats
+    
+    def get_last_stats(self, conversation=None):
+        """Timing stats of the last response in `conversation` (any, if None)"""
+        with self.stats_lock:
+            if conversation is None:
+                return self.last_stats
+            return self.conversation_stats.get(conversation, {})
+    
+    def record_first_token(self, seconds, load_duration_ns):
+        """Record a first-token latency as cold (model loaded) or warm"""
+        # Ollama reports how long it spent loading the model for this request
+        cold = load_duration_ns / 1e9 > COLD_LOAD_THRESHOLD
+        with self.stats_lock:
+            self.first_token_times['cold' if cold else 'warm'].append(seconds)
+        if cold:
+            print(f"🥶 Cold start: first token after {seconds * 1000:.0f} ms")
+    
+    def get_first_token_stats(self):
+        """Cold vs warm first-token latency, in milliseconds"""
+        with self.stats_lock:
+            first_token_times = {kind: list(times) for kind, times in self.first_token_times.items()}
+        stats = {}
+        for kind, times in first_token_times.items():
+            stats[kind] = {
+                'count': len(times),
+                'avg_ms': sum(times) / len(times) * 1000 if times else None,
+                'last_ms': times[-1] * 1000 if times else None
+            }
+        return stats
+    
+    def embed(self, text):
+        """Embedding vector for text (used for near-duplicate cache lookups)"""
+        response = self.background_client.embeddings(model=self.embedding_model, prompt=text, keep_alive=self.keep_alive)
+        return response['embedding']
+    
+    def summarize(self, previous_summary, messages):
+        """Fold messages into a short running summary (blocking)"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = (
+            "Update the summary of a conversation between a user and their AI companion. "
+            "Keep names, facts, preferences and open requests; drop small talk. "
+            "Answer with the summary only, at most 120 words.\n\n"
+            f"Current summary: {previous_summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+        response = self.background_client.chat(
+            model=self.model,
+            messages=[{'role': 'user', 'content': prompt}],
+            keep_alive=self.keep_alive
+        )
+        return response['message']['content']
+
+
+class LlamaCppBackend(ChatBackend):
+    """
+    Offline LLM backend running a GGUF model in-process with llama.cpp
+    
+    No daemon and no HTTP hop: the weights are memory-mapped (shared with
+    the OS page cache instead of copied into the process) and tokens come
+    straight from the sampler. llama.cpp keeps the KV cache of the last
+    prompt, and since the system prompt and rendered history are stable
+    from turn to turn, each turn only evaluates the new tokens. With
+    llamacpp_cache_mb the KV state of other recent prompts is kept in RAM
+    too, so alternating sessions don't re-evaluate each other's history.
+    
+    The model handles one generation at a time.
+    """
+    name = "llamacpp"
+    
     def __init__(self, config, system_prompt):
-        self.model = config['llm']['ollama_model']
-        self.history = [{'role': 'system', 'content': system_prompt}]
-        self.mood_context = ""
+        from llama_cpp import Llama, LlamaRAMCache
+        
+        llm_config = config['llm']
+        self.model = llm_config['llamacpp_model']
+        self.n_ctx = llm_config.get('llamacpp_context', 4096)
+        self.max_tokens = llm_config.get('llamacpp_max_tokens', 512)
+        
+        self.llama = Llama(
+            model_path=self.model,
+            n_ctx=self.n_ctx,
+            # None lets llama.cpp pick (physical cores)
+            n_threads=llm_config.get('llamacpp_threads'),
+            use_mmap=True,
+            verbose=False
+        )
+        cache_mb = llm_config.get('llamacpp_cache_mb', 256)
+        if cache_mb:
+            self.llama.set_cache(LlamaRAMCache(capacity_bytes=cache_mb * 1024 * 1024))
+        
+        # The model and its KV cache are shared state
+        self.lock = threading.Lock()
+        self.system_prompt = system_prompt
+        self.context_budget = get_context_budget(config, self.name)
     
-    def set_mood_context(self, mood_context):
-        """Set mood-specific context for empathetic responses"""
-        self.mood_context = mood_context
+    def chat_stream(self, user_input, conversation=None, mood_context=""):
+        """Yield response tokens as llama.cpp samples them
+        
+        Waits for any generation already running. Closing the generator
+        stops sampling at the next token.
+        """
+        messages = self.build_messages(user_input, conversation, mood_context)
+        
+        with self.lock:
+            stream = self.llama.create_chat_completion(
+                messages=messages,
+                max_tokens=self.max_tokens,
+                stream=True
+            )
+            try:
+                for chunk in stream:
+                    delta = chunk['choices'][0]['delta'].get('content')
+                    if delta:
+                        yield delta
+            finally:
+                stream.close()
     
-    def chat(self, user_input):
-        # Prepend mood context if available
-        enhanced_input = user_input
-        if self.mood_context:
-            enhanced_input = f"[Context: {self.mood_context}]\n{user_input}"
+    async def achat_stream(self, user_input, conversation=None, mood_context=""):
+        """Async version of chat_stream()
         
-        self.history.append({'role': 'user', 'content': enhanced_input})
+        Generation runs on a thread of its own; tokens are handed to the
+        event loop as they come. Cancelling stops it at the next token.
+        """
+        loop = asyncio.get_running_loop()
+        deltas = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
         
-        response = ollama.chat(model=self.model, messages=self.history)
-        bot_response = response['message']['content']
-        self.history.append({'role': 'assistant', 'content': bot_response})
+        def generate():
+            try:
+                for delta in self.chat_stream(user_input, conversation, mood_context):
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(deltas.put_nowait, delta)
+                loop.call_soon_threadsafe(deltas.put_nowait, done)
+            except Exception as e:
+                if not cancelled.is_set():
+                    loop.call_soon_threadsafe(deltas.put_nowait, e)
         
-        return bot_response
+        threading.Thread(target=generate, daemon=True).start()
+        try:
+            while True:
+                item = await deltas.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
 
 
-class GeminiBackend:
+class GeminiBackend(ChatBackend):
     """Online LLM backend using Google Gemini API"""
+    name = "gemini"
+    
     def __init__(self, config, system_prompt):
         api_key = config['llm']['gemini_api_key']
         genai.configure(api_key=api_key)
@@ -269,19 +1275,46 @@ class GeminiBackend:
             model_name=config['llm']['gemini_model'],
             system_instruction=system_prompt
         )
-        self.chat_session = self.model.start_chat(history=[])
-        self.mood_context = ""
+        self.context_budget = get_context_budget(config, self.name)
+        # Stops a stuck request once the turn has moved on without it
+        self.request_options = {'timeout': get_deadlines(config, self.name)['total']}
     
-    def set_mood_context(self, mood_context):
-        """Set mood-specific context for empathetic responses"""
-        self.mood_context = mood_context
+    def render_history(self, conversation):
+        """Conversation in Gemini's format (user/model roles only)"""
+        if conversation is None:
+            return []
+        history = []
+        for message in conversation.render(self.history_budget()):
+            if message['role'] == 'system':
+                # Summary: Gemini history has no system role
+                history.append({'role': 'user', 'parts': [message['content']]})
+                history.append({'role': 'model', 'parts': ["Okay, I remember that."]})
+            else:
+                role = 'model' if message['role'] == 'assistant' else 'user'
+                history.append({'role': role, 'parts': [message['content']]})
+        return history
     
-    def chat(self, user_input):
-        # Prepend mood context if available
-        enhanced_input = user_input
-        if self.mood_context:
-            enhanced_input = f"[Context: {self.mood_context}]\n{user_input}"
+    def chat_stream(self, user_input, conversation=None, mood_context=""):
+        """Yield response text as Gemini streams it back"""
+        # A fresh session per turn, rendered from the shared conversation
+        chat_session = self.model.start_chat(history=self.render_history(conversation))
+        response = chat_session.send_message(
+            self.add_mood_suffix(user_input, mood_context), stream=True,
+            request_options=self.request_options
+        )
         
-        response = self.chat_session.send_message(enhanced_input)
-        return response.text
-
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    
+    async def achat_stream(self, user_input, conversation=None, mood_context=""):
+        """Async version of chat_stream()"""
+        chat_session = self.model.start_chat(history=self.render_history(conversation))
+        response = await chat_session.send_message_async(
+            self.add_mood_suffix(user_input, mood_context), stream=True,
+            request_options=self.request_options
+        )
+        
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
@@ -79,6 +79,7 @@ def get_recommended_models() -> List[str]:
     """
     return [
         "llama3.2:latest",      # Fast, good quality
+        "llama3.2:1b",          # Tiny, first stage of cascade mode
         "llama3.1:latest",      # Larger, better quality
         "deepseek-r1:latest",   # DeepSeek reasoning model
         "phi3:latest",          # Microsoft's small model
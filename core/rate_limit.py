@@ -0,0 +1,240 @@
+"""
+Client-side Rate Limiting
+Token buckets kept in sync with the x-ratelimit-* headers of
+OpenAI-compatible APIs (Groq), so requests wait briefly for quota instead
+of failing with 429
+"""
+
+import re
+import threading
+import time
+
+
+# Groq sends durations like "2m59.56s", "7.66s" or "120ms"
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+
+
+def parse_duration(value):
+    """Seconds in a rate-limit reset header, or None if it can't be parsed"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        # retry-after is plain seconds
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimitExceeded(Exception):
+    """A request would have to wait longer than allowed for quota"""
+
+    status_code = 429
+
+    def __init__(self, message, wait):
+        super().__init__(message)
+        self.wait = wait
+
+
+class TokenBucket:
+    """
+    Classic token bucket that may go into debt
+
+    reserve() always succeeds and returns how long the caller must wait
+    before sending; callers reserving after it queue up behind it. An amount
+    larger than the bucket counts as a full bucket, so an oversized request
+    waits for full quota instead of forever.
+    """
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.level = min(self.capacity, self.level + elapsed * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount, now=None):
+        """Seconds until `amount` would be available"""
+        now = now or time.monotonic()
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second if self.refill_per_second else float('inf')
+
+    def reserve(self, amount, now=None):
+        wait = self.wait_time(amount, now)
+        self.level -= min(amount, self.capacity)
+        return wait
+
+    def sync(self, capacity, remaining, reset_seconds, now=None):
+        """Adopt the server's view: `remaining` now, full again after `reset_seconds`"""
+        now = now or time.monotonic()
+        self.capacity = capacity
+        self.level = remaining
+        self.updated = now
+        if reset_seconds:
+            self.refill_per_second = max(self.refill_per_second, (capacity - remaining) / reset_seconds)
+
+
+class RateLimitScheduler:
+    """
+    Paces requests to one API to stay under its limits
+
+    Tracks a requests-per-minute and a tokens-per-minute bucket. Before each
+    request the caller reserves its estimated token cost; if quota is short
+    the request is delayed (at most `max_wait` seconds) rather than sent to
+    be rejected. Every response's rate-limit headers re-sync the buckets,
+    and a 429 blocks sending until its retry-after has passed.
+
+    Groq reports request limits per day and token limits per minute in its
+    headers; the per-minute request limit is only known from config.
+    """
+
+    def __init__(self, name, requests_per_minute=30, tokens_per_minute=6000, max_wait=3.0):
+        self.name = name
+        self.max_wait = max_wait
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.blocked_until = 0.0
+
+        # Daily request quota, from headers
+        self.daily_limit = None
+        self.daily_remaining = None
+        self.daily_reset_at = None
+
+        self.delayed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, name):
+        """Build a scheduler from config['llm'][f'{name}_rate_limits']"""
+        limits = config.get('llm', {}).get(f"{name}_rate_limits", {})
+        return cls(
+            name,
+            requests_per_minute=limits.get('requests_per_minute', 30),
+            tokens_per_minute=limits.get('tokens_per_minute', 6000),
+            max_wait=limits.get('max_wait', 3.0)
+        )
+
+    def _wait_time(self, tokens, now):
+        """Seconds before a request costing `tokens` could be sent (lock held)"""
+        waits = [
+            self.blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        ]
+        if self.daily_remaining is not None and self.daily_remaining <= 0 and self.daily_reset_at:
+            waits.append(self.daily_reset_at - now)
+        return max(0.0, *waits)
+
+    def reserve(self, tokens):
+        """
+        Claim quota for a request costing about `tokens` tokens
+
+        Returns:
+            Seconds the caller must wait before sending
+
+        Raises:
+            RateLimitExceeded: if that would be longer than max_wait (nothing
+                               is reserved then, so fallbacks aren't penalized)
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._wait_time(tokens, now)
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise RateLimitExceeded(
+                    f"{self.name} rate limit: quota back in {wait:.1f}s", wait
+                )
+            self.requests.reserve(1, now)
+            self.tokens.reserve(tokens, now)
+            if wait > 0:
+                self.delayed += 1
+                print(f"⏳ {self.name} rate limit: waiting {wait:.1f}s for quota")
+            return wait
+
+    def acquire(self, tokens):
+        """Blocking reserve(): sleeps until the request may be sent"""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """Re-sync with the x-ratelimit-* headers of a response"""
+        def number(key):
+            try:
+                return float(headers.get(key))
+            except (TypeError, ValueError):
+                return None
+
+        now = time.monotonic()
+        with self._lock:
+            token_limit = number('x-ratelimit-limit-tokens')
+            token_remaining = number('x-ratelimit-remaining-tokens')
+            if token_limit and token_remaining is not None:
+                self.tokens.sync(
+                    token_limit, token_remaining,
+                    parse_duration(headers.get('x-ratelimit-reset-tokens')), now
+                )
+
+            request_limit = number('x-ratelimit-limit-requests')
+            request_remaining = number('x-ratelimit-remaining-requests')
+            if request_limit and request_remaining is not None:
+                self.daily_limit = request_limit
+                self.daily_remaining = request_remaining
+                reset = parse_duration(headers.get('x-ratelimit-reset-requests'))
+                self.daily_reset_at = now + reset if reset is not None else None
+
+    def on_rate_limited(self, headers):
+        """
+        Handle a 429 response
+
+        Returns:
+            Seconds until the server accepts requests again
+        """
+        retry_after = parse_duration(headers.get('retry-after')) if headers else None
+        if retry_after is None:
+            retry_after = parse_duration(headers.get('x-ratelimit-reset-tokens')) if headers else None
+        retry_after = retry_after if retry_after is not None else 1.0
+
+        self.update_from_headers(headers or {})
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        return retry_after
+
+    def token_capacity(self):
+        """Tokens per minute; a request can't use more than this"""
+        with self._lock:
+            return int(self.tokens.capacity)
+
+    def expected_wait(self, tokens=500):
+        """Seconds a typical request would wait right now (for the router)"""
+        with self._lock:
+            return self._wait_time(tokens, time.monotonic())
+
+    def quota(self):
+        """Remaining quota, for logging and the router"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens._refill(now)
+            self.requests._refill(now)
+            return {
+                'tokens_remaining': max(0, int(self.tokens.level)),
+                'tokens_per_minute': int(self.tokens.capacity),
+                'requests_remaining': max(0, int(self.requests.level)),
+                'daily_requests_remaining': self.daily_remaining,
+                'blocked_for': max(0.0, self.blocked_until - now),
+                'delayed': self.delayed,
+                'rejected': self.rejected,
+            }
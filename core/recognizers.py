@@ -0,0 +1,232 @@
+"""
+Speech Recognition Engines
+Pluggable recognizers for STTHandler, chosen by config['stt']['engine']:
+"google" (online, the original behaviour), "vosk" and "faster_whisper"
+(offline, CPU). Each utterance is fed to a stream frame by frame while the
+user is still talking, so little work is left once they stop.
+"""
+
+import json
+import threading
+
+import numpy as np
+import speech_recognition as sr
+
+
+class GoogleStream:
+    """Collects the utterance and sends it to Google when it ends"""
+
+    def __init__(self, recognizer, sample_rate, language):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.language = language
+        self.frames = []
+
+    def accept(self, samples):
+        """Returns the partial transcript (Google gives none)"""
+        self.frames.append(samples)
+        return None
+
+    def finish(self):
+        audio = sr.AudioData(np.concatenate(self.frames).tobytes(), self.sample_rate, 2)
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return ""
+
+
+class GoogleRecognizer:
+    """Google Web Speech API through speech_recognition (needs network)"""
+    name = "google"
+    # Decodes only once the utterance ends, so it gets one long pause
+    offline = False
+
+    def __init__(self, config, sample_rate):
+        self.recognizer = sr.Recognizer()
+        self.sample_rate = sample_rate
+        self.language = config.get('language', "en-US")
+
+    def stream(self):
+        return GoogleStream(self.recognizer, self.sample_rate, self.language)
+
+
+class VoskStream:
+    """Kaldi decoding as audio arrives; the final result is nearly free"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []
+
+    def accept(self, samples):
+        if self.recognizer.AcceptWaveform(samples.tobytes()):
+            # Vosk found an endpoint inside the utterance
+            self.segments.append(json.loads(self.recognizer.Result()).get('text', ""))
+            return ' '.join(s for s in self.segments if s)
+        partial = json.loads(self.recognizer.PartialResult()).get('partial', "")
+        return ' '.join(s for s in self.segments + [partial] if s)
+
+    def finish(self):
+        self.segments.append(json.loads(self.recognizer.FinalResult()).get('text', ""))
+        return ' '.join(s for s in self.segments if s)
+
+
+class VoskRecognizer:
+    """Offline Kaldi models from alphacephei.com/vosk/models"""
+    name = "vosk"
+    offline = True
+
+    def __init__(self, config, sample_rate):
+        from vosk import Model, SetLogLevel
+
+        SetLogLevel(-1)
+        self.model = Model(config['vosk_model_path'])
+        self.sample_rate = sample_rate
+
+    def stream(self):
+        from vosk import KaldiRecognizer
+
+        return VoskStream(KaldiRecognizer(self.model, self.sample_rate))
+
+
+class WhisperStream:
+    """
+    Re-decodes the growing utterance in the background while it is spoken
+
+    Whisper has no streaming mode, so every `decode_interval` seconds of new
+    audio the not-yet-committed tail is transcribed on a worker thread.
+    Segments that end more than `holdback` seconds before the end of the
+    audio are unlikely to change and are committed; later decodes, and the
+    final one, only cover the audio after them.
+
+    In continuous speech Whisper may not close a segment for a while, so
+    once the decoded tail is longer than `max_tail` seconds every segment
+    but the last is committed too. finish() waits for a decode already
+    running (it commits most of the tail) and then decodes what is left,
+    so end-of-speech latency doesn't grow with the length of the utterance.
+    """
+
+    def __init__(self, model, sample_rate, language, decode_interval=0.6, holdback=1.0, max_tail=3.0):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.language = language
+        self.decode_interval = int(decode_interval * sample_rate)
+        self.holdback = holdback
+        self.max_tail = max_tail
+
+        self.frames = []
+        self.length = 0
+        self.decoded_length = 0
+        self.committed_text = []
+        self.committed_samples = 0
+        self.partial = ""
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def audio(self, start, end=None):
+        """Float audio between two sample positions, as Whisper wants it"""
+        samples = np.concatenate(self.frames)[start:end]
+        return samples.astype(np.float32) / 32768.0
+
+    def transcribe(self, start, prompt, end=None):
+        segments, _ = self.model.transcribe(
+            self.audio(start, end),
+            language=self.language,
+            beam_size=1,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False
+        )
+        return list(segments)
+
+    def _decode(self, length):
+        with self._lock:
+            start = self.committed_samples
+            prompt = ' '.join(self.committed_text)
+        segments = self.transcribe(start, prompt, length)
+
+        audio_seconds = (length - start) / self.sample_rate
+        long_tail = audio_seconds > self.max_tail
+        with self._lock:
+            texts = []
+            for index, segment in enumerate(segments):
+                settled = segment.end < audio_seconds - self.holdback or (long_tail and index < len(segments) - 1)
+                if settled and not texts:
+                    self.committed_text.append(segment.text.strip())
+                    self.committed_samples = start + int(segment.end * self.sample_rate)
+                else:
+                    texts.append(segment.text.strip())
+            self.partial = ' '.join(self.committed_text + texts)
+
+    def accept(self, samples):
+        self.frames.append(samples)
+        self.length += len(samples)
+        idle = self._worker is None or not self._worker.is_alive()
+        if idle and self.length - self.decoded_length >= self.decode_interval:
+            self.decoded_length = self.length
+            self._worker = threading.Thread(target=self._decode, args=(self.length,), daemon=True)
+            self._worker.start()
+        with self._lock:
+            return self.partial or None
+
+    def finish(self):
+        if self._worker is not None:
+            self._worker.join()
+        if not self.frames:
+            return ""
+        with self._lock:
+            start = self.committed_samples
+            committed = list(self.committed_text)
+        segments = self.transcribe(start, ' '.join(committed))
+        return ' '.join(committed + [segment.text.strip() for segment in segments]).strip()
+
+
+class FasterWhisperRecognizer:
+    """Whisper on CPU with int8 weights via faster-whisper (CTranslate2)"""
+    name = "faster_whisper"
+    offline = True
+
+    def __init__(self, config, sample_rate):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            config.get('whisper_model', "base.en"),
+            device="cpu",
+            compute_type=config.get('whisper_compute_type', "int8"),
+            cpu_threads=config.get('whisper_threads', 0)
+        )
+        self.sample_rate = sample_rate
+        self.language = config.get('whisper_language', "en")
+        self.decode_interval = config.get('whisper_decode_interval', 0.6)
+        self.max_tail = config.get('whisper_max_tail', 3.0)
+
+    def stream(self):
+        return WhisperStream(
+            self.model, self.sample_rate, self.language, self.decode_interval, max_tail=self.max_tail
+        )
+
+
+RECOGNIZERS = {
+    'google': GoogleRecognizer,
+    'vosk': VoskRecognizer,
+    'faster_whisper': FasterWhisperRecognizer,
+}
+
+
+def create_recognizer(config, sample_rate):
+    """
+    Recognizer named by config['stt']['engine']
+
+    Falls back to Google if the engine is unknown or can't be loaded
+    (missing package or model).
+    """
+    stt_config = (config or {}).get('stt', {})
+    engine = stt_config.get('engine', "google")
+    if engine not in RECOGNIZERS:
+        print(f"⚠️ Unknown speech recognition engine: {engine}, using Google")
+        engine = "google"
+    try:
+        recognizer = RECOGNIZERS[engine](stt_config, sample_rate)
+    except Exception as e:
+        print(f"⚠️ Could not load {engine} speech recognition ({e}), using Google")
+        return GoogleRecognizer(stt_config, sample_rate)
+    print(f"✅ Speech recognition: {engine}")
+    return recognizer
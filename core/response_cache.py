@@ -0,0 +1,312 @@
+"""
+Response Cache for repeated prompts
+Short requests like greetings or "play some music" come up many times a
+day; answering them from cache skips the LLM round trip entirely
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import numpy as np
+
+
+# Answers to these change with the clock (or the world), not the words
+TIME_DEPENDENT_WORDS = frozenset((
+    'time', 'date', 'day', 'today', 'tonight', 'tomorrow', 'yesterday', 'now',
+    'weather', 'temperature', 'forecast', 'news', 'latest', 'current', 'score',
+))
+
+# Words that point back at the conversation ("play it again", "why that one?")
+REFERENCE_WORDS = frozenset((
+    'it', 'its', 'this', 'that', 'these', 'those', 'they', 'them', 'their',
+    'he', 'him', 'his', 'she', 'her', 'one', 'same', 'again', 'else', 'more',
+    'instead', 'another',
+))
+
+# Inputs made only of these are answers or follow-ups ("yes", "why?", "and then?")
+FOLLOW_UP_WORDS = frozenset((
+    'yes', 'yeah', 'yep', 'no', 'nope', 'ok', 'okay', 'sure', 'why', 'how',
+    'really', 'and', 'then', 'so', 'but', 'also', 'what', 'go', 'on', 'please',
+))
+
+# Query embeddings kept for a following put() of the same input
+MAX_PENDING_EMBEDDINGS = 64
+
+
+def normalize_input(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def conversation_digest(messages):
+    """Short hash of {'role', 'content'} messages ("" for none)"""
+    if not messages:
+        return ""
+    text = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def depends_on_context(text):
+    """True if the answer to this input depends on what was said before"""
+    words = normalize_input(text).split()
+    return (
+        bool(REFERENCE_WORDS.intersection(words))
+        or all(word in FOLLOW_UP_WORDS for word in words)
+        or words[0] in ('and', 'but', 'so', 'then', 'also')
+    )
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of raw LLM responses
+
+    Entries are keyed on the normalized input, the mood context and the
+    backend/model that produced them. Inputs that refer back to the
+    conversation (see depends_on_context()) are also keyed on a digest of
+    the conversation leading up to them (see conversation_digest()), so
+    "yes" or "why?" only replays an answer given at the same point of the
+    same conversation, while "hello there" hits whatever came before it.
+    Inputs that ask about the time, weather, news and the
+    like are never cached. Raw responses are stored (action tags
+    included), so callers still run them through parse_actions.
+
+    The cache is persisted to a JSON file so it survives restarts. put()
+    only marks it changed; a background thread writes it at most every
+    `save_delay` seconds, and flush() writes any pending change at exit.
+
+    If an `embedder` function (text -> vector) is given, a miss on the
+    exact key falls back to the most similar cached input in the same
+    scope, if its cosine similarity reaches `similarity_threshold`.
+    Embeddings are computed on a worker thread: a lookup waits at most
+    `embedding_timeout` seconds for the query's (then misses), and the
+    same embedding is later attached to the entry put() stores for it.
+    """
+
+    def __init__(self, path="response_cache.json", ttl=43200, max_entries=256,
+                 max_words=8, embedder=None, similarity_threshold=0.92,
+                 embedding_timeout=0.05, save_delay=5.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_words = max_words
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.embedding_timeout = embedding_timeout
+        self.save_delay = save_delay
+
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.load()
+
+        # Normalized input -> Future of its embedding
+        self._embeddings = OrderedDict()
+        self._embed_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-embed") if embedder else None
+
+        self._dirty = threading.Event()
+        self._save_lock = threading.Lock()
+        self._saver = None
+
+    @classmethod
+    def from_config(cls, config, embedder=None):
+        """Build a cache from the "cache" section of config.json"""
+        cache_config = config.get('cache', {})
+        return cls(
+            path=cache_config.get('path', "response_cache.json"),
+            ttl=cache_config.get('ttl_seconds', 43200),
+            max_entries=cache_config.get('max_entries', 256),
+            max_words=cache_config.get('max_words', 8),
+            embedder=embedder if cache_config.get('embedding_model') else None,
+            similarity_threshold=cache_config.get('similarity_threshold', 0.92),
+            embedding_timeout=cache_config.get('embedding_timeout', 0.05),
+            save_delay=cache_config.get('save_delay', 5.0)
+        )
+
+    def _scope(self, user_input, mood_context, backend, model, context):
+        if not depends_on_context(user_input):
+            context = ""
+        return f"{backend}|{model}|{mood_context}|{context}"
+
+    def is_cacheable(self, user_input):
+        """Only short requests whose answer doesn't depend on the time"""
+        words = normalize_input(user_input).split()
+        return 0 < len(words) <= self.max_words and not TIME_DEPENDENT_WORDS.intersection(words)
+
+    def get(self, user_input, mood_context, backend, model, context=""):
+        """
+        Cached raw response for this request, or None
+
+        Args:
+            context: conversation_digest() of the conversation so far
+                     (ignored for inputs that don't refer back to it)
+        """
+        if not self.is_cacheable(user_input):
+            return None
+
+        scope = self._scope(user_input, mood_context, backend, model, context)
+        normalized = normalize_input(user_input)
+        key = f"{scope}|{normalized}"
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry['response']
+
+        entry = self._nearest(scope, normalized)
+        with self._lock:
+            if entry:
+                nearest_key = f"{scope}|{entry['input']}"
+                if nearest_key in self.entries:
+                    self.entries.move_to_end(nearest_key)
+                self.hits += 1
+                return entry['response']
+            self.misses += 1
+        return None
+
+    def put(self, user_input, mood_context, backend, model, response, context=""):
+        """Store a raw response; it is embedded and saved in the background"""
+        if not response or not self.is_cacheable(user_input):
+            return
+
+        scope = self._scope(user_input, mood_context, backend, model, context)
+        normalized = normalize_input(user_input)
+        entry = {
+            'scope': scope,
+            'input': normalized,
+            'response': response,
+            'created': time.time()
+        }
+
+        key = f"{scope}|{normalized}"
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            future = self._embeddings.pop(normalized, None)
+        if self.embedder:
+            future = future or self._embed_executor.submit(self.embedder, normalized)
+            future.add_done_callback(lambda done: self._attach_embedding(entry, done))
+        self.schedule_save()
+
+    def _embedding(self, normalized):
+        """Future of the embedding of `normalized`, started if need be"""
+        with self._lock:
+            future = self._embeddings.get(normalized)
+            if future is None:
+                future = self._embed_executor.submit(self.embedder, normalized)
+                self._embeddings[normalized] = future
+                while len(self._embeddings) > MAX_PENDING_EMBEDDINGS:
+                    self._embeddings.popitem(last=False)
+        return future
+
+    def _attach_embedding(self, entry, future):
+        """Worker thread: store a finished embedding on its entry"""
+        try:
+            embedding = list(future.result())
+        except Exception as e:
+            print(f"⚠️ Could not embed cache entry: {e}")
+            return
+        with self._lock:
+            entry['embedding'] = embedding
+        self.schedule_save()
+
+    def _nearest(self, scope, normalized):
+        """Most similar cached entry in the same scope, if similar enough"""
+        if not self.embedder:
+            return None
+
+        with self._lock:
+            candidates = [entry for entry in self.entries.values()
+                          if entry['scope'] == scope and 'embedding' in entry]
+        if not candidates:
+            return None
+
+        try:
+            query = np.asarray(self._embedding(normalized).result(self.embedding_timeout), dtype=np.float32)
+        except FutureTimeout:
+            # Don't hold up the turn; put() reuses the embedding when it's done
+            return None
+        except Exception as e:
+            print(f"⚠️ Could not embed query: {e}")
+            return None
+
+        matrix = np.asarray([entry['embedding'] for entry in candidates], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = matrix @ query / np.maximum(norms, 1e-9)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return candidates[best]
+        return None
+
+    def _expire(self, now):
+        """Drop entries older than the TTL (lock must be held)"""
+        expired = [key for key, entry in self.entries.items() if now - entry['created'] > self.ttl]
+        for key in expired:
+            del self.entries[key]
+
+    def load(self):
+        """Load persisted entries, skipping expired ones"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not load response cache: {e}")
+            return
+
+        with self._lock:
+            for entry in entries:
+                self.entries[f"{entry['scope']}|{entry['input']}"] = entry
+            self._expire(time.time())
+
+    def schedule_save(self):
+        """Have the saver thread write the cache soon"""
+        if not self.path:
+            return
+        self._dirty.set()
+        with self._lock:
+            if self._saver is None:
+                self._saver = threading.Thread(target=self._save_loop, name="cache-saver", daemon=True)
+                self._saver.start()
+
+    def _save_loop(self):
+        """Saver thread: one write per `save_delay` seconds of changes"""
+        while True:
+            self._dirty.wait()
+            time.sleep(self.save_delay)
+            self.flush()
+
+    def flush(self):
+        """Write the cache now if it has unsaved changes"""
+        if self._dirty.is_set():
+            self._dirty.clear()
+            self.save()
+
+    def save(self):
+        """Write the cache to disk (atomically, so a crash can't corrupt it)"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        try:
+            with self._save_lock:
+                temp_path = f"{self.path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not save response cache: {e}")
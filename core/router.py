@@ -0,0 +1,134 @@
+"""
+Latency-SLO Router for auto mode
+Picks the backend with the best recent time-to-first-token instead of a
+fixed priority order
+"""
+
+import threading
+import time
+
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 / rate-limit exceptions from any client library"""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    return 'RateLimit' in type(error).__name__
+
+
+class LatencyRouter:
+    """
+    Chooses among candidate backends using live telemetry
+
+    A backend is eligible if the health monitor doesn't consider it down
+    and it hasn't been demoted. Among eligible backends, the one with the
+    lowest p95 time-to-first-token that meets `slo_ms` wins; backends with
+    too few recent samples are treated as fast so they get tried and
+    measured. Calls abandoned before their first token (hedge losers,
+    deadline misses) count with the time they waited, so a slow backend
+    doesn't stay unmeasured. Ties go to the earlier candidate (the configured priority).
+    If nothing meets the SLO, the fastest eligible backend is used.
+
+    Errors demote a backend for `demote_seconds` (longer when rate limited);
+    when the demotion ends it is re-probed in the background.
+
+    Backends with a client-side rate limiter report how long a request
+    would wait for quota; that wait is added to their expected first-token
+    time, so traffic moves elsewhere before the limit is actually hit.
+    """
+
+    def __init__(self, telemetry, health, slo_ms=1500, window=300, min_samples=3,
+                 demote_seconds=30, rate_limit_demote_seconds=60):
+        self.telemetry = telemetry
+        self.health = health
+        self.slo_ms = slo_ms
+        self.window = window
+        self.min_samples = min_samples
+        self.demote_seconds = demote_seconds
+        self.rate_limit_demote_seconds = rate_limit_demote_seconds
+
+        self.demoted_until = {}
+        self._lock = threading.Lock()
+        self.last_decision = None
+        # name -> function returning the current quota wait in seconds
+        self.quota_waits = {}
+
+    @classmethod
+    def from_config(cls, config, telemetry, health):
+        preferences = config.get('preferences', {})
+        return cls(
+            telemetry,
+            health,
+            slo_ms=preferences.get('ttft_slo_ms', 1500),
+            window=config.get('telemetry', {}).get('windows', [300])[0]
+        )
+
+    def add_quota(self, name, expected_wait):
+        """Register a backend's rate limiter (expected_wait() -> seconds)"""
+        self.quota_waits[name] = expected_wait
+
+    def quota_wait_ms(self, name):
+        expected_wait = self.quota_waits.get(name)
+        return expected_wait() * 1000 if expected_wait else 0
+
+    def demote(self, name, seconds, reason):
+        """Take a backend out of rotation for a while"""
+        with self._lock:
+            self.demoted_until[name] = time.monotonic() + seconds
+        print(f"📉 Demoting {name} for {seconds}s ({reason})")
+
+        # Re-probe once the demotion is over
+        timer = threading.Timer(seconds, self.health.probe, args=(name,))
+        timer.daemon = True
+        timer.start()
+
+    def is_demoted(self, name):
+        with self._lock:
+            until = self.demoted_until.get(name)
+            if until is None:
+                return False
+            if time.monotonic() >= until:
+                self.demoted_until.pop(name, None)
+                return False
+            return True
+
+    def on_error(self, name, error):
+        """Demote a backend after a failed call"""
+        if is_rate_limit_error(error):
+            # Our own scheduler knows when quota returns
+            seconds = getattr(error, 'wait', None) or self.rate_limit_demote_seconds
+            self.demote(name, round(seconds, 1), "rate limited")
+        else:
+            self.demote(name, self.demote_seconds, type(error).__name__)
+
+    def ttft_p95(self, name):
+        """Recent p95 time-to-first-token, or None without enough samples"""
+        stats = self.telemetry.percentiles(name, 'ttft_ms', self.window)
+        if stats['count'] < self.min_samples:
+            return None
+        return stats['p95']
+
+    def pick(self, candidates):
+        """
+        Args:
+            candidates: Backends in priority order; the last one is used if
+                        none are eligible (normally Ollama)
+        """
+        eligible = [backend for backend in candidates
+                    if self.health.is_available(backend.name) and not self.is_demoted(backend.name)]
+        if not eligible:
+            return candidates[-1]
+
+        scored = []
+        for priority, backend in enumerate(eligible):
+            p95 = self.ttft_p95(backend.name)
+            # Unmeasured backends score 0 so they get explored
+            score = (p95 if p95 is not None else 0) + self.quota_wait_ms(backend.name)
+            scored.append((score, priority, backend))
+
+        within_slo = [entry for entry in scored if entry[0] <= self.slo_ms]
+        score, _, choice = min(within_slo or scored, key=lambda entry: entry[:2])
+
+        if choice.name != self.last_decision:
+            print(f"🧭 Routing to {choice.name} (expected first token {score:.0f} ms, SLO {self.slo_ms} ms)")
+        self.last_decision = choice.name
+        return choice
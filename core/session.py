@@ -0,0 +1,95 @@
+"""
+Conversation Sessions
+Per-client state (history, mood, backend mode) so one LLMHandler can serve
+several clients at once
+"""
+
+import threading
+import time
+import uuid
+
+
+class Session:
+    """
+    State of one conversation
+
+    The desktop app uses LLMHandler's default session; the headless server
+    creates one per client. A session handles one turn at a time (hold
+    `lock` for the duration of a turn); different sessions run concurrently.
+    """
+
+    def __init__(self, conversation, mode=None, session_id=None):
+        """
+        Args:
+            conversation: ContextWindow holding this session's history
+            mode: LLM mode for this session ("auto", "ollama", ...); None
+                  follows config['llm']['mode']
+            session_id: Defaults to a random id
+        """
+        self.id = session_id or uuid.uuid4().hex
+        self.conversation = conversation
+        self.mode = mode
+        self.mood_context = ""
+        self.last_result = None
+        # Speculative sessions (LLMHandler.speculative_session()) hold the
+        # finished exchange here instead of adding it to the conversation
+        self.speculative = False
+        self.pending_exchange = None
+
+        self.lock = threading.Lock()
+        self.created_at = time.time()
+        self.last_active = self.created_at
+
+    def touch(self):
+        self.last_active = time.time()
+
+
+class SessionManager:
+    """Creates, looks up and expires sessions for an LLMHandler"""
+
+    def __init__(self, llm, max_sessions=32, idle_timeout=1800):
+        """
+        Args:
+            llm: LLMHandler shared by all sessions
+            max_sessions: Sessions kept at once; the least recently used
+                          one is dropped to make room
+            idle_timeout: Seconds without a turn before a session expires
+        """
+        self.llm = llm
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, mode=None):
+        session = self.llm.new_session(mode)
+        with self._lock:
+            self._expire_idle()
+            if len(self.sessions) >= self.max_sessions:
+                oldest = min(self.sessions.values(), key=lambda s: s.last_active)
+                print(f"🗑️ Dropping session {oldest.id} to make room")
+                del self.sessions[oldest.id]
+            self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        """Session by id, or None if unknown or expired"""
+        with self._lock:
+            self._expire_idle()
+            session = self.sessions.get(session_id)
+        if session:
+            session.touch()
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _expire_idle(self):
+        """Drop idle sessions (lock must be held)"""
+        cutoff = time.time() - self.idle_timeout
+        for session_id in [sid for sid, s in self.sessions.items() if s.last_active < cutoff]:
+            del self.sessions[session_id]
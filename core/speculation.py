@@ -0,0 +1,211 @@
+"""
+Speculative Turns
+While the user is still talking, a partial transcript that has stopped
+changing is sent to the LLM (after a sentiment pass) ahead of time. If the
+final transcript says the same thing, the turn continues from that response
+instead of starting from scratch; otherwise it is cancelled and never
+reaches the conversation.
+"""
+
+import re
+import threading
+import time
+
+
+def normalize_transcript(text):
+    """Lowercase words only, so "Hi, there." matches "hi there" """
+    return ' '.join(re.findall(r"[\w']+", text.lower()))
+
+
+class SpeculativeTurn:
+    """
+    An LLM request for a partial transcript, running on the event loop
+
+    It answers on a scratch session (LLMHandler.speculative_session()) that
+    sees the real conversation but holds the exchange back. adopt() makes
+    it the real turn; cancel() stops the request at once.
+    """
+
+    def __init__(self, llm, text, analysis, mood_context, session=None):
+        """
+        Args:
+            llm: LLMHandler
+            text: The partial transcript
+            analysis: SentimentAnalyzer.analyze() result for text
+            mood_context: Mood context to answer with
+            session: Session the turn would belong to; defaults to llm.session
+        """
+        self.llm = llm
+        self.text = text
+        self.key = normalize_transcript(text)
+        self.analysis = analysis
+        self.mood_context = mood_context
+        self.started_at = time.perf_counter()
+
+        self.scratch = llm.speculative_session(session)
+        self.scratch.mood_context = mood_context
+        self.deltas = []
+        self.done = False
+        self._changed = threading.Condition()
+
+        self.future = llm.event_loop.submit(self._run())
+        self.future.add_done_callback(self._finished)
+
+    async def _run(self):
+        async for delta in self.llm.achat_stream(self.text, session=self.scratch):
+            with self._changed:
+                self.deltas.append(delta)
+                self._changed.notify_all()
+
+    def _finished(self, future):
+        if not future.cancelled() and future.exception():
+            print(f"⚠️ Speculative request failed: {future.exception()}")
+        with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    def cancel(self):
+        """Abandon the request (closes the backend's stream)"""
+        self.future.cancel()
+
+    def adopt(self, user_input, session=None):
+        """
+        Continue the turn from the speculative response
+
+        Yields the deltas generated so far at once, then the rest as they
+        arrive, like chat_stream(). Once complete the exchange is committed
+        for user_input and session.last_result is set; closing the generator
+        early cancels the request instead.
+        """
+        index = 0
+        completed = False
+        try:
+            while True:
+                with self._changed:
+                    self._changed.wait_for(lambda: index < len(self.deltas) or self.done)
+                    pending = self.deltas[index:]
+                    finished = self.done
+                index += len(pending)
+                yield from pending
+                if finished:
+                    break
+            completed = True
+        finally:
+            if not completed:
+                self.cancel()
+        self.llm.commit_speculation(self.scratch, user_input, session)
+
+
+class Speculator:
+    """
+    Starts speculative turns from partial transcripts and keeps score
+
+    on_partial() is called with every partial while the user speaks. Once
+    one has stayed the same for `stable_for` seconds, its sentiment is
+    analysed and a SpeculativeTurn starts; a partial that changes after
+    that cancels it. take() is called with the final transcript and returns
+    the turn on a match. Each outcome is logged: a hit with the head start
+    it gave the LLM, a miss (final transcript differs) or superseded.
+    """
+
+    def __init__(self, llm, analyze, stable_for=0.4, min_words=2, skip=None):
+        """
+        Args:
+            llm: LLMHandler
+            analyze: Function text -> (sentiment analysis, mood context)
+            stable_for: Seconds a partial must stay unchanged
+            min_words: Shorter partials are not worth a request
+            skip: Function text -> True for inputs that never reach the LLM
+                  (exit words, local commands)
+        """
+        self.llm = llm
+        self.analyze = analyze
+        self.stable_for = stable_for
+        self.min_words = min_words
+        self.skip = skip
+
+        self.turn = None
+        self._partial = None
+        self._partial_since = None
+
+        self.counts = {'hit': 0, 'miss': 0, 'superseded': 0}
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, llm, analyze, config, skip=None):
+        """Build from the "speculation" section of config.json (None if disabled)"""
+        speculation_config = (config or {}).get('speculation', {})
+        if not speculation_config.get('enabled', True):
+            return None
+        return cls(
+            llm,
+            analyze,
+            stable_for=speculation_config.get('stable_for', 0.4),
+            min_words=speculation_config.get('min_words', 2),
+            skip=skip
+        )
+
+    def on_partial(self, text):
+        """Feed the current partial transcript (on every new frame)"""
+        key = normalize_transcript(text)
+        now = time.perf_counter()
+        if key != self._partial:
+            self._partial = key
+            self._partial_since = now
+            if self.turn is not None:
+                # The user kept talking; this guess is already wrong
+                self.turn.cancel()
+                self.turn = None
+                self.record('superseded')
+            return
+
+        if self.turn is not None or now - self._partial_since < self.stable_for:
+            return
+        if len(key.split()) < self.min_words or (self.skip and self.skip(text)):
+            return
+        analysis, mood_context = self.analyze(text)
+        self.turn = SpeculativeTurn(self.llm, text, analysis, mood_context)
+
+    def take(self, text):
+        """
+        The speculative turn for the final transcript, if it matches
+
+        Returns:
+            SpeculativeTurn to adopt(), or None (any other turn is cancelled)
+        """
+        turn, self.turn = self.turn, None
+        self._partial = None
+        if turn is None:
+            return None
+        if text and normalize_transcript(text) == turn.key and not (self.skip and self.skip(text)):
+            self.record('hit', (time.perf_counter() - turn.started_at) * 1000)
+            return turn
+        turn.cancel()
+        self.record('miss')
+        return None
+
+    def record(self, outcome, saved_ms=0.0):
+        """Log one speculation outcome"""
+        with self._lock:
+            self.counts[outcome] += 1
+            self.saved_ms += saved_ms
+            attempts = sum(self.counts.values())
+            rate = self.counts['hit'] / attempts
+
+        detail = f", {saved_ms:.0f} ms head start" if outcome == 'hit' else ""
+        print(f"🔮 Speculation {outcome}{detail}; hit rate {rate:.0%} over {attempts} attempts")
+
+    def snapshot(self):
+        """Speculation statistics, as a JSON-friendly dict"""
+        with self._lock:
+            attempts = sum(self.counts.values())
+            return {
+                'attempts': attempts,
+                'hits': self.counts['hit'],
+                'misses': self.counts['miss'],
+                'superseded': self.counts['superseded'],
+                'hit_rate': self.counts['hit'] / attempts if attempts else None,
+                'saved_ms': self.saved_ms,
+                'mean_saved_ms': self.saved_ms / self.counts['hit'] if self.counts['hit'] else None,
+            }
@@ -0,0 +1,133 @@
+"""
+Sentence Pipeline between the LLM and TTS
+Cuts a streamed LLM response into sentences so speech can start early
+"""
+
+import re
+import queue
+import threading
+import time
+
+
+# Sentence ends at . ! ? (or the Hindi danda) followed by whitespace,
+# optionally after closing quotes/brackets, or at a line break
+SENTENCE_END = re.compile(r'(?<=[.!?।…])["\')\]]*\s+|\n+')
+
+# Abbreviations that end with a period but don't end a sentence
+ABBREVIATIONS = ('mr.', 'mrs.', 'ms.', 'dr.', 'prof.', 'sr.', 'jr.', 'st.', 'vs.', 'etc.', 'e.g.', 'i.e.')
+
+
+class SentenceChunker:
+    """Accumulates text deltas and returns sentences once they are complete"""
+
+    def __init__(self, min_chars=12):
+        """
+        Args:
+            min_chars: Shorter fragments are merged into the next sentence
+                       so TTS isn't started for a lone "Oh!"
+        """
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, delta):
+        """Add a text delta, return the list of sentences it completed"""
+        self.buffer += delta
+
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            if candidate.lower().endswith(ABBREVIATIONS):
+                continue
+            sentences.append(candidate)
+            start = match.end()
+
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+class SentenceStream:
+    """
+    Consumes an LLM delta stream on a background thread
+
+    Complete sentences are queued as soon as they are available, so the
+    consumer (usually TTSHandler.speak_stream) can start speaking sentence N
+    while sentence N+1 is still being generated.
+
+    cancel() abandons the rest: at the next delta the producer closes the
+    delta generator, which cancels the LLM request before its exchange is
+    committed, and on_complete is not called.
+    """
+
+    def __init__(self, deltas, clean=None, on_complete=None):
+        """
+        Args:
+            deltas: Iterable of text deltas (e.g. LLMHandler.chat_stream())
+            clean: Optional function applied to each sentence before it is
+                   queued (e.g. to strip action tags); empty results are dropped
+            on_complete: Optional callback run on the producer thread once
+                         the delta stream is exhausted
+        """
+        self.deltas = deltas
+        self.clean = clean
+        self.on_complete = on_complete
+        self.sentence_queue = queue.Queue()
+        self.started_at = None
+        self.first_token_at = None
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _put(self, sentence):
+        if self.clean:
+            sentence = self.clean(sentence)
+        if sentence:
+            self.sentence_queue.put(sentence)
+
+    def _run(self):
+        chunker = SentenceChunker()
+        try:
+            for delta in self.deltas:
+                if self.cancelled.is_set():
+                    break
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                for sentence in chunker.feed(delta):
+                    self._put(sentence)
+            else:
+                for sentence in chunker.flush():
+                    self._put(sentence)
+
+                if self.on_complete:
+                    self.on_complete()
+                return
+
+            # Cancelled: generators are closed on the thread iterating them
+            if hasattr(self.deltas, 'close'):
+                self.deltas.close()
+        except Exception as e:
+            print(f"❌ Error in sentence pipeline: {e}")
+        finally:
+            # Sentinel: no more sentences
+            self.sentence_queue.put(None)
+
+    def __iter__(self):
+        return iter(self.sentence_queue.get, None)
@@ -0,0 +1,84 @@
+"""
+Background Stream Worker
+Runs a backend's chat_stream() on its own thread so several can be raced
+against each other, and abandoned ones can be cancelled
+"""
+
+import threading
+import time
+
+
+# Seconds a backend gets to produce its first token, and to finish
+DEFAULT_DEADLINES = {
+    'ollama': {'first_token': 30, 'total': 90},
+    'ollama_small': {'first_token': 10, 'total': 45},
+    'llamacpp': {'first_token': 30, 'total': 90},
+    'groq': {'first_token': 5, 'total': 30},
+    'gemini': {'first_token': 8, 'total': 45},
+}
+
+
+def get_deadlines(config, backend_name):
+    """First-token and total deadlines for a backend, from config['llm']['deadlines']"""
+    deadlines = dict(DEFAULT_DEADLINES.get(backend_name, {'first_token': 15, 'total': 60}))
+    deadlines.update(config.get('llm', {}).get('deadlines', {}).get(backend_name, {}))
+    return deadlines
+
+
+class DeadlineExceeded(TimeoutError):
+    """A backend missed its first-token or total deadline"""
+
+
+class StreamWorker:
+    """
+    Drains a delta generator on a daemon thread
+
+    Every event is put on the shared `events` queue as a tuple
+    (worker, kind, payload), where kind is:
+        'delta' - payload is a text delta
+        'error' - payload is the exception that ended the stream
+        'done'  - the stream completed (payload is None)
+
+    cancel() makes the worker close the generator at the next delta, so a
+    backend that loses the race never commits its exchange to history. A
+    worker stuck waiting on the network ends when its client times out.
+
+    first_token_deadline and total_deadline are time.monotonic() values
+    (None for no deadline); the consumer enforces them. started_at is when
+    start() was called, on the same clock.
+    """
+
+    def __init__(self, backend, name, stream, events, first_token_deadline=None, total_deadline=None):
+        self.backend = backend
+        self.name = name
+        self.stream = stream
+        self.events = events
+        self.first_token_deadline = first_token_deadline
+        self.total_deadline = total_deadline
+        self.cancelled = threading.Event()
+        self.started_at = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _run(self):
+        try:
+            for delta in self.stream:
+                if self.cancelled.is_set():
+                    break
+                if delta:
+                    self.events.put((self, 'delta', delta))
+            else:
+                self.events.put((self, 'done', None))
+                return
+            # Cancelled: closing the generator skips the history commit
+            self.stream.close()
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.events.put((self, 'error', e))
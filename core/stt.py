@@ -6,77 +6,164 @@ Supports background listening and interrupt detection
 import speech_recognition as sr
 import threading
 import time
+from collections import deque
+
+from core.aec import EchoCanceller
+from core.audio_capture import AudioCapture, FRAME_SAMPLES, SAMPLE_RATE
+from core.recognizers import create_recognizer
+from core.vad import VoiceActivityDetector
 
 
 class STTHandler:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        
-        # Voice activity detection settings
-        self.energy_threshold = 300  # Adjust based on your environment
-        self.recognizer.energy_threshold = self.energy_threshold
-        self.recognizer.dynamic_energy_threshold = True
-        
-        # Adjust for ambient noise
-        with self.microphone as source:
-            print("⚙️ Calibrating microphone for ambient noise...")
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
-            print(f"✅ Energy threshold set to {self.recognizer.energy_threshold}")
-    
-    def listen(self, timeout=5, phrase_time_limit=10):
-        """Listen for voice input with timeout"""
-        with self.microphone as source:
-            print("🎤 Listening...")
-            try:
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-                text = self.recognizer.recognize_google(audio)
-                print(f"✅ Heard: {text}")
-                return text
-            except sr.WaitTimeoutError:
-                return None
-            except sr.UnknownValueError:
-                print("❌ Could not understand audio")
-                return None
-            except sr.RequestError as e:
-                print(f"❌ Speech recognition error: {e}")
-                return None
-    
+    def __init__(self, config=None):
+        stt_config = (config or {}).get('stt', {})
+
+        # Removes the assistant's own voice from the microphone signal;
+        # TTSHandler feeds it what is playing (None if disabled)
+        self.echo_canceller = EchoCanceller.from_config(config, SAMPLE_RATE)
+
+        # One microphone stream for the whole session; every method below
+        # reads from its ring buffer instead of opening the device
+        self.capture = AudioCapture.from_config(config, self.echo_canceller).start()
+        self.frame_seconds = FRAME_SAMPLES / self.capture.sample_rate
+
+        # Google (online) or an offline engine, decoding while the user talks
+        self.engine = create_recognizer(config, self.capture.sample_rate)
+
+        # Audio kept from before speech starts, so the first syllable isn't clipped
+        self.pre_roll = stt_config.get('pre_roll', 0.3)
+        # Seconds of silence that end a phrase. Offline engines have
+        # decoded most of it by then, so they can cut much sooner
+        self.pause_threshold = stt_config.get('pause_threshold', 0.8)
+        self.offline_pause_threshold = stt_config.get('offline_pause_threshold', 0.2)
+        # time.perf_counter() at which the last voiced frame was captured
+        self.last_voiced_time = None
+
+        # Voice activity detection runs continuously on the capture stream
+        # (calibrating for ambient noise first)
+        self.vad = VoiceActivityDetector.from_config(self.capture, config).start()
+
+    def close(self):
+        self.vad.stop()
+        self.capture.stop()
+
+    def phrase_frames(self, timeout=5, phrase_time_limit=10, since=None):
+        """
+        Wait for speech and yield its frames as they are captured
+
+        Reading starts `pre_roll` seconds back in the buffer, and those
+        frames are yielded in front of the phrase. Yields nothing if nobody
+        spoke within `timeout` seconds. The phrase ends after
+        `pause_threshold` seconds of silence (`offline_pause_threshold` for
+        offline engines); last_voiced_time is kept up to date on the way.
+
+        Args:
+            since: Capture position where the phrase may already have
+                   started (e.g. vad.speech_started_at after a barge-in);
+                   reading starts `pre_roll` before it instead of before now
+        """
+        reader = self.capture.reader(lookback=self.pre_roll, since=since)
+        pre_roll = deque(maxlen=max(1, int(self.pre_roll / self.frame_seconds)))
+        deadline = time.monotonic() + timeout
+
+        def captured_at():
+            # The reader may lag behind the microphone (e.g. after a barge-in)
+            lag = (self.capture.buffer.write_index - reader.position) / self.capture.sample_rate
+            return time.perf_counter() - lag
+
+        # Wait for the first speech frame
+        for frame in reader.frames(timeout=1.0):
+            if self.vad.is_voiced(frame):
+                self.last_voiced_time = captured_at()
+                yield from pre_roll
+                yield frame
+                break
+            pre_roll.append(frame)
+            if time.monotonic() > deadline:
+                return
+        else:
+            # The device stopped delivering audio
+            return
+
+        # Continue until a long enough pause or the phrase limit
+        frame_count = len(pre_roll) + 1
+        silent_frames = 0
+        pause = self.offline_pause_threshold if self.engine.offline else self.pause_threshold
+        pause_frames = max(1, int(pause / self.frame_seconds))
+        max_frames = int(phrase_time_limit / self.frame_seconds)
+        for frame in reader.frames(timeout=1.0):
+            if self.vad.is_voiced(frame):
+                self.last_voiced_time = captured_at()
+                silent_frames = 0
+            else:
+                silent_frames += 1
+            yield frame
+            frame_count += 1
+            if silent_frames >= pause_frames or frame_count >= max_frames:
+                return
+
+    def listen(self, timeout=5, phrase_time_limit=10, on_partial=None, since=None):
+        """
+        Listen for voice input with timeout
+
+        Args:
+            on_partial: Called with the partial transcript after every frame
+                        while the user speaks (engines that decode as audio
+                        arrives; Google gives none)
+            since: Capture position to start from (see phrase_frames())
+        """
+        print("🎤 Listening...")
+        stream = self.engine.stream()
+        heard = False
+        for frame in self.phrase_frames(timeout, phrase_time_limit, since):
+            # Offline engines decode here, while the user is still talking
+            partial = stream.accept(frame)
+            heard = True
+            if partial and on_partial:
+                on_partial(partial)
+        if not heard:
+            return None
+
+        try:
+            text = stream.finish()
+        except sr.RequestError as e:
+            print(f"❌ Speech recognition error: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ Speech recognition error ({self.engine.name}): {e}")
+            return None
+
+        if not text:
+            print("❌ Could not understand audio")
+            return None
+        print(f"✅ Heard: {text} ({(time.perf_counter() - self.last_voiced_time) * 1000:.0f} ms after end of speech)")
+        return text
+
     def is_speaking(self, duration=0.5):
         """
         Detect if user is currently speaking
         Used for interrupt detection during TTS playback
-        
+
+        Reads the voice activity detector's state, so it returns immediately.
+
         Args:
-            duration: How long to listen for voice activity (seconds)
-        
+            duration: Also count speech that ended less than this long ago (seconds)
+
         Returns:
             bool: True if voice detected, False otherwise
         """
-        try:
-            with self.microphone as source:
-                # Quick check for audio above threshold
-                audio = self.recognizer.listen(source, timeout=duration, phrase_time_limit=duration)
-                # If we got audio, someone is speaking
-                return True
-        except sr.WaitTimeoutError:
-            # No voice detected in time window
-            return False
-        except Exception as e:
-            # Error in detection, assume not speaking
-            return False
-    
+        return self.vad.speech_within(duration)
+
     def listen_for_interrupt(self, callback, stop_event):
         """
         Background thread to monitor for voice interrupts
-        
+
         Args:
             callback: Function to call when interrupt detected
             stop_event: Threading event to signal when to stop monitoring
         """
         while not stop_event.is_set():
-            if self.is_speaking(duration=0.3):
+            if self.vad.wait_for_voice(timeout=0.1):
                 # User started speaking!
                 callback()
                 break
-            time.sleep(0.1)  # Check every 100ms
@@ -0,0 +1,178 @@
+"""
+LLM Latency Telemetry
+Per-backend rolling latency percentiles, kept in memory and dumped to a
+local file on exit
+"""
+
+import json
+import math
+import threading
+import time
+from collections import deque
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RollingWindow:
+    """Samples from the last `seconds` seconds (at most `max_samples`)"""
+
+    def __init__(self, seconds, max_samples=2000):
+        self.seconds = seconds
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, value, now=None):
+        self.samples.append((now or time.time(), value))
+
+    def values(self, now=None):
+        cutoff = (now or time.time()) - self.seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return [value for _, value in self.samples]
+
+    def summary(self, now=None):
+        values = sorted(self.values(now))
+        return {
+            'count': len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+        }
+
+
+class LatencyTelemetry:
+    """
+    Records one sample per backend call
+
+    Metrics per backend: ttft_ms (time to first token), total_ms,
+    tokens_in, tokens_out and tokens_per_sec, each as rolling p50/p95/p99
+    over every window in `windows` (seconds). Failed calls are counted by
+    error class, and missed first-token/total deadlines by kind.
+    """
+
+    METRICS = ('ttft_ms', 'total_ms', 'tokens_in', 'tokens_out', 'tokens_per_sec')
+
+    def __init__(self, windows=(300, 3600), path="llm_telemetry.json"):
+        self.windows = tuple(windows)
+        self.path = path
+        self.histograms = {}
+        self.errors = {}
+        self.deadline_misses = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build telemetry from the "telemetry" section of config.json"""
+        telemetry_config = config.get('telemetry', {})
+        return cls(
+            windows=telemetry_config.get('windows', (300, 3600)),
+            path=telemetry_config.get('path', "llm_telemetry.json")
+        )
+
+    def _histograms(self, backend):
+        """Per-metric, per-window histograms for a backend (lock must be held)"""
+        if backend not in self.histograms:
+            self.histograms[backend] = {
+                metric: {window: RollingWindow(window) for window in self.windows}
+                for metric in self.METRICS
+            }
+        return self.histograms[backend]
+
+    def record(self, backend, ttft_ms, total_ms, tokens_in, tokens_out):
+        """Record a completed call"""
+        generation_seconds = (total_ms - (ttft_ms or 0)) / 1000
+        tokens_per_sec = tokens_out / generation_seconds if generation_seconds > 0 else None
+        sample = {
+            'ttft_ms': ttft_ms,
+            'total_ms': total_ms,
+            'tokens_in': tokens_in,
+            'tokens_out': tokens_out,
+            'tokens_per_sec': tokens_per_sec,
+        }
+
+        now = time.time()
+        with self._lock:
+            self.calls[backend] = self.calls.get(backend, 0) + 1
+            histograms = self._histograms(backend)
+            for metric, value in sample.items():
+                if value is None:
+                    continue
+                for window in histograms[metric].values():
+                    window.add(value, now)
+
+    def record_censored_ttft(self, backend, ttft_ms):
+        """
+        Record how long an abandoned call waited without a first token
+
+        The real time-to-first-token was at least this long, so a backend
+        that keeps losing hedged races or missing deadlines still gets
+        slower in the router's eyes instead of staying unmeasured.
+        """
+        now = time.time()
+        with self._lock:
+            for window in self._histograms(backend)['ttft_ms'].values():
+                window.add(ttft_ms, now)
+
+    def record_error(self, backend, error_class):
+        """Count a failed call by exception class name"""
+        with self._lock:
+            errors = self.errors.setdefault(backend, {})
+            errors[error_class] = errors.get(error_class, 0) + 1
+
+    def record_deadline_miss(self, backend, kind):
+        """Count a call abandoned for missing its 'first_token' or 'total' deadline"""
+        with self._lock:
+            misses = self.deadline_misses.setdefault(backend, {})
+            misses[kind] = misses.get(kind, 0) + 1
+
+    def percentiles(self, backend, metric, window=None):
+        """
+        Rolling percentiles for one backend and metric
+
+        Returns:
+            dict with count, p50, p95, p99 (None when there are no samples)
+        """
+        window = window or self.windows[0]
+        with self._lock:
+            return self._histograms(backend)[metric][window].summary()
+
+    def snapshot(self):
+        """Everything recorded so far, as a JSON-friendly dict"""
+        now = time.time()
+        with self._lock:
+            backends = {}
+            for backend, histograms in self.histograms.items():
+                backends[backend] = {
+                    'calls': self.calls.get(backend, 0),
+                    'errors': dict(self.errors.get(backend, {})),
+                    'deadline_misses': dict(self.deadline_misses.get(backend, {})),
+                    'metrics': {
+                        metric: {f"{window}s": windows[window].summary(now) for window in windows}
+                        for metric, windows in histograms.items()
+                    }
+                }
+            for backend in set(self.errors) | set(self.deadline_misses):
+                backends.setdefault(backend, {
+                    'calls': 0,
+                    'errors': dict(self.errors.get(backend, {})),
+                    'deadline_misses': dict(self.deadline_misses.get(backend, {})),
+                    'metrics': {}
+                })
+        return {'timestamp': now, 'backends': backends}
+
+    def dump(self, path=None):
+        """Write the snapshot to a local file"""
+        path = path or self.path
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+        except Exception as e:
+            print(f"⚠️ Could not write telemetry: {e}")
@@ -9,6 +9,8 @@ import pygame
 import os
 import tempfile
 import subprocess
+import queue
+import threading
 from pathlib import Path
 
 
@@ -96,10 +98,15 @@ class TTSHandler:
     Tries Piper TTS first (anime voice), falls back to Edge TTS
     """
     
-    def __init__(self, engine="piper", config=None):
-        pygame.mixer.init(frequency=22050)  # Match Piper's sample rate
+    def __init__(self, engine="piper", config=None, playback=True, echo_reference=None):
+        # Headless use (the server) only synthesizes; no audio device needed
+        if playback:
+            pygame.mixer.init(frequency=22050)  # Match Piper's sample rate
         self.is_speaking = False
         self.should_stop = False
+        # EchoCanceller told what is being played, so the microphone can
+        # ignore it (STTHandler.echo_canceller)
+        self.echo_reference = echo_reference
         
         # Load config or use defaults
         if config:
@@ -145,72 +152,200 @@ class TTSHandler:
             pygame.mixer.music.stop()
         self.is_speaking = False
     
+    def synthesize(self, text):
+        """Generate audio for text into a temporary file
+        
+        Returns:
+            Path of the generated audio file, or None if generation failed
+        """
+        # Create temporary file
+        suffix = ".wav" if self.use_piper else ".mp3"
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as fp:
+            temp_filename = fp.name
+        
+        # Try Piper first, fallback to Edge if it fails
+        success = False
+        if self.use_piper:
+            success = self.piper_engine.generate_audio(text, temp_filename)
+            if not success:
+                print("Piper failed, falling back to Edge TTS")
+                # Try Edge TTS fallback
+                os.remove(temp_filename)
+                temp_filename = temp_filename.replace(".wav", ".mp3")
+                success = self.edge_engine.generate_audio(text, temp_filename)
+        else:
+            success = self.edge_engine.generate_audio(text, temp_filename)
+        
+        if not success:
+            print("❌ TTS generation failed")
+            self._remove_file(temp_filename)
+            return None
+        
+        return temp_filename
+    
+    def _remove_file(self, filename):
+        """Remove a temporary audio file, ignoring errors"""
+        try:
+            if os.path.exists(filename):
+                os.remove(filename)
+        except Exception as e:
+            print(f"Warning: Could not remove temp file: {e}")
+    
+    def load_reference(self, filename):
+        """Decode an audio file as the mixer will play it, mixed to mono
+        
+        Returns:
+            (samples, sample_rate), or None if it can't be decoded
+        """
+        try:
+            frequency = pygame.mixer.get_init()[0]
+            samples = pygame.sndarray.array(pygame.mixer.Sound(filename))
+        except Exception as e:
+            print(f"⚠️ Could not decode audio for echo cancellation: {e}")
+            return None
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        return samples, frequency
+    
+    def play_file(self, filename, interrupt_callback=None):
+        """Play an audio file, then delete it
+        
+        Returns:
+            bool: True if playback was interrupted
+        """
+        interrupted = False
+        
+        # Decode before starting, so the echo reference starts with the audio
+        reference = self.load_reference(filename) if self.echo_reference else None
+        
+        # Play audio
+        pygame.mixer.music.load(filename)
+        pygame.mixer.music.play()
+        if reference:
+            self.echo_reference.play(*reference)
+        
+        # Wait for playback to finish or stop signal, checking for interrupts.
+        # The callback only reads the VAD's state, so it can be polled often.
+        clock = pygame.time.Clock()
+        while pygame.mixer.music.get_busy() and not self.should_stop:
+            # Check for voice interrupt if callback provided
+            if interrupt_callback and interrupt_callback():
+                print("\n🔇 Interrupted by voice!")
+                self.should_stop = True
+                break
+            clock.tick(50)
+        
+        # Stop if interrupted
+        if self.should_stop:
+            pygame.mixer.music.stop()
+            if reference:
+                self.echo_reference.stop()
+            interrupted = True
+        
+        # Cleanup
+        pygame.mixer.music.unload()
+        
+        # Small delay before removing file (Windows can be finicky)
+        pygame.time.wait(100)
+        
+        self._remove_file(filename)
+        return interrupted
+    
     def speak(self, text, interrupt_callback=None):
         """Speak the given text using available TTS engine
         
         Args:
             text: Text to speak
             interrupt_callback: Optional function that returns True if should interrupt
+        
+        Returns:
+            bool: True if playback was interrupted
         """
         if not text:
-            return
+            return False
         
         self.is_speaking = True
         self.should_stop = False
         
         try:
-            # Create temporary file
-            suffix = ".wav" if self.use_piper else ".mp3"
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as fp:
-                temp_filename = fp.name
-            
-            # Try Piper first, fallback to Edge if it fails
-            success = False
-            if self.use_piper:
-                success = self.piper_engine.generate_audio(text, temp_filename)
-                if not success:
-                    print("Piper failed, falling back to Edge TTS")
-                    # Try Edge TTS fallback
-                    os.remove(temp_filename)
-                    temp_filename = temp_filename.replace(".wav", ".mp3")
-                    success = self.edge_engine.generate_audio(text, temp_filename)
-            else:
-                success = self.edge_engine.generate_audio(text, temp_filename)
-            
-            if not success:
-                print("❌ TTS generation failed")
-                return
-            
-            # Play audio
-            pygame.mixer.music.load(temp_filename)
-            pygame.mixer.music.play()
-            
-            # Wait for playback to finish or stop signal, checking for interrupts
-            while pygame.mixer.music.get_busy() and not self.should_stop:
-                # Check for voice interrupt if callback provided
-                if interrupt_callback and interrupt_callback():
-                    print("\n🔇 Interrupted by voice!")
-                    self.should_stop = True
-                    break
-                pygame.time.Clock().tick(10)
-            
-            # Stop if interrupted
-            if self.should_stop:
-                pygame.mixer.music.stop()
-            
-            # Cleanup
-            pygame.mixer.music.unload()
+            temp_filename = self.synthesize(text)
+            if not temp_filename:
+                return False
             
-            # Small delay before removing file (Windows can be finicky)
-            pygame.time.wait(100)
+            return self.play_file(temp_filename, interrupt_callback)
             
+        except Exception as e:
+            print(f"Error in TTS: {e}")
+            return False
+        finally:
+            self.is_speaking = False
+            self.should_stop = False
+    
+    def speak_stream(self, sentences, interrupt_callback=None, on_first_audio=None):
+        """Speak sentences as they arrive
+        
+        A background thread synthesizes sentence N+1 while sentence N plays,
+        so the first sentence can be heard before the rest is generated.
+        
+        Args:
+            sentences: Iterable of sentences (e.g. a SentenceStream), may block
+            interrupt_callback: Optional function that returns True if should interrupt
+            on_first_audio: Optional callback run when the first audio starts playing
+        
+        Returns:
+            bool: True if playback was interrupted
+        """
+        self.is_speaking = True
+        self.should_stop = False
+        
+        audio_queue = queue.Queue()
+        stop_event = threading.Event()
+        
+        def synthesize_ahead():
             try:
-                os.remove(temp_filename)
+                for sentence in sentences:
+                    if stop_event.is_set():
+                        break
+                    filename = self.synthesize(sentence)
+                    if not filename:
+                        continue
+                    if stop_event.is_set():
+                        self._remove_file(filename)
+                        break
+                    audio_queue.put(filename)
             except Exception as e:
-                print(f"Warning: Could not remove temp file: {e}")
-            
+                print(f"Error in TTS synthesis: {e}")
+            finally:
+                audio_queue.put(None)
+        
+        synth_thread = threading.Thread(target=synthesize_ahead, daemon=True)
+        synth_thread.start()
+        
+        interrupted = False
+        first_audio = True
+        try:
+            for filename in iter(audio_queue.get, None):
+                if first_audio:
+                    first_audio = False
+                    if on_first_audio:
+                        on_first_audio()
+                
+                if self.play_file(filename, interrupt_callback):
+                    interrupted = True
+                    break
         except Exception as e:
             print(f"Error in TTS: {e}")
         finally:
+            stop_event.set()
+            # Discard audio that was synthesized but never played
+            while True:
+                try:
+                    filename = audio_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if filename:
+                    self._remove_file(filename)
             self.is_speaking = False
             self.should_stop = False
+        
+        return interrupted
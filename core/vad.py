@@ -0,0 +1,211 @@
+"""
+Voice Activity Detection
+Classifies 30 ms frames of the capture stream as speech or not, on a
+background thread, and signals when the user starts talking. Used for
+barge-in during playback and for endpointing in STTHandler.listen().
+"""
+
+import threading
+
+import numpy as np
+
+from core.audio_capture import FRAME_SAMPLES
+
+
+class EnergyZcrClassifier:
+    """
+    Speech = loud enough and not noise-like
+
+    Frame energy (RMS) must exceed the adaptive noise floor by `ratio`, and
+    the zero-crossing rate must be below `max_zcr`: voiced speech crosses
+    zero far less often than hiss and fan noise of the same energy. All
+    frames of a batch are scored at once.
+    """
+
+    def __init__(self, ratio=3.0, min_energy=100, max_zcr=0.25):
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.max_zcr = max_zcr
+        self.noise_floor = None
+
+    def calibrate(self, frames):
+        """Set the noise floor from frames of (presumably) silence"""
+        self.noise_floor = float(np.median(self.energies(frames)))
+
+    def threshold(self):
+        return max(self.min_energy, (self.noise_floor or 0) * self.ratio)
+
+    @staticmethod
+    def energies(frames):
+        return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+    @staticmethod
+    def zero_crossing_rates(frames):
+        signs = np.signbit(frames)
+        return np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    def classify(self, frames, adapt=True):
+        """
+        Args:
+            frames: 2-D int16 array, one frame per row
+            adapt: Update the noise floor from the non-speech frames
+
+        Returns:
+            bool array, True for speech frames
+        """
+        energies = self.energies(frames)
+        voiced = (energies > self.threshold()) & (self.zero_crossing_rates(frames) < self.max_zcr)
+
+        # Let the floor follow slow changes in background noise
+        quiet = energies[~voiced]
+        if adapt and len(quiet):
+            level = float(np.mean(quiet))
+            self.noise_floor = level if self.noise_floor is None else 0.95 * self.noise_floor + 0.05 * level
+        return voiced
+
+
+class WebRtcClassifier:
+    """Google's WebRTC VAD (needs the webrtcvad package)"""
+
+    def __init__(self, sample_rate, aggressiveness=2):
+        import webrtcvad
+
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+
+    def calibrate(self, frames):
+        pass
+
+    def classify(self, frames, adapt=True):
+        return np.array([self.vad.is_speech(frame.tobytes(), self.sample_rate) for frame in frames])
+
+
+class VoiceActivityDetector:
+    """
+    Runs a frame classifier continuously on its own capture reader
+
+    Speech starts after `start_frames` consecutive speech frames (60 ms by
+    default) and ends after `end_frames` of non-speech. At the start,
+    `speaking` is set and speech_started_at records where in the capture
+    stream the speech began; is_speaking() and speech_within() only read
+    this state.
+    """
+
+    def __init__(self, capture, classifier, start_frames=2, end_frames=10):
+        """
+        Args:
+            capture: AudioCapture to read from
+            classifier: EnergyZcrClassifier or WebRtcClassifier
+            start_frames: Speech frames in a row that count as voice start
+            end_frames: Non-speech frames in a row that end it
+        """
+        self.capture = capture
+        self.classifier = classifier
+        self.start_frames = start_frames
+        self.end_frames = end_frames
+
+        self.speaking = threading.Event()
+        # Capture position at which the current/last speech started
+        self.speech_started_at = None
+        self.speech_ended_at = None
+
+        self._run_length = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, capture, config):
+        """Build from the "vad" section of config.json"""
+        vad_config = (config or {}).get('vad', {})
+        classifier = None
+        if vad_config.get('engine', "numpy") == "webrtc":
+            try:
+                classifier = WebRtcClassifier(capture.sample_rate, vad_config.get('aggressiveness', 2))
+            except Exception as e:
+                print(f"⚠️ WebRTC VAD unavailable ({e}), using the NumPy VAD")
+        if classifier is None:
+            classifier = EnergyZcrClassifier(
+                ratio=vad_config.get('energy_ratio', 3.0),
+                min_energy=vad_config.get('min_energy', 100),
+                max_zcr=vad_config.get('max_zcr', 0.25)
+            )
+        return cls(
+            capture,
+            classifier,
+            start_frames=vad_config.get('start_frames', 2),
+            end_frames=vad_config.get('end_frames', 10)
+        )
+
+    def start(self, calibration_seconds=1.0):
+        """Calibrate on the next stretch of audio, then start detecting"""
+        reader = self.capture.reader()
+        if calibration_seconds:
+            print("⚙️ Calibrating microphone for ambient noise...")
+            ambient = reader.read(int(calibration_seconds * self.capture.sample_rate), timeout=3)
+            if ambient is not None:
+                self.classifier.calibrate(self.to_frames(ambient))
+                if isinstance(self.classifier, EnergyZcrClassifier):
+                    print(f"✅ Energy threshold set to {self.classifier.threshold():.0f}")
+
+        self._thread = threading.Thread(target=self._run, args=(reader,), name="vad", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def to_frames(samples):
+        count = len(samples) // FRAME_SAMPLES
+        return samples[:count * FRAME_SAMPLES].reshape(count, FRAME_SAMPLES)
+
+    def is_voiced(self, frame):
+        """Classify a single frame (from any thread) with the current settings"""
+        return bool(self.classifier.classify(frame.reshape(1, -1), adapt=False)[0])
+
+    def _run(self, reader):
+        while not self._stop.is_set():
+            # Block for one frame, then take the whole frames already there
+            samples = reader.read(FRAME_SAMPLES, timeout=1.0)
+            if samples is None:
+                continue
+            backlog = (self.capture.buffer.write_index - reader.position) // FRAME_SAMPLES * FRAME_SAMPLES
+            if backlog:
+                samples = np.concatenate((samples, reader.read(backlog, timeout=0)))
+
+            voiced = self.classifier.classify(self.to_frames(samples))
+            end_position = reader.position
+            for index, is_speech in enumerate(voiced):
+                position = end_position - (len(voiced) - index) * FRAME_SAMPLES
+                self._update(bool(is_speech), position)
+
+    def _update(self, is_speech, position):
+        """Advance the start/end state machine by one frame"""
+        if is_speech != self.speaking.is_set():
+            self._run_length += 1
+        else:
+            self._run_length = 0
+
+        if not self.speaking.is_set() and self._run_length >= self.start_frames:
+            self._run_length = 0
+            self.speech_started_at = position - (self.start_frames - 1) * FRAME_SAMPLES
+            self.speaking.set()
+        elif self.speaking.is_set() and self._run_length >= self.end_frames:
+            self._run_length = 0
+            self.speech_ended_at = position
+            self.speaking.clear()
+
+    def is_speaking(self):
+        return self.speaking.is_set()
+
+    def speech_within(self, seconds):
+        """True if the user is speaking or stopped less than `seconds` ago"""
+        if self.speaking.is_set():
+            return True
+        if self.speech_ended_at is None:
+            return False
+        return self.capture.buffer.write_index - self.speech_ended_at <= seconds * self.capture.sample_rate
+
+    def wait_for_voice(self, timeout=None):
+        """Block until the user is speaking; False on timeout"""
+        return self.speaking.wait(timeout)
@@ -1,6 +1,7 @@
 import sys
 import os
 import threading
+import time
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot, QObject
 
@@ -19,6 +20,14 @@ from core.stt import STTHandler
 from core.tts import TTSHandler
 from core.actions import SystemActions
 from core.sentiment import SentimentAnalyzer, Mood
+from core.speech_pipeline import SentenceStream
+from core.action_parser import strip_action_tags
+from core.intents import IntentMatcher
+from core.speculation import Speculator
+
+# Seconds to wait for an interrupted answer's stream to shut down before
+# listening (it ends at the next token the backend sends)
+INTERRUPT_JOIN_TIMEOUT = 1.0
 
 class WorkerSignals(QObject):
     speaking_state = pyqtSignal(bool)
@@ -41,14 +50,26 @@ class AssistantThread(QThread):
         
         # Initialize components
         self.llm = LLMHandler()
-        self.stt = STTHandler()
+        self.stt = STTHandler(self.config)
         self.tts = TTSHandler(
             engine=self.config.get('tts', {}).get('engine', 'piper'),
-            config=self.config.get('tts', {})
+            config=self.config.get('tts', {}),
+            echo_reference=self.stt.echo_canceller
         )
         self.actions = SystemActions()
+        # Obvious commands skip the LLM entirely
+        if self.config.get('intents', {}).get('enabled', True):
+            self.intents = IntentMatcher.from_actions(self.actions, self.config)
+        else:
+            self.intents = None
         self.sentiment = SentimentAnalyzer(sensitivity=0.5)
+        # Starts the LLM on a stable partial transcript before the user
+        # has finished speaking
+        self.speculator = Speculator.from_config(
+            self.llm, self.analyze_mood, self.config, skip=self.is_local_input
+        )
         self.voice_enabled = True
+        self.last_turn_metrics = {}
     
     def load_config(self):
         """Load configuration from config.json"""
@@ -68,7 +89,7 @@ class AssistantThread(QThread):
                 
                 print("Assistant: Listening...")
                 self.signals.listening_state.emit(True)
-                user_input = self.stt.listen()
+                user_input, speculation = self.listen()
                 self.signals.listening_state.emit(False)
                 
                 if user_input:
@@ -86,12 +107,51 @@ class AssistantThread(QThread):
                         QApplication.quit()
                         break
 
-                    self.process_input(user_input, use_tts=True)
+                    self.process_input(user_input, use_tts=True, speculation=speculation)
+    
+    def listen(self, since=None):
+        """
+        Listen for the next utterance
+        
+        Args:
+            since: Capture position the utterance may have started at
+                   (the start of the speech that interrupted playback)
+        
+        Returns:
+            (user_input, speculation): speculation is the SpeculativeTurn
+            already answering user_input, if there is one
+        """
+        if not self.speculator:
+            return self.stt.listen(since=since), None
+        user_input = self.stt.listen(on_partial=self.speculator.on_partial, since=since)
+        return user_input, self.speculator.take(user_input)
     
+    def is_local_input(self, text):
+        """True for input handled without the LLM (exit words, local commands)"""
+        lowered = text.lower()
+        if "goodbye" in lowered or "exit" in lowered:
+            return True
+        return bool(self.intents and self.intents.match(text))
     
-    def analyze_and_process_mood(self, user_input):
-        """Analyze user mood and set LLM context accordingly"""
+    def analyze_mood(self, user_input):
+        """
+        Returns:
+            (analysis, mood context for the LLM)
+        """
         analysis = self.sentiment.analyze(user_input)
+        if analysis['confidence'] > 0.4:  # Only set context if reasonably confident
+            return analysis, self.sentiment.get_empathetic_context(analysis)
+        return analysis, ""  # Clear context for neutral
+    
+    
+    def analyze_and_process_mood(self, user_input, mood=None):
+        """
+        Analyze user mood and set LLM context accordingly
+        
+        Args:
+            mood: analyze_mood() result if already known (speculative turns)
+        """
+        analysis, mood_context = mood or self.analyze_mood(user_input)
         mood = analysis['mood']
         confidence = analysis['confidence']
         
@@ -102,75 +162,150 @@ class AssistantThread(QThread):
         self.signals.mood_detected.emit(mood.value, mood_description)
         
         # Set empathetic context for LLM
-        if confidence > 0.4:  # Only set context if reasonably confident
-            empathy_context = self.sentiment.get_empathetic_context(analysis)
-            self.llm.set_mood_context(empathy_context)
-        else:
-            self.llm.set_mood_context("")  # Clear context for neutral
+        self.llm.set_mood_context(mood_context)
     
-    def process_input(self, user_input, use_tts=False):
-        """Process user input through LLM and execute any actions"""
+    def process_input(self, user_input, use_tts=False, speculation=None):
+        """
+        Process user input through LLM and execute any actions
+        
+        Args:
+            speculation: SpeculativeTurn started from a partial transcript
+                         that matches user_input; the turn continues from it
+        """
+        turn_start = time.perf_counter()
         
         # Analyze mood first
-        self.analyze_and_process_mood(user_input)
+        if speculation:
+            self.analyze_and_process_mood(user_input, (speculation.analysis, speculation.mood_context))
+        else:
+            self.analyze_and_process_mood(user_input)
         
         # Log user message
         self.actions.save_chat_message("User", user_input)
         
+        intent = self.intents.match(user_input) if self.intents else None
+        if intent:
+            self.run_intent(user_input, intent, use_tts, turn_start)
+            return
+        
         self.signals.thinking_state.emit(True)
-        result = self.llm.chat(user_input)
-        self.signals.thinking_state.emit(False)
-        response_text = result['text']
-        actions = result['actions']
-        backend = result.get('backend', '💻 Ollama')
         
-        # Log assistant response
-        self.actions.save_chat_message("Assistant", response_text)
+        # Runs on the pipeline thread as soon as generation has finished,
+        # so the text shows up while earlier sentences are still playing
+        turn = {}
+        def on_generation_complete():
+            result = self.llm.last_result
+            response_text = result['text']
+            backend = result.get('backend', '💻 Ollama')
+            
+            # Log assistant response
+            self.actions.save_chat_message("Assistant", response_text)
+            
+            # Emit backend info
+            self.signals.llm_backend_changed.emit(backend)
+            
+            print(f"Assistant ({backend}): {response_text}")
+            
+            # Send text response to UI
+            if response_text:
+                self.signals.assistant_response.emit(response_text)
+        
+        # Actions run the moment their tag is complete, while the rest of
+        # the response is still being generated and spoken
+        def run_action(action):
+            print(f"Executing action: {action}")
+            feedback = self.actions.execute_action(action['type'], action['params'])
+            print(f"Action result: {feedback}")
+            
+            # Send action feedback to UI
+            self.signals.action_feedback.emit(feedback)
+        
+        if speculation:
+            deltas = speculation.adopt(user_input)
+        else:
+            deltas = self.llm.chat_stream(user_input)
+        stream = SentenceStream(
+            strip_action_tags(deltas, run_action),
+            on_complete=on_generation_complete
+        ).start()
         
-        # Emit backend info
-        self.signals.llm_backend_changed.emit(backend)
+        interrupted = False
+        if use_tts:
+            # Speak sentence by sentence - with interrupt detection
+            def on_first_audio():
+                turn['first_audio'] = time.perf_counter()
+                self.signals.thinking_state.emit(False)
+                self.signals.speaking_state.emit(True)
+            
+            # Create interrupt callback that checks if user is speaking
+            def check_interrupt():
+                return self.stt.is_speaking(duration=0.2)
+            
+            interrupted = self.tts.speak_stream(
+                stream,
+                interrupt_callback=check_interrupt,
+                on_first_audio=on_first_audio
+            )
+            
+            self.signals.speaking_state.emit(False)
         
-        print(f"Assistant ({backend}): {response_text}")
+        if interrupted:
+            # The user took the turn: stop generating. The request is
+            # cancelled and the unfinished answer never joins the conversation.
+            stream.cancel()
+            stream.join(INTERRUPT_JOIN_TIMEOUT)
+        else:
+            stream.join()
+        self.signals.thinking_state.emit(False)
+        self.report_turn_latency(turn_start, stream, turn.get('first_audio'))
         
-        # Send text response to UI
-        if response_text:
-            self.signals.assistant_response.emit(response_text)
+        # If interrupted, immediately start listening again
+        if interrupted:
+            print("🎤 Listening after interrupt...")
+            self.signals.listening_state.emit(True)
+            # From where the interrupting speech began, so its start isn't lost
+            user_input, speculation = self.listen(since=self.stt.vad.speech_started_at)
+            self.signals.listening_state.emit(False)
             
-            # Speak if voice mode - with interrupt detection
-            if use_tts:
-                self.signals.speaking_state.emit(True)
-                
-                # Create interrupt callback that checks if user is speaking
-                def check_interrupt():
-                    return self.stt.is_speaking(duration=0.2)
-                
-                # Speak with interrupt detection
-                self.tts.speak(response_text, interrupt_callback=check_interrupt)
-                
-                self.signals.speaking_state.emit(False)
-                
-                # If interrupted, immediately start listening again
-                if self.tts.should_stop:
-                    print("🎤 Listening after interrupt...")
-                    self.signals.listening_state.emit(True)
-                    user_input = self.stt.listen()
-                    self.signals.listening_state.emit(False)
-                    
-                    if user_input:
-                        print(f"User said (after interrupt): {user_input}")
-                        self.signals.user_voice_input.emit(user_input)
-                        # Process the new input
-                        self.process_input(user_input, use_tts=True)
-        
-        # Execute actions
-        if actions:
-            for action in actions:
-                print(f"Executing action: {action}")
-                feedback = self.actions.execute_action(action['type'], action['params'])
-                print(f"Action result: {feedback}")
-                
-                # Send action feedback to UI
-                self.signals.action_feedback.emit(feedback)
+            if user_input:
+                print(f"User said (after interrupt): {user_input}")
+                self.signals.user_voice_input.emit(user_input)
+                # Process the new input
+                self.process_input(user_input, use_tts=True, speculation=speculation)
+    
+    def run_intent(self, user_input, intent, use_tts, turn_start):
+        """Handle a recognized command locally, without the LLM"""
+        print(f"🎯 Local command: {intent}")
+        feedback = self.actions.execute_action(intent.action_type, intent.params)
+        print(f"Action result: {feedback}")
+        self.signals.action_feedback.emit(feedback)
+        
+        # Keep the LLM's view of the conversation complete
+        self.llm.record_exchange(user_input, intent.reply)
+        self.actions.save_chat_message("Assistant", intent.reply)
+        self.signals.llm_backend_changed.emit("🎯 Local")
+        self.signals.assistant_response.emit(intent.reply)
+        
+        self.last_turn_metrics = {'total_ms': (time.perf_counter() - turn_start) * 1000}
+        print(f"⏱️ Turn latency: total {self.last_turn_metrics['total_ms']:.0f} ms (local command)")
+        
+        if use_tts:
+            self.signals.speaking_state.emit(True)
+            self.tts.speak(intent.reply)
+            self.signals.speaking_state.emit(False)
+    
+    def report_turn_latency(self, turn_start, stream, first_audio_at=None):
+        """Print and remember how long the user waited in this turn"""
+        metrics = {}
+        if stream.first_token_at:
+            metrics['first_token_ms'] = (stream.first_token_at - turn_start) * 1000
+        if first_audio_at:
+            metrics['first_audio_ms'] = (first_audio_at - turn_start) * 1000
+        metrics['total_ms'] = (time.perf_counter() - turn_start) * 1000
+        self.last_turn_metrics = metrics
+        
+        report = ", ".join(f"{name[:-3].replace('_', ' ')} {value:.0f} ms" for name, value in metrics.items())
+        print(f"⏱️ Turn latency: {report}")
     
     @pyqtSlot(str)
     def handle_text_message(self, message):
@@ -192,6 +327,8 @@ class AssistantThread(QThread):
     def switch_backend(self, mode):
         """Switch LLM backend mode"""
         print(f"🔄 Switching LLM backend to: {mode}")
+        # Takes effect on the next message; the conversation carries over
+        self.llm.set_mode(mode)
         self.config['llm']['mode'] = mode
         # Update config file
         import json
@@ -0,0 +1,533 @@
+"""
+Desktop Buddy Headless Server
+Runs the assistant pipeline (mood, LLM, actions, TTS) as a local service
+so several clients - a kiosk, a second desk, the desktop UI - can share
+one set of models. Each client gets a session with its own history, mood
+and backend mode; turns from different sessions run concurrently on a
+bounded worker pool.
+
+HTTP API (JSON bodies):
+    POST   /sessions                {"mode": "auto"}      -> {"session_id": ...}
+    DELETE /sessions/<id>
+    PUT    /sessions/<id>/mode      {"mode": "groq"}
+    POST   /sessions/<id>/turn      {"text": "...", "tts": true, "stream": false}
+           -> {"text", "actions", "action_results", "backend", "mood",
+               "audio" (base64 or null), "audio_format", "timings"}
+           "actions" are the parsed actions for the client to run; the
+           server only runs them itself (filling "action_results") with
+           server.execute_actions, since it may not be on the user's desk.
+           With "stream": true the reply is Server-Sent Events: "delta"
+           events with text as it is generated, then one "result" event.
+    GET    /health
+
+WebSocket (needs the optional `websockets` package), on server.ws_port:
+    send {"type": "create_session", "mode": ...}
+      or {"type": "turn", "session_id": ..., "text": ..., "tts": false}
+    receive {"type": "delta", "text": ...} messages, then
+            {"type": "result", ...} (same fields as the HTTP reply)
+
+Usage:
+    python server.py
+    python server.py --host 0.0.0.0 --port 8765
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.llm import LLMHandler, LLM_MODES
+from core.session import SessionManager
+from core.action_parser import strip_action_tags
+from core.intents import IntentMatcher
+from core.async_loop import AsyncLoopThread
+
+
+DEFAULT_SERVER_CONFIG = {
+    'host': "127.0.0.1",
+    'port': 8765,
+    'ws_port': 8766,
+    'max_workers': 4,
+    'max_queued': 8,
+    'max_sessions': 32,
+    'session_timeout': 1800,
+    'execute_actions': False,
+    'tts': True,
+}
+
+
+class ServiceBusy(Exception):
+    """All workers are busy and the queue is full"""
+
+
+class AssistantService:
+    """
+    The turn pipeline, shared by every client
+
+    One LLMHandler (backends, health monitor, router, cache) serves all
+    sessions; per-client state lives in the sessions.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        server_config = {**DEFAULT_SERVER_CONFIG, **config.get('server', {})}
+        self.server_config = server_config
+
+        self.llm = LLMHandler(config)
+        self.sessions = SessionManager(
+            self.llm,
+            max_sessions=server_config['max_sessions'],
+            idle_timeout=server_config['session_timeout']
+        )
+
+        # Imported here so the server also runs without the optional
+        # sentiment/actions/TTS dependencies
+        try:
+            from core.sentiment import SentimentAnalyzer
+            self.sentiment = SentimentAnalyzer(sensitivity=config.get('sentiment', {}).get('sensitivity', 0.5))
+        except Exception as e:
+            self.sentiment = None
+            print(f"⚠️ Mood detection disabled: {e}")
+
+        # SystemActions also provides the app and folder names the intent
+        # matcher knows, so it is loaded even when actions only go back to
+        # the client
+        self.execute_actions = server_config['execute_actions']
+        self.actions = None
+        self.intents = None
+        try:
+            from core.actions import SystemActions
+            self.actions = SystemActions()
+        except Exception as e:
+            print(f"⚠️ Actions disabled: {e}")
+        intents_config = config.get('intents', {})
+        if intents_config.get('enabled', True):
+            if self.actions:
+                self.intents = IntentMatcher.from_actions(self.actions, config)
+            else:
+                self.intents = IntentMatcher((), (), threshold=intents_config.get('threshold', 0.85))
+
+        self.tts = None
+        if server_config['tts']:
+            try:
+                from core.tts import TTSHandler
+                self.tts = TTSHandler(
+                    engine=config.get('tts', {}).get('engine', 'piper'),
+                    config=config.get('tts', {}),
+                    playback=False
+                )
+            except Exception as e:
+                print(f"⚠️ TTS disabled: {e}")
+
+        # Running turns plus queued ones are capped so a burst of clients
+        # gets a quick "busy" instead of ever-growing latency
+        self.executor = ThreadPoolExecutor(
+            max_workers=server_config['max_workers'],
+            thread_name_prefix="turn"
+        )
+        self._slots = threading.BoundedSemaphore(server_config['max_workers'] + server_config['max_queued'])
+
+    def submit(self, session, text, tts=False, on_delta=None):
+        """
+        Queue a turn on the worker pool
+
+        Returns:
+            concurrent.futures.Future with the turn result dict
+
+        Raises:
+            ServiceBusy: if the pool and its queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy("Too many requests in flight, try again shortly")
+        future = self.executor.submit(self.run_turn, session, text, tts, on_delta)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def apply_mood(self, session, text):
+        """Detect the user's mood and set the session's mood hint"""
+        if not self.sentiment:
+            return None
+        analysis = self.sentiment.analyze(text)
+        if analysis['confidence'] > 0.4:
+            self.llm.set_mood_context(self.sentiment.get_empathetic_context(analysis), session)
+        else:
+            self.llm.set_mood_context("", session)
+        return analysis['mood'].value
+
+    def run_turn(self, session, text, tts=False, on_delta=None):
+        """
+        One full turn for a session (runs on a worker thread)
+
+        Turns of the same session run one at a time, in order.
+        """
+        with session.lock:
+            session.touch()
+            start = time.perf_counter()
+            timings = {}
+            mood = self.apply_mood(session, text)
+
+            intent = self.intents.match(text) if self.intents else None
+            if intent:
+                return self.run_intent(session, text, intent, tts, mood, start, on_delta)
+
+            action_results = []
+            def run_action(action):
+                if not (self.execute_actions and self.actions):
+                    return
+                feedback = self.actions.execute_action(action['type'], action['params'])
+                action_results.append({'action': action, 'result': feedback})
+
+            for delta in strip_action_tags(self.llm.chat_stream(text, session), run_action):
+                if 'first_token_ms' not in timings:
+                    timings['first_token_ms'] = (time.perf_counter() - start) * 1000
+                if on_delta:
+                    on_delta(delta)
+            result = session.last_result
+
+            audio, audio_format = None, None
+            if tts and self.tts and result['text']:
+                audio, audio_format = self.synthesize(result['text'])
+                timings['audio_ms'] = (time.perf_counter() - start) * 1000
+
+            timings['total_ms'] = (time.perf_counter() - start) * 1000
+            return {
+                'session_id': session.id,
+                'text': result['text'],
+                'actions': result['actions'],
+                'action_results': action_results,
+                'backend': result['backend'],
+                'mood': mood,
+                'audio': audio,
+                'audio_format': audio_format,
+                'timings': timings,
+            }
+
+    def run_intent(self, session, text, intent, tts, mood, start, on_delta=None):
+        """Answer a recognized command locally, without the LLM (session lock held)"""
+        action = {'type': intent.action_type, 'params': intent.params}
+        action_results = []
+        if self.execute_actions and self.actions:
+            feedback = self.actions.execute_action(intent.action_type, intent.params)
+            action_results.append({'action': action, 'result': feedback})
+        self.llm.record_exchange(text, intent.reply, session)
+        session.last_result = {'text': intent.reply, 'actions': [action], 'backend': "🎯 Local"}
+        if on_delta:
+            on_delta(intent.reply)
+
+        timings = {'first_token_ms': (time.perf_counter() - start) * 1000}
+        audio, audio_format = self.synthesize(intent.reply) if tts and self.tts else (None, None)
+        timings['total_ms'] = (time.perf_counter() - start) * 1000
+        return {
+            'session_id': session.id,
+            'text': intent.reply,
+            'actions': [action],
+            'action_results': action_results,
+            'backend': "🎯 Local",
+            'mood': mood,
+            'audio': audio,
+            'audio_format': audio_format,
+            'timings': timings,
+        }
+
+    def synthesize(self, text):
+        """Base64-encoded audio for text, and its format ("mp3"/"wav")"""
+        filename = self.tts.synthesize(text)
+        if not filename:
+            return None, None
+        try:
+            with open(filename, 'rb') as f:
+                audio = base64.b64encode(f.read()).decode('ascii')
+            return audio, os.path.splitext(filename)[1].lstrip('.')
+        finally:
+            self.tts._remove_file(filename)
+
+    def health(self):
+        return {
+            'status': "ok",
+            'sessions': len(self.sessions),
+            'mode': self.llm.config['llm']['mode'],
+            'backends': {name: state.value for name, state in self.llm.health.states.items()},
+            'cascade': self.llm.cascade.snapshot(),
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.llm.health.stop()
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """HTTP front end for AssistantService"""
+
+    SESSION_PATH = re.compile(r'^/sessions/([0-9a-f]+)(?:/(turn|mode))?$')
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        """The request body as a dict, or None if it isn't a JSON object"""
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json({'error': message}, status=status)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(self.service.health())
+        else:
+            self.send_error_json(404, "Not found")
+
+    def do_POST(self):
+        body = self.read_json()
+        if body is None:
+            self.send_error_json(400, "Body must be a JSON object")
+            return
+
+        if self.path == '/sessions':
+            mode = body.get('mode')
+            if mode is not None and (not isinstance(mode, str) or mode not in LLM_MODES):
+                self.send_error_json(400, f"Unknown mode: {mode}")
+                return
+            session = self.service.sessions.create(mode)
+            self.send_json({'session_id': session.id, 'mode': self.service.llm.get_mode(session)}, status=201)
+            return
+
+        match = self.SESSION_PATH.match(self.path)
+        if not match or match.group(2) != 'turn':
+            self.send_error_json(404, "Not found")
+            return
+        session = self.service.sessions.get(match.group(1))
+        if not session:
+            self.send_error_json(404, "Unknown or expired session")
+            return
+        text = body.get('text') or ""
+        if not isinstance(text, str):
+            self.send_error_json(400, "text must be a string")
+            return
+        text = text.strip()
+        if not text:
+            self.send_error_json(400, "Missing text")
+            return
+
+        if body.get('stream'):
+            self.stream_turn(session, text, bool(body.get('tts')))
+            return
+
+        try:
+            result = self.service.submit(session, text, bool(body.get('tts'))).result()
+        except ServiceBusy as e:
+            self.send_error_json(503, str(e))
+            return
+        except Exception as e:
+            self.send_error_json(500, f"Turn failed: {e}")
+            return
+        self.send_json(result)
+
+    def do_PUT(self):
+        body = self.read_json()
+        if body is None:
+            self.send_error_json(400, "Body must be a JSON object")
+            return
+        match = self.SESSION_PATH.match(self.path)
+        if not match or match.group(2) != 'mode':
+            self.send_error_json(404, "Not found")
+            return
+        session = self.service.sessions.get(match.group(1))
+        if not session:
+            self.send_error_json(404, "Unknown or expired session")
+            return
+        if not isinstance(body.get('mode'), str) or not self.service.llm.set_mode(body.get('mode'), session):
+            self.send_error_json(400, f"Unknown mode: {body.get('mode')}")
+            return
+        self.send_json({'session_id': session.id, 'mode': session.mode})
+
+    def do_DELETE(self):
+        match = self.SESSION_PATH.match(self.path)
+        if match and not match.group(2) and self.service.sessions.close(match.group(1)):
+            self.send_json({'closed': match.group(1)})
+        else:
+            self.send_error_json(404, "Unknown session")
+
+    def stream_turn(self, session, text, tts):
+        """Run a turn, relaying its text as Server-Sent Events"""
+        events = queue.Queue()
+        try:
+            future = self.service.submit(session, text, tts, on_delta=events.put)
+        except ServiceBusy as e:
+            self.send_error_json(503, str(e))
+            return
+        future.add_done_callback(lambda _: events.put(None))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            while True:
+                delta = events.get()
+                if delta is None:
+                    break
+                self.write_event('delta', {'text': delta})
+            try:
+                self.write_event('result', future.result())
+            except Exception as e:
+                self.write_event('error', {'error': f"Turn failed: {e}"})
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the turn still completes for its session
+            pass
+
+    def write_event(self, event, payload):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+
+class WebSocketFrontEnd:
+    """WebSocket front end (optional `websockets` package)"""
+
+    def __init__(self, service):
+        self.service = service
+        self.loop_thread = AsyncLoopThread(name="websocket-loop")
+        self.server = None
+
+    def start(self, host, port):
+        try:
+            import websockets
+        except ImportError:
+            print("ℹ️ websockets not installed, WebSocket API disabled (pip install websockets)")
+            return False
+
+        async def serve():
+            return await websockets.serve(self.handle, host, port)
+
+        self.loop_thread.start()
+        self.server = self.loop_thread.run(serve())
+        print(f"🔌 WebSocket API on ws://{host}:{port}")
+        return True
+
+    async def handle(self, websocket, path=None):
+        async for raw in websocket:
+            try:
+                request = json.loads(raw)
+            except ValueError:
+                request = None
+            if not isinstance(request, dict):
+                await websocket.send(json.dumps({'type': "error", 'error': "Message must be a JSON object"}))
+                continue
+
+            if request.get('type') == 'create_session':
+                mode = request.get('mode')
+                if mode is not None and (not isinstance(mode, str) or mode not in LLM_MODES):
+                    await websocket.send(json.dumps({'type': "error", 'error': f"Unknown mode: {mode}"}))
+                    continue
+                session = self.service.sessions.create(mode)
+                await websocket.send(json.dumps({'type': "session", 'session_id': session.id}))
+            elif request.get('type') == 'turn':
+                await self.handle_turn(websocket, request)
+            else:
+                await websocket.send(json.dumps({'type': "error", 'error': "Unknown message type"}))
+
+    async def handle_turn(self, websocket, request):
+        session_id = request.get('session_id')
+        session = self.service.sessions.get(session_id) if isinstance(session_id, str) else None
+        text = request.get('text') or ""
+        text = text.strip() if isinstance(text, str) else ""
+        if not session or not text:
+            error = "Unknown or expired session" if not session else "Missing text"
+            await websocket.send(json.dumps({'type': "error", 'error': error}))
+            return
+
+        loop = asyncio.get_running_loop()
+        deltas = asyncio.Queue()
+        def on_delta(delta):
+            loop.call_soon_threadsafe(deltas.put_nowait, delta)
+
+        try:
+            future = self.service.submit(session, text, bool(request.get('tts')), on_delta)
+        except ServiceBusy as e:
+            await websocket.send(json.dumps({'type': "error", 'error': str(e)}))
+            return
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(deltas.put_nowait, None))
+
+        while (delta := await deltas.get()) is not None:
+            await websocket.send(json.dumps({'type': "delta", 'text': delta}))
+        try:
+            result = future.result()
+        except Exception as e:
+            await websocket.send(json.dumps({'type': "error", 'error': f"Turn failed: {e}"}))
+            return
+        await websocket.send(json.dumps({'type': "result", **result}))
+
+    def stop(self):
+        if self.server:
+            self.server.close()
+        self.loop_thread.stop()
+
+
+def load_config():
+    """Load configuration from config.json"""
+    if not os.path.exists("config.json"):
+        print("❌ config.json not found - run the desktop app once or copy config.template.json")
+        raise SystemExit(1)
+    with open("config.json", 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Desktop Buddy headless server")
+    parser.add_argument('--host', default=None, help="Bind address (default: server.host in config.json)")
+    parser.add_argument('--port', type=int, default=None, help="HTTP port (default: server.port)")
+    parser.add_argument('--ws-port', type=int, default=None, help="WebSocket port (default: server.ws_port)")
+    args = parser.parse_args()
+
+    config = load_config()
+    service = AssistantService(config)
+    host = args.host or service.server_config['host']
+    port = args.port or service.server_config['port']
+    ws_port = args.ws_port or service.server_config['ws_port']
+
+    httpd = ThreadingHTTPServer((host, port), APIHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+
+    websocket_front_end = WebSocketFrontEnd(service)
+    websocket_front_end.start(host, ws_port)
+
+    print(f"🚀 Desktop Buddy server on http://{host}:{port} "
+          f"({service.server_config['max_workers']} workers)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        httpd.server_close()
+        websocket_front_end.stop()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
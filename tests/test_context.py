@@ -0,0 +1,49 @@
+"""
+Context window: smaller budgets keep a summary of the turns they skip
+"""
+
+import time
+
+from core.context import ContextWindow
+
+
+def summarize(previous, messages):
+    return f"{previous} {messages[0]['content']}..{messages[-1]['content']}".strip()
+
+
+def wait_for_summaries(window):
+    deadline = time.time() + 2
+    while time.time() < deadline:
+        with window._lock:
+            if not window._summarizing and not any(view['summarizing'] for view in window._views.values()):
+                return
+        time.sleep(0.01)
+
+
+def test_smaller_budget_summarizes_skipped_turns():
+    calls = []
+    window = ContextWindow(budget=6000, summarizer=lambda previous, messages: calls.append(messages) or summarize(previous, messages))
+    for i in range(40):
+        window.add_exchange(f"question {i} " + "word " * 40, f"answer {i} " + "word " * 40)
+
+    window.render(1500)
+    wait_for_summaries(window)
+    rendered = window.render(1500)
+
+    assert calls
+    assert rendered[0]['role'] == 'system'
+    assert "question 0" in rendered[0]['content']
+    assert rendered[-1]['content'].startswith("answer 39")
+
+
+def test_smaller_budget_prefix_is_stable_between_batches():
+    window = ContextWindow(budget=6000, summarizer=summarize)
+    for i in range(40):
+        window.add_exchange(f"question {i} " + "word " * 40, f"answer {i} " + "word " * 40)
+    window.render(1500)
+    wait_for_summaries(window)
+
+    before = window.render(1500)
+    window.add_exchange("one more", "sure")
+    after = window.render(1500)
+    assert after[:len(before)] == before
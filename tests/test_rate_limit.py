@@ -0,0 +1,39 @@
+"""
+Rate limiting for requests as large as the per-minute token quota
+"""
+
+import pytest
+
+from core.context import ContextWindow
+from core.groq_backend import GroqBackend
+from core.rate_limit import RateLimitExceeded, RateLimitScheduler, TokenBucket
+
+
+def test_oversized_request_waits_for_a_full_bucket():
+    bucket = TokenBucket(6000, 100)
+    now = bucket.updated
+    assert bucket.wait_time(6321, now) == 0.0
+
+    bucket.reserve(3000, now)
+    # 3000 short of a full bucket, at 100 tokens/s
+    assert bucket.wait_time(6321, now) == pytest.approx(30.0)
+
+
+def test_scheduler_accepts_cost_above_capacity_with_full_bucket():
+    scheduler = RateLimitScheduler('groq', tokens_per_minute=6000, max_wait=3.0)
+    assert scheduler.reserve(6321) == 0.0
+    # The bucket is spent now; the next one has to wait for a refill
+    with pytest.raises(RateLimitExceeded):
+        scheduler.reserve(6321)
+
+
+def test_groq_request_fits_in_token_quota():
+    config = {'llm': {'groq_api_key': 'test', 'groq_rate_limits': {'tokens_per_minute': 6000}}}
+    backend = GroqBackend(config, "You are a helpful desktop assistant. " * 20)
+    conversation = ContextWindow(budget=backend.context_budget)
+    for turn in range(60):
+        conversation.add_exchange(f"question {turn} " + "word " * 100, "answer " * 150)
+
+    messages = backend.build_messages("and then?", conversation)
+    assert backend.estimate_cost(messages) <= backend.rate_limiter.token_capacity()
+    assert backend.rate_limiter.reserve(backend.estimate_cost(messages)) == 0.0
@@ -0,0 +1,63 @@
+"""
+Response cache keys: conversation context and time-dependent inputs
+"""
+
+import time
+
+from core.response_cache import ResponseCache, conversation_digest
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(path=str(tmp_path / "cache.json"), save_delay=0.05, **kwargs)
+
+
+def test_follow_up_only_hits_in_the_same_context(tmp_path):
+    cache = make_cache(tmp_path)
+    weather = conversation_digest([{'role': 'user', 'content': "shall we go out?"},
+                                   {'role': 'assistant', 'content': "It might rain."}])
+    music = conversation_digest([{'role': 'user', 'content': "want some music?"},
+                                 {'role': 'assistant', 'content': "Shall I play jazz?"}])
+
+    cache.put("yes", "", "groq", "llama", "Take an umbrella then!", weather)
+    assert cache.get("yes", "", "groq", "llama", music) is None
+    assert cache.get("Yes!", "", "groq", "llama", weather) == "Take an umbrella then!"
+
+
+def test_time_dependent_inputs_are_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("what's the weather", "", "groq", "llama", "Sunny.")
+    cache.put("what time is it", "", "groq", "llama", "Noon.")
+    assert cache.get("what's the weather", "", "groq", "llama") is None
+    assert cache.get("what time is it", "", "groq", "llama") is None
+
+
+def test_put_embeds_and_saves_in_the_background(tmp_path):
+    def slow_embedder(text):
+        time.sleep(0.2)
+        return [1.0, float(len(text))]
+
+    cache = make_cache(tmp_path, embedder=slow_embedder, embedding_timeout=0.01)
+    start = time.perf_counter()
+    assert cache.get("hello there", "", "groq", "llama") is None
+    cache.put("hello there", "", "groq", "llama", "Hi!")
+    assert time.perf_counter() - start < 0.1
+
+    time.sleep(0.5)
+    cache.flush()
+    reloaded = make_cache(tmp_path)
+    entry = next(iter(reloaded.entries.values()))
+    assert entry['response'] == "Hi!" and 'embedding' in entry
+
+
+def test_standalone_prompts_hit_in_any_context(tmp_path):
+    cache = make_cache(tmp_path)
+    before = conversation_digest([{'role': 'user', 'content': "hello there"},
+                                  {'role': 'assistant', 'content': "Hi!"}])
+    after = conversation_digest([{'role': 'user', 'content': "tell me a joke"},
+                                 {'role': 'assistant', 'content': "Why did the robot cross the road?"}])
+
+    cache.put("hello there", "", "groq", "llama", "Hi!", before)
+    assert cache.get("hello there", "", "groq", "llama", after) == "Hi!"
+
+    cache.put("play it again", "", "groq", "llama", "Playing it again.", before)
+    assert cache.get("play it again", "", "groq", "llama", after) is None
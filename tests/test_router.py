@@ -0,0 +1,35 @@
+"""
+Latency router: abandoned calls still count against a slow backend
+"""
+
+from core.router import LatencyRouter
+from core.telemetry import LatencyTelemetry
+
+
+class AlwaysUp:
+    def is_available(self, name):
+        return True
+
+    def probe(self, name):
+        pass
+
+
+class Backend:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_hedge_losers_move_traffic_away(tmp_path):
+    telemetry = LatencyTelemetry(path=str(tmp_path / "telemetry.json"))
+    router = LatencyRouter(telemetry, AlwaysUp())
+    groq, ollama = Backend('groq'), Backend('ollama')
+    for _ in range(3):
+        telemetry.record('ollama', ttft_ms=300, total_ms=800, tokens_in=10, tokens_out=10)
+
+    # Unmeasured backends get explored first
+    assert router.pick([groq, ollama]) is groq
+
+    # groq kept losing hedged races after 1.1 s without a first token
+    for _ in range(3):
+        telemetry.record_censored_ttft('groq', 1100)
+    assert router.pick([groq, ollama]) is ollama
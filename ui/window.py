@@ -355,14 +355,19 @@ class DesktopWindow(QWidget):
         print(f"UI updated with mood: {mood_name} - {mood_description}")
     
     def toggle_llm_backend(self):
-        """Toggle between Ollama, Gemini, Groq, and Auto modes"""
-        # Cycle through: auto -> ollama -> gemini -> groq -> auto
+        """Toggle between Ollama, llama.cpp, Gemini, Groq, Cascade, and Auto modes"""
+        # Cycle through: auto -> ollama -> llamacpp -> gemini -> groq -> cascade -> auto
         if self.current_backend == "auto":
             self.current_backend = "ollama"
             self.llm_status_label.setText("💻 Ollama (Forced)")
             self.backend_switch_requested.emit("ollama")
             self.add_message("System", "Switched to Ollama (offline)", is_user=False)
         elif self.current_backend == "ollama":
+            self.current_backend = "llamacpp"
+            self.llm_status_label.setText("🦙 llama.cpp (Forced)")
+            self.backend_switch_requested.emit("llamacpp")
+            self.add_message("System", "Switched to llama.cpp (offline, in-process)", is_user=False)
+        elif self.current_backend == "llamacpp":
             self.current_backend = "gemini"
             self.llm_status_label.setText("🌐 Gemini (Forced)")
             self.backend_switch_requested.emit("gemini")
@@ -372,7 +377,12 @@ class DesktopWindow(QWidget):
             self.llm_status_label.setText("⚡ Groq (Forced)")
             self.backend_switch_requested.emit("groq")
             self.add_message("System", "Switched to Groq (FREE & FAST!)", is_user=False)
-        else:  # groq
+        elif self.current_backend == "groq":
+            self.current_backend = "cascade"
+            self.llm_status_label.setText("🪜 Cascade")
+            self.backend_switch_requested.emit("cascade")
+            self.add_message("System", "Switched to Cascade mode (small model first)", is_user=False)
+        else:  # cascade
             self.current_backend = "auto"
             self.llm_status_label.setText("🔄 Auto")
             self.backend_switch_requested.emit("auto")